@@ -0,0 +1,145 @@
+"""
+FinTrack Pro - Synthetic data generator for benchmarks
+Builds deterministic fintrack.db copies with realistic skew:
+  python benchmarks/generate_data.py --size 1m
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from sqlalchemy import insert, text
+import database
+from models import Budget, Expense, Subscription
+from search_module import rebuild_title_index
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+CHUNK_SIZE = 50_000
+YEARS = 10
+
+# category name -> (share of expenses, median amount, merchants)
+PROFILE = {
+    "Food": (0.38, 18.0, ["Tesco", "Lidl", "Starbucks", "Pret", "Deliveroo", "UberEats", "Pizza Hut"]),
+    "Transport": (0.22, 12.0, ["Uber", "Lyft", "Shell", "BP", "Metro card", "Train ticket"]),
+    "Shopping": (0.14, 45.0, ["Amazon", "IKEA", "Zara", "eBay", "Apple Store"]),
+    "Entertainment": (0.10, 25.0, ["Cinema", "Spotify", "Steam", "Concert tickets"]),
+    "Utilities": (0.07, 80.0, ["Electricity bill", "Water bill", "Internet", "Phone bill"]),
+    "Health": (0.05, 35.0, ["Pharmacy", "Dentist", "Gym", "Optician"]),
+    "Other": (0.04, 30.0, ["Gift", "Donation", "Bank fee", "Misc"]),
+}
+
+
+def default_path(size: str) -> str:
+    return os.path.join(DATA_DIR, f"fintrack_{size}.db")
+
+
+def _drop_expense_triggers():
+    """Drop triggers on expenses for the load; upgrade_schema() recreates them and rebuilds the rollup."""
+    with database.get_engine().begin() as conn:
+        names = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'expenses'"
+        )).scalars().all()
+        for name in names:
+            conn.execute(text(f'DROP TRIGGER "{name}"'))
+
+
+def _expense_rows(rng: random.Random, n: int, category_ids: dict[str, int], end: date):
+    """Yield n expense dicts. Recent years are denser; amounts are log-normal per category."""
+    names = list(PROFILE)
+    weights = [PROFILE[name][0] for name in names]
+    span = YEARS * 365
+    for i in range(n):
+        name = rng.choices(names, weights)[0]
+        _, median, merchants = PROFILE[name]
+        # Squaring skews offsets towards 0, i.e. towards recent dates
+        offset = int(span * rng.random() ** 2)
+        yield {
+            "title": f"{rng.choice(merchants)} #{rng.randint(1, 999)}",
+            "amount": round(median * math.exp(rng.gauss(0, 0.6)), 2),
+            "date": end - timedelta(days=offset),
+            "category_id": category_ids[name],
+        }
+
+
+def generate(path: str, n_expenses: int, seed: int = 42, end: date = date(2025, 12, 31), quiet: bool = False) -> str:
+    """Create a benchmark database at `path` with n_expenses expenses plus subscriptions and budgets."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    database.configure_engine(f"sqlite:///{path}", profile="bulk")
+    database.init_db()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    with database.get_engine().connect() as conn:
+        category_ids = dict(conn.execute(text("SELECT name, id FROM categories")).fetchall())
+    _drop_expense_triggers()
+
+    rows = _expense_rows(rng, n_expenses, category_ids, end)
+    done = 0
+    while done < n_expenses:
+        chunk = [next(rows) for _ in range(min(CHUNK_SIZE, n_expenses - done))]
+        with database.get_engine().begin() as conn:
+            conn.execute(insert(Expense), chunk)
+        done += len(chunk)
+        if not quiet:
+            print(f"  {done}/{n_expenses} expenses ({done / (time.perf_counter() - started):.0f} rows/sec)")
+
+    # Subscriptions: mostly monthly, some yearly/weekly, a few every N days
+    n_subs = max(20, min(2000, n_expenses // 5000))
+    frequencies = ["monthly"] * 7 + ["yearly"] * 2 + ["weekly", "days"]
+    subs = []
+    for i in range(n_subs):
+        frequency = rng.choice(frequencies)
+        subs.append({
+            "name": f"Subscription {i}",
+            "amount": round(rng.choice([4.99, 9.99, 12.99, 15.99, 49.0, 99.0]) * (12 if frequency == "yearly" else 1), 2),
+            "next_date": end + timedelta(days=rng.randint(1, 60)),
+            "frequency": frequency,
+            "interval": rng.choice([1, 1, 1, 2, 3]) if frequency != "days" else rng.choice([10, 14, 30]),
+            "anchor_day": None,
+            "category_id": category_ids[rng.choice(["Entertainment", "Utilities", "Health", "Other"])],
+        })
+    for sub in subs:
+        sub["anchor_day"] = sub["next_date"].day
+
+    with database.get_engine().begin() as conn:
+        conn.execute(insert(Subscription), subs)
+        # Budgets for every month, around the month's actual spend (some exceeded)
+        monthly = conn.execute(text(
+            "SELECT substr(date, 1, 7), SUM(amount) FROM expenses GROUP BY substr(date, 1, 7)"
+        )).fetchall()
+        budgets = [{"month": ym, "limit": round(spent * rng.uniform(0.85, 1.3), -1) or 100.0} for ym, spent in monthly]
+        if budgets:
+            conn.execute(insert(Budget), budgets)
+
+    database.upgrade_schema()
+    rebuild_title_index()
+    with database.get_engine().connect() as conn:
+        conn.execute(text("ANALYZE"))
+    if not quiet:
+        print(f"Generated {path}: {n_expenses} expenses, {n_subs} subscriptions, {len(budgets)} budgets "
+              f"in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic FinTrack database for benchmarks")
+    parser.add_argument("--size", choices=SIZES, default="10k")
+    parser.add_argument("--rows", type=int, help="number of expenses (overrides --size)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="database path (default: benchmarks/data/fintrack_<size>.db)")
+    args = parser.parse_args()
+    generate(args.output or default_path(args.size), args.rows or SIZES[args.size], args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+FinTrack Pro - Benchmark suite
+Times every public module entry point against a generated database:
+  python benchmarks/run_benchmarks.py --size 10k --output results.json
+  python benchmarks/run_benchmarks.py --size 10k --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import cache
+import database
+from generate_data import SIZES, default_path, generate
+
+DEFAULT_REPEAT = 20
+DEFAULT_THRESHOLD = 0.20
+
+
+def _cases(ref: date) -> list[tuple[str, callable]]:
+    """(name, zero-argument callable) for each public entry point, with realistic arguments."""
+    import budget_module
+    import expense_module
+    import report_module
+    import search_module
+    import subscription_module
+
+    month = ref.strftime("%Y-%m")
+    year_start = date(ref.year - 1, ref.month, 1)
+    month_start = date(ref.year, ref.month, 1)
+    horizon_end = date(ref.year + 5, ref.month, 1)
+    first_month = f"{ref.year - 2:04d}-{ref.month:02d}"
+    pivot_start = f"{ref.year - 1:04d}-{ref.month + 1:02d}" if ref.month < 12 else f"{ref.year:04d}-01"
+
+    def add_and_delete():
+        expense = expense_module.add_expense("Benchmark", 1.0, ref, 1)
+        expense_module.delete_expense(expense.id)
+
+    def set_budget_same():
+        budget = budget_module.get_budget(month)
+        budget_module.set_budget(month, budget.limit if budget else 1000.0)
+
+    return [
+        ("report.category_analytics", report_module.category_analytics),
+        ("report.category_analytics_for_month", lambda: report_module.category_analytics_for_month(month)),
+        ("report.total_spending", report_module.total_spending),
+        ("report.total_spending_for_month", lambda: report_module.total_spending_for_month(month)),
+        ("report.pivot_report.12m", lambda: report_module.pivot_report(pivot_start, month)),
+        ("search.search_by_date", lambda: search_module.search_by_date(ref)),
+        ("search.search_by_date_range.month", lambda: search_module.search_by_date_range(month_start, ref)),
+        ("search.search_by_date_range.year", lambda: search_module.search_by_date_range(year_start, ref)),
+        ("search.iter_by_date_range.year", lambda: sum(1 for _ in search_module.iter_by_date_range(year_start, ref))),
+        ("search.iter_by_date_range.first_row", lambda: next(search_module.iter_by_date_range(year_start, ref), None)),
+        ("search.search_by_title.prefix", lambda: search_module.search_by_title("ub*")),
+        ("search.search_by_title.range", lambda: search_module.search_by_title("uber", year_start, ref)),
+        ("budget.check_budget_alert", lambda: budget_module.check_budget_alert(month)),
+        ("budget.get_budget", lambda: budget_module.get_budget(month)),
+        ("budget.budget_status_range.24m", lambda: budget_module.budget_status_range(first_month, month)),
+        ("budget.list_all_budgets", budget_module.list_all_budgets),
+        ("budget.set_budget", set_budget_same),
+        ("expense.list_recent_expenses", lambda: expense_module.list_recent_expenses(20)),
+        ("expense.iter_recent_expenses.200", lambda: sum(1 for _ in zip(range(200), expense_module.iter_recent_expenses()))),
+        ("expense.get_expense_by_id", lambda: expense_module.get_expense_by_id(1)),
+        ("expense.add_and_delete", add_and_delete),
+        ("subscription.list_subscriptions", subscription_module.list_subscriptions),
+        ("subscription.forecast_by_month.5y", lambda: subscription_module.forecast_by_month(month_start, horizon_end)),
+        ("subscription.forecast_occurrences.1y", lambda: subscription_module.forecast_occurrences(month_start, date(ref.year + 1, ref.month, 1))),
+        ("subscription.process_due_subscriptions", lambda: subscription_module.process_due_subscriptions(ref)),
+    ]
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(q) - 1]
+
+
+def _reset_caches():
+    """Drop in-process result caches so a cold call really goes to the database."""
+    cache.clear()
+
+
+def run(db_path: str, repeat: int = DEFAULT_REPEAT, only: str = None, use_cache: bool = False) -> dict:
+    """
+    Benchmark each case: cold (fresh engine), warm p50/p95 over `repeat` calls, peak memory.
+    The result cache is off unless use_cache, so warm timings measure the queries.
+    """
+    cache.set_enabled(use_cache)
+    database.configure_engine(f"sqlite:///{db_path}")
+    database.init_db()
+    with database.get_engine().connect() as conn:
+        rows = conn.exec_driver_sql("SELECT COUNT(*), MAX(date) FROM expenses").fetchone()
+    ref = date.fromisoformat(rows[1]) if rows[1] else date.today()
+
+    results = {}
+    for name, fn in _cases(ref):
+        if only and only not in name:
+            continue
+        # Cold: new engine, so a new connection with an empty SQLite page cache
+        # (the OS file cache is not dropped)
+        database.configure_engine(f"sqlite:///{db_path}")
+        _reset_caches()
+        started = time.perf_counter()
+        fn()
+        cold = time.perf_counter() - started
+
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            "cold_ms": round(cold * 1000, 3),
+            "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+            "peak_kb": round(peak / 1024, 1),
+            "calls": repeat,
+        }
+        print(f"  {name:<45} cold {results[name]['cold_ms']:>9.2f} ms  p50 {results[name]['p50_ms']:>9.2f} ms  "
+              f"p95 {results[name]['p95_ms']:>9.2f} ms  peak {results[name]['peak_kb']:>9.1f} KiB")
+
+    return {
+        "meta": {
+            "database": os.path.abspath(db_path),
+            "expenses": rows[0],
+            "repeat": repeat,
+            "cache": use_cache,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[tuple]:
+    """
+    Cases whose p50 got slower than baseline by more than `threshold`
+    (0.20 = 20%), as (name, baseline_p50_ms, current_p50_ms, ratio).
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if not old or old["p50_ms"] <= 0:
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"]
+        if ratio > 1 + threshold:
+            regressions.append((name, old["p50_ms"], result["p50_ms"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FinTrack module functions")
+    parser.add_argument("--size", choices=SIZES, default="10k", help="generated data set to use")
+    parser.add_argument("--db", help="benchmark an existing database instead (it is modified by write cases)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache on for warm calls")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="flag p50 slowdowns above this fraction (default 0.20)")
+    args = parser.parse_args()
+
+    db_path = args.db or default_path(args.size)
+    if not args.db and not os.path.exists(db_path):
+        print(f"Generating {args.size} data set...")
+        generate(db_path, SIZES[args.size], quiet=True)
+
+    print(f"Benchmarking {db_path}")
+    current = run(db_path, args.repeat, args.only, args.cache)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if not regressions:
+            print(f"No regressions above {args.threshold:.0%} against {args.compare}")
+            return 0
+        print(f"Regressions above {args.threshold:.0%} against {args.compare}:")
+        for name, old, new, ratio in regressions:
+            print(f"  {name:<45} {old:>9.2f} ms -> {new:>9.2f} ms  (x{ratio:.2f})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
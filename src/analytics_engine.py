@@ -0,0 +1,303 @@
+"""
+FinTrack Pro - Analytics Engine
+In-memory, column-oriented copy of the expenses table for running many
+report variants back to back (optional: requires NumPy)
+"""
+
+from datetime import date, timedelta
+from sqlalchemy import text
+import sync_module
+from database import get_session
+from report_module import month_bounds
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+EPOCH = date(1970, 1, 1)
+FETCH_SIZE = 50000
+BUCKETS = ("day", "week", "month", "year")
+# (id, date as days since 1970-01-01, amount, category_id)
+_EXPENSE_COLUMNS = "id, CAST(julianday(date) - 2440587.5 AS INTEGER), amount, category_id"
+
+
+def _to_days(d: date) -> int:
+    """Date -> days since 1970-01-01."""
+    return (d - EPOCH).days
+
+
+class AnalyticsEngine:
+    """
+    Loads expenses once into NumPy columns (id, date as int days, amount,
+    category code) and answers group-by queries with vectorized operations.
+    Results have the same shapes as the report_module functions.
+
+    Call refresh() after writes: it re-reads the expenses the change log
+    shows were inserted, updated or deleted since the last load.
+    """
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("AnalyticsEngine requires NumPy: pip install numpy")
+        self._pending = []
+        self.reload()
+
+    # ---- loading ----
+
+    def reload(self):
+        """Full reload of categories and expenses (one bulk read)."""
+        self._category_names = []
+        self._code_of = {}
+        session = get_session()
+        try:
+            self._load_categories(session)
+            # Same transaction as the expenses read: changes after this seq are not in it
+            self._seq = sync_module._last_seq(session)
+            result = session.execute(text(f"SELECT {_EXPENSE_COLUMNS} FROM expenses ORDER BY id"))
+            chunks = []
+            while True:
+                rows = result.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                chunks.append(self._columns(rows))
+        finally:
+            session.close()
+        self._pending = []
+        if chunks:
+            self._ids, self._days, self._amounts, self._codes = (
+                np.concatenate([c[i] for c in chunks]) for i in range(4)
+            )
+        else:
+            self._ids = np.empty(0, dtype=np.int64)
+            self._days = np.empty(0, dtype=np.int32)
+            self._amounts = np.empty(0, dtype=np.float64)
+            self._codes = np.empty(0, dtype=np.int32)
+
+    def _load_categories(self, session) -> bool:
+        """
+        Pick up new and renamed categories; new ones get the next codes, so
+        loaded rows keep theirs. Returns False (and changes nothing) if a
+        loaded category was deleted: its rows must go, which needs a reload.
+        """
+        categories = session.execute(text("SELECT id, name FROM categories ORDER BY id")).fetchall()
+        names = dict(categories)
+        if any(cid not in names for cid in self._code_of):
+            return False
+        for cid, name in categories:
+            if cid in self._code_of:
+                self._category_names[self._code_of[cid]] = name
+            else:
+                self._code_of[cid] = len(self._category_names)
+                self._category_names.append(name)
+        return True
+
+    def _columns(self, rows):
+        """
+        Convert (id, days, amount, category_id) rows to four NumPy arrays.
+        Rows whose category no longer exists are dropped, as the SQL reports
+        drop them in their JOIN with categories.
+        """
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        days = np.fromiter((r[1] for r in rows), dtype=np.int32, count=len(rows))
+        amounts = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+        codes = np.fromiter((self._code_of.get(r[3], -1) for r in rows), dtype=np.int32, count=len(rows))
+        known = codes >= 0
+        if not known.all():
+            return ids[known], days[known], amounts[known], codes[known]
+        return ids, days, amounts, codes
+
+    def append(self, expense_id: int, amount: float, expense_date: date, category_id: int):
+        """Add one expense that was just written (buffered until the next query)."""
+        if category_id not in self._code_of:
+            self.refresh()  # picks up the new category, and the row from the change log
+            return
+        self._pending.append((expense_id, _to_days(expense_date), float(amount), category_id))
+
+    def refresh(self) -> int:
+        """
+        Bring the engine up to date without a full reload when possible.
+        Expenses with change_log entries since the last load or refresh are
+        dropped from the columns and read again by id (deleted ones are gone).
+        A full reload happens only if the log was compacted past that point,
+        a year was archived or restored (those moves do not log their rows)
+        or a loaded category was deleted.
+        Returns the number of changed expenses, or -1 after a full reload.
+        """
+        self._flush()
+        session = get_session()
+        try:
+            seq = sync_module._last_seq(session)
+            params = {"since": self._seq}
+            stale = (
+                not self._load_categories(session)
+                or self._seq < sync_module._compacted_through(session)
+                or session.execute(text(
+                    "SELECT EXISTS (SELECT 1 FROM change_log WHERE tbl = 'archives' AND seq > :since)"
+                ), params).scalar()
+            )
+            if not stale:
+                changed = session.execute(text(
+                    "SELECT DISTINCT row_id FROM change_log WHERE tbl = 'expenses' AND seq > :since"
+                ), params).scalars().all()
+                rows = session.execute(text(f"""
+                    SELECT {_EXPENSE_COLUMNS} FROM expenses
+                    WHERE id IN (SELECT row_id FROM change_log WHERE tbl = 'expenses' AND seq > :since)
+                    ORDER BY id
+                """), params).fetchall()
+        finally:
+            session.close()
+        if stale:
+            self.reload()
+            return -1
+        self._seq = seq
+        if changed:
+            keep = ~np.isin(self._ids, np.array(changed, dtype=np.int64))
+            self._ids, self._days, self._amounts, self._codes = (
+                column[keep] for column in (self._ids, self._days, self._amounts, self._codes)
+            )
+            if rows:
+                self._extend(self._columns(rows))
+        return len(changed)
+
+    def _extend(self, columns):
+        self._ids, self._days, self._amounts, self._codes = (
+            np.concatenate([old, new])
+            for old, new in zip((self._ids, self._days, self._amounts, self._codes), columns)
+        )
+
+    def _flush(self):
+        """Merge buffered append() rows into the columns."""
+        if self._pending:
+            rows, self._pending = self._pending, []
+            self._extend(self._columns(rows))
+
+    # ---- queries ----
+
+    def _mask(self, start_date: date = None, end_date: date = None):
+        """Boolean mask for start_date <= date <= end_date (None = all rows)."""
+        self._flush()
+        if start_date is None and end_date is None:
+            return None
+        mask = np.ones(len(self._days), dtype=bool)
+        if start_date is not None:
+            mask &= self._days >= _to_days(start_date)
+        if end_date is not None:
+            mask &= self._days <= _to_days(end_date)
+        return mask
+
+    def _select(self, mask, *columns):
+        return columns if mask is None else tuple(c[mask] for c in columns)
+
+    @staticmethod
+    def _month_range(year_month: str) -> tuple[date, date]:
+        """Inclusive (first day, last day) of a month (YYYY-MM)."""
+        start, end = month_bounds(year_month)
+        return date.fromisoformat(start), date.fromisoformat(end) - timedelta(days=1)
+
+    def category_analytics(self, start_date: date = None, end_date: date = None) -> list[tuple[str, float]]:
+        """Category totals, largest first (same shape as report_module.category_analytics)."""
+        amounts, codes = self._select(self._mask(start_date, end_date), self._amounts, self._codes)
+        totals = np.bincount(codes, weights=amounts, minlength=len(self._category_names))
+        counts = np.bincount(codes, minlength=len(self._category_names))
+        rows = [(self._category_names[i], float(totals[i])) for i in np.nonzero(counts)[0]]
+        return sorted(rows, key=lambda r: r[1], reverse=True)
+
+    def category_analytics_for_month(self, year_month: str) -> list[tuple[str, float]]:
+        """Category totals for one month (YYYY-MM)."""
+        return self.category_analytics(*self._month_range(year_month))
+
+    def total_spending(self, start_date: date = None, end_date: date = None) -> float:
+        """Sum of amounts, optionally within a date range."""
+        (amounts,) = self._select(self._mask(start_date, end_date), self._amounts)
+        return float(amounts.sum())
+
+    def total_spending_for_month(self, year_month: str) -> float:
+        """Total spending for one month (YYYY-MM)."""
+        return self.total_spending(*self._month_range(year_month))
+
+    def category_counts(self, start_date: date = None, end_date: date = None) -> list[tuple[str, int]]:
+        """Number of expenses per category, largest first."""
+        (codes,) = self._select(self._mask(start_date, end_date), self._codes)
+        counts = np.bincount(codes, minlength=len(self._category_names))
+        rows = [(self._category_names[i], int(counts[i])) for i in np.nonzero(counts)[0]]
+        return sorted(rows, key=lambda r: r[1], reverse=True)
+
+    def category_means(self, start_date: date = None, end_date: date = None) -> list[tuple[str, float]]:
+        """Average expense amount per category, largest first."""
+        amounts, codes = self._select(self._mask(start_date, end_date), self._amounts, self._codes)
+        totals = np.bincount(codes, weights=amounts, minlength=len(self._category_names))
+        counts = np.bincount(codes, minlength=len(self._category_names))
+        rows = [(self._category_names[i], float(totals[i] / counts[i])) for i in np.nonzero(counts)[0]]
+        return sorted(rows, key=lambda r: r[1], reverse=True)
+
+    def percentiles(self, q=(50, 90, 95), start_date: date = None, end_date: date = None,
+                    by_category: bool = False):
+        """
+        Amount percentiles. Returns {q: value}, or with by_category=True
+        {category_name: {q: value}} for categories with at least one row.
+        """
+        amounts, codes = self._select(self._mask(start_date, end_date), self._amounts, self._codes)
+        q = list(q)
+        if not by_category:
+            if not len(amounts):
+                return {}
+            return dict(zip(q, (float(v) for v in np.percentile(amounts, q))))
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        bounds = np.searchsorted(sorted_codes, np.arange(len(self._category_names) + 1))
+        result = {}
+        for code, name in enumerate(self._category_names):
+            lo, hi = bounds[code], bounds[code + 1]
+            if hi > lo:
+                values = np.percentile(amounts[order[lo:hi]], q)
+                result[name] = dict(zip(q, (float(v) for v in values)))
+        return result
+
+    def bucket_totals(self, bucket: str = "month", start_date: date = None, end_date: date = None,
+                      by_category: bool = False) -> list[tuple]:
+        """
+        Time-bucketed totals as (label, total) pairs in time order, or
+        (label, category_name, total) with by_category=True. Labels are
+        YYYY-MM-DD (day), YYYY-Www (ISO week), YYYY-MM (month) or YYYY (year).
+        Only buckets with expenses are returned.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        days, amounts, codes = self._select(self._mask(start_date, end_date), self._days, self._amounts, self._codes)
+        if bucket == "day":
+            keys = days.astype(np.int64)
+        elif bucket == "week":
+            keys = (days - (days + 3) % 7).astype(np.int64)  # Monday of the week (1970-01-01 is a Thursday)
+        elif bucket == "month":
+            keys = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        else:
+            keys = days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+        ncat = len(self._category_names)
+        if by_category:
+            keys = keys * ncat + codes
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=amounts)
+        result = []
+        for key, total in zip(uniq.tolist(), totals.tolist()):
+            if by_category:
+                key, code = divmod(key, ncat)
+                result.append((self._bucket_label(bucket, key), self._category_names[code], total))
+            else:
+                result.append((self._bucket_label(bucket, key), total))
+        return result
+
+    @staticmethod
+    def _bucket_label(bucket: str, key: int) -> str:
+        if bucket == "day":
+            return (EPOCH + timedelta(days=key)).isoformat()
+        if bucket == "week":
+            year, week, _ = (EPOCH + timedelta(days=key)).isocalendar()
+            return f"{year:04d}-W{week:02d}"
+        if bucket == "month":
+            year, month = divmod(key, 12)
+            return f"{year + 1970:04d}-{month + 1:02d}"
+        return f"{key + 1970:04d}"
+
+    def __len__(self):
+        return len(self._ids) + len(self._pending)
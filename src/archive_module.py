@@ -0,0 +1,377 @@
+"""
+FinTrack Pro - Archive Module
+Move closed years of expenses into per-year SQLite files, attach them on
+demand and route date-bounded expense queries to the partitions they overlap
+
+The live database keeps a registry of archived years (archives) and their
+month x category totals (archive_rollup), so reports read the
+expense_rollup_all view and never open an archive file. Only row-level
+queries (search_module) attach archives, and only those whose year falls
+inside the requested date range.
+
+Archived expenses are read-only: update and delete work on the live
+database. Expenses added later for an archived year stay in the live
+database (and are found by searches and reports) until that year is
+archived again, which merges them into the existing file.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+import cache
+import database
+from instrumentation import instrumented
+from read_models import ARCHIVE_COLUMNS, ArchiveRow, archive_rows
+
+# Archive files go next to the live database unless FINTRACK_ARCHIVE_DIR is set
+ARCHIVE_DIR = os.environ.get("FINTRACK_ARCHIVE_DIR")
+SCHEMA_PREFIX = "archive_"
+# Schema name used while archive_year / restore_year write or read the file
+_WORK_SCHEMA = "archive_work"
+# Connection-record info key: {schema: path} of archives attached to that connection
+_ATTACHED_KEY = "fintrack_archives"
+# SQLite's compile-time default, for drivers that cannot report the limit
+_DEFAULT_ATTACH_LIMIT = 10
+
+# Same columns and indexes as the live expenses table; category names stay in the live database
+ARCHIVE_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {_WORK_SCHEMA}.expenses (
+        id INTEGER PRIMARY KEY,
+        title VARCHAR(200) NOT NULL,
+        amount FLOAT NOT NULL,
+        date DATE NOT NULL,
+        category_id INTEGER NOT NULL,
+        duplicate_of INTEGER
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS {_WORK_SCHEMA}.ix_expenses_date ON expenses (date)",
+    f"CREATE INDEX IF NOT EXISTS {_WORK_SCHEMA}.ix_expenses_category_date ON expenses (category_id, date)",
+]
+# Stored in each archive file's PRAGMA user_version. Bump it when ARCHIVE_DDL
+# changes and bring older files up to date in _upgrade_archive.
+ARCHIVE_SCHEMA_VERSION = 2
+ARCHIVE_FTS_DDL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {_WORK_SCHEMA}.expense_fts USING fts5(
+        title, content='expenses', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+_COPY_TO_ARCHIVE_SQL = [
+    f"""
+    INSERT INTO {_WORK_SCHEMA}.expenses (id, title, amount, date, category_id, duplicate_of)
+    SELECT m.id, m.title, m.amount, m.date, m.category_id, m.duplicate_of
+    FROM main.expenses m
+    WHERE m.date >= :start AND m.date < :end
+      AND NOT EXISTS (SELECT 1 FROM {_WORK_SCHEMA}.expenses a WHERE a.id = m.id)
+    """,
+    # SQLite reuses the highest ids after a delete, so a row added after an
+    # earlier archive run can carry the id of an archived one: it gets a new id.
+    # (Rows already copied by an interrupted run are identical and skipped.)
+    f"""
+    INSERT INTO {_WORK_SCHEMA}.expenses (title, amount, date, category_id, duplicate_of)
+    SELECT m.title, m.amount, m.date, m.category_id, m.duplicate_of
+    FROM main.expenses m
+    JOIN {_WORK_SCHEMA}.expenses a ON a.id = m.id
+    WHERE m.date >= :start AND m.date < :end
+      AND (a.title IS NOT m.title OR a.amount IS NOT m.amount
+           OR a.date IS NOT m.date OR a.category_id IS NOT m.category_id)
+    """,
+]
+
+# Same two steps in the other direction, for restore_year
+_COPY_TO_LIVE_SQL = [
+    f"""
+    INSERT INTO main.expenses (id, title, amount, date, category_id, duplicate_of, updated_at)
+    SELECT a.id, a.title, a.amount, a.date, a.category_id, a.duplicate_of, {database.UPDATED_AT_SQL}
+    FROM {_WORK_SCHEMA}.expenses a
+    WHERE NOT EXISTS (SELECT 1 FROM main.expenses m WHERE m.id = a.id)
+    """,
+    f"""
+    INSERT INTO main.expenses (title, amount, date, category_id, duplicate_of, updated_at)
+    SELECT a.title, a.amount, a.date, a.category_id, a.duplicate_of, {database.UPDATED_AT_SQL}
+    FROM {_WORK_SCHEMA}.expenses a
+    JOIN main.expenses m ON m.id = a.id
+    WHERE a.title IS NOT m.title OR a.amount IS NOT m.amount
+       OR a.date IS NOT m.date OR a.category_id IS NOT m.category_id
+    """,
+]
+
+
+def _live_path(engine=None) -> str:
+    url = (engine or database.get_engine()).url
+    if database.is_memory_url(str(url)):
+        raise ValueError("Archives need a database file, not an in-memory database")
+    return os.path.abspath(url.database)
+
+
+def archive_path(year: int, engine=None) -> str:
+    """File for `year`'s archive: <live name>-<year>.archive.db, next to the live database."""
+    live = _live_path(engine)
+    directory = ARCHIVE_DIR or os.path.dirname(live)
+    stem = os.path.splitext(os.path.basename(live))[0]
+    return os.path.join(directory, f"{stem}-{year:04d}.archive.db")
+
+
+def _resolve(path: str, engine=None) -> str:
+    """Registry path -> absolute path (relative paths are relative to the live database)."""
+    return path if os.path.isabs(path) else os.path.join(os.path.dirname(_live_path(engine)), path)
+
+
+def _registry_path(path: str, engine=None) -> str:
+    """Absolute path -> what the registry stores, relative when the file sits next to the live database."""
+    if os.path.dirname(path) == os.path.dirname(_live_path(engine)):
+        return os.path.basename(path)
+    return path
+
+
+def _year_of(value) -> int:
+    """Year of a date or ISO date string."""
+    return value.year if isinstance(value, date) else int(str(value)[:4])
+
+
+def _attach_limit(dbapi_connection) -> int:
+    getlimit = getattr(dbapi_connection, "getlimit", None)  # Python 3.11+ sqlite3 only
+    return getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) if getlimit else _DEFAULT_ATTACH_LIMIT
+
+
+def _attach(conn, needed: dict[str, str]):
+    """
+    Make sure the schemas in `needed` ({schema: path}) are attached to `conn`.
+    Attachments stay on the pooled connection for later queries; when
+    SQLite's attach limit is reached, archives not needed now are detached.
+    """
+    record = conn.connection
+    attached = record.info.setdefault(_ATTACHED_KEY, {})
+    missing = [schema for schema, path in needed.items() if attached.get(schema) != path]
+    if not missing:
+        return
+    limit = _attach_limit(record.dbapi_connection)
+    for schema in list(attached):
+        if len(attached) + len(missing) <= limit:
+            break
+        if schema in needed:
+            continue
+        try:
+            conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+            del attached[schema]
+        except OperationalError:
+            pass  # read earlier in the current transaction; stays attached until it ends
+    if len(attached) + len(missing) > limit:
+        raise ValueError(
+            f"The date range spans {len(needed)} archived years but only {limit} archives "
+            f"can be attached at once; narrow the range or restore some years"
+        )
+    for schema in missing:
+        path = needed[schema]
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Archive file is missing: {path}")
+        if schema in attached:
+            conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+        conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (path,))
+        attached[schema] = path
+
+
+def partitions(session, start_date=None, end_date=None) -> list[str]:
+    """
+    Schemas holding expenses dated between start_date and end_date
+    (dates or ISO strings; None leaves that end open): "main" first, then
+    one attached schema per archived year the range overlaps.
+    The registry is read in the session's own transaction, so the result
+    is consistent with the rows that transaction sees.
+    """
+    first = _year_of(start_date) if start_date is not None else None
+    last = _year_of(end_date) if end_date is not None else None
+    needed = {}
+    for year, path in session.execute(text("SELECT year, path FROM archives ORDER BY year")):
+        if (first is None or year >= first) and (last is None or year <= last):
+            needed[f"{SCHEMA_PREFIX}{year}"] = _resolve(path)
+    if not needed:
+        return ["main"]
+    _attach(session.connection(), needed)
+    return ["main", *needed]
+
+
+def routed_sql(session, arm: str, order_by: str, start_date=None, end_date=None, paged: bool = False) -> str:
+    """
+    SQL running `arm` (a SELECT with {schema} in front of its expenses and
+    expense_fts tables) on every partition the date range overlaps, merged
+    with UNION ALL and sorted by `order_by` (result column names).
+    With paged, :limit and :offset apply to the merged rows, and each
+    partition contributes at most :limit + :offset of them.
+    Without archives in range this is just the arm on the live database.
+    """
+    schemas = partitions(session, start_date, end_date)
+    page = " LIMIT :limit OFFSET :offset" if paged else ""
+    if len(schemas) == 1:
+        return f"{arm.format(schema='main')} ORDER BY {order_by}{page}"
+    inner = f" ORDER BY {order_by} LIMIT :limit + :offset" if paged else ""
+    union = " UNION ALL ".join(f"SELECT * FROM ({arm.format(schema=s)}{inner})" for s in schemas)
+    return f"{union} ORDER BY {order_by}{page}"
+
+
+def _registered_path(conn, year: int) -> str | None:
+    path = conn.execute(text("SELECT path FROM archives WHERE year = :year"), {"year": year}).scalar()
+    return _resolve(path, conn.engine) if path else None
+
+
+def _upgrade_archive(conn):
+    """Create the attached archive's tables, or bring an older archive file up to ARCHIVE_SCHEMA_VERSION."""
+    if conn.exec_driver_sql(f"PRAGMA {_WORK_SCHEMA}.user_version").scalar() >= ARCHIVE_SCHEMA_VERSION:
+        return
+    for ddl in ARCHIVE_DDL:
+        conn.execute(text(ddl))
+    columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA {_WORK_SCHEMA}.table_info(expenses)")}
+    if "duplicate_of" not in columns:  # version 1 files
+        conn.exec_driver_sql(f"ALTER TABLE {_WORK_SCHEMA}.expenses ADD COLUMN duplicate_of INTEGER")
+    conn.exec_driver_sql(f"PRAGMA {_WORK_SCHEMA}.user_version = {ARCHIVE_SCHEMA_VERSION}")
+
+
+def _remove_file(path: str):
+    for name in (path, path + "-journal"):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def _log_move(conn, op: str, year: int, data: dict = None):
+    """
+    One change_log entry for a whole archive (I) or restore (D) of `year`;
+    the moved rows themselves are not logged (see sync_module).
+    """
+    conn.execute(text("INSERT INTO change_log (tbl, op, row_id, data) VALUES ('archives', :op, :year, :data)"),
+                 {"op": op, "year": year, "data": json.dumps(data) if data is not None else None})
+
+
+def _archive_year(engine, year: int, log: bool = True) -> dict:
+    if year >= date.today().year:
+        raise ValueError(f"Only closed years can be archived ({year} is not over yet)")
+    params = {"start": f"{year:04d}-01-01", "end": f"{year + 1:04d}-01-01", "year": f"{year:04d}"}
+    with engine.connect() as live:
+        # First statement writes, so the write lock is taken before anything is copied
+        live.execute(text("DELETE FROM archive_rollup WHERE substr(year_month, 1, 4) = :year"), params)
+        path = _registered_path(live, year)
+        if path is None:
+            path = archive_path(year, engine)
+            _remove_file(path)  # left over from an interrupted run: the live rows are still complete
+
+        with engine.connect() as copy:
+            copy.exec_driver_sql(f"ATTACH DATABASE ? AS {_WORK_SCHEMA}", (path,))
+            try:
+                _upgrade_archive(copy)
+                moved = 0
+                for sql in _COPY_TO_ARCHIVE_SQL:
+                    moved += copy.execute(text(sql), params).rowcount
+                try:
+                    copy.execute(text(ARCHIVE_FTS_DDL))
+                    copy.execute(text(f"INSERT INTO {_WORK_SCHEMA}.expense_fts (expense_fts) VALUES ('rebuild')"))
+                except OperationalError as e:
+                    if "fts5" not in str(e):
+                        raise
+                copy.commit()
+            finally:
+                copy.rollback()
+                copy.exec_driver_sql(f"DETACH DATABASE {_WORK_SCHEMA}")
+
+        live.exec_driver_sql(f"ATTACH DATABASE ? AS {_WORK_SCHEMA}", (path,))
+        try:
+            live.execute(text(f"""
+                INSERT INTO archive_rollup (year_month, category_id, total, count)
+                SELECT substr(date, 1, 7), category_id, SUM(amount), COUNT(*)
+                FROM {_WORK_SCHEMA}.expenses
+                GROUP BY substr(date, 1, 7), category_id
+            """))
+            count, total = live.execute(text(
+                f"SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM {_WORK_SCHEMA}.expenses"
+            )).one()
+            with database.triggers_paused(live, "change_log", "budget_alerts"):
+                live.execute(text("DELETE FROM main.expenses WHERE date >= :start AND date < :end"), params)
+            live.execute(text("""
+                INSERT OR REPLACE INTO archives (year, path, expense_count, total, archived_at)
+                VALUES (:year, :path, :count, :total, :today)
+            """), {"year": year, "path": _registry_path(path, engine), "count": count, "total": total,
+                   "today": date.today().isoformat()})
+            if log:
+                _log_move(live, "I", year, {"year": year, "expense_count": count, "total": total})
+            live.commit()
+        finally:
+            live.rollback()
+            live.exec_driver_sql(f"DETACH DATABASE {_WORK_SCHEMA}")
+    return {"year": year, "path": path, "moved": moved, "expenses": count, "total": float(total)}
+
+
+def _restore_year(engine, year: int, log: bool = True) -> dict:
+    with engine.connect() as live:
+        path = _registered_path(live, year)
+        if path is None:
+            raise LookupError(f"Year {year} is not archived")
+        if not os.path.exists(path):
+            # ATTACH would create an empty file and the year would be restored empty
+            raise FileNotFoundError(f"Archive file is missing: {path}")
+        live.exec_driver_sql(f"ATTACH DATABASE ? AS {_WORK_SCHEMA}", (path,))
+        try:
+            # Unregistering first takes the write lock and hides the archive from routing
+            live.execute(text("DELETE FROM archives WHERE year = :year"), {"year": year})
+            _upgrade_archive(live)
+            restored = 0
+            with database.triggers_paused(live, "change_log", "budget_alerts"):
+                for sql in _COPY_TO_LIVE_SQL:
+                    restored += live.execute(text(sql)).rowcount
+            live.execute(text("DELETE FROM archive_rollup WHERE substr(year_month, 1, 4) = :year"),
+                         {"year": f"{year:04d}"})
+            if log:
+                _log_move(live, "D", year)
+            live.commit()
+        finally:
+            live.rollback()
+            live.exec_driver_sql(f"DETACH DATABASE {_WORK_SCHEMA}")
+    # Pooled connections may still have the file attached
+    engine.dispose()
+    _remove_file(path)
+    return {"year": year, "restored": restored}
+
+
+@instrumented
+def archive_year(year: int) -> dict:
+    """
+    Move all expenses dated in `year` (which must be over) from the live
+    database into its archive file, creating the file or merging into it.
+    Returns { "year", "path", "moved", "expenses", "total" } where expenses
+    and total describe the whole archive afterwards.
+
+    Runs in its own transactions, outside any unit_of_work: the rows are
+    first committed to the archive, then deleted from the live database in
+    the transaction that registers the archive. The live database's write
+    lock is held throughout, so no write can slip in between. If the
+    process dies in the middle, the live database is unchanged and
+    running archive_year again finishes the job. The change log gets one
+    entry for the move, which replicas replay by archiving the year too.
+    """
+    result = _archive_year(database.get_engine(), int(year))
+    cache.clear()
+    return result
+
+
+@instrumented
+def restore_year(year: int) -> dict:
+    """
+    Move an archived year back into the live database and delete its
+    archive file. Rows keep their ids unless the live database has reused
+    one in the meantime. Returns { "year", "restored" }.
+    """
+    result = _restore_year(database.get_engine(), int(year))
+    cache.clear()
+    return result
+
+
+@instrumented
+def list_archives() -> list[ArchiveRow]:
+    """Archived years, oldest first, with their absolute file paths."""
+    session = database.get_session()
+    try:
+        rows = archive_rows(session.execute(text(f"SELECT {ARCHIVE_COLUMNS} FROM archives a ORDER BY a.year")))
+    finally:
+        session.close()
+    return [row._replace(path=_resolve(row.path)) for row in rows]
@@ -0,0 +1,235 @@
+"""
+FinTrack Pro - Async API
+asyncio counterparts of the expense, report and search module functions
+(optional: requires aiosqlite)
+
+The SQL is not duplicated: every function runs the sync module's query core
+(the underscore functions taking a session) through AsyncSession.run_sync,
+on an async engine configured with the same profile pragmas.
+
+Each call opens its own AsyncSession, so independent reads can be gathered
+and run on separate pooled connections:
+
+    totals = await asyncio.gather(*(total_spending_for_month(m) for m in months))
+
+To run several calls in one transaction, open a session yourself and pass it
+in; the functions then neither commit nor close it:
+
+    async with async_session() as session:
+        await add_expense("Rent", 900, date(2024, 5, 1), 3, session=session)
+        await add_expense("Power", 80, date(2024, 5, 2), 3, session=session)
+        await session.commit()
+
+An AsyncSession must not be shared between concurrently running tasks.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+import cache
+import database
+import expense_module
+import report_module
+import search_module
+from models import Expense
+from read_models import ExpenseRow, PivotReport, SeriesPoint
+
+try:
+    import aiosqlite  # noqa: F401  (driver for the sqlite+aiosqlite dialect)
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+except ImportError:  # optional dependency
+    aiosqlite = None
+
+async_engine = None
+AsyncSessionLocal = None
+
+
+def async_url(url: str) -> str:
+    """sqlite:///path -> sqlite+aiosqlite:///path"""
+    return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+
+
+def configure_async_engine(url: str = None, profile: str = None, **pragmas):
+    """
+    (Re)create the async engine. Defaults to the sync engine's current
+    database and DEFAULT_PROFILE; pragmas work as in configure_engine().
+    Call dispose() on the previous engine first if it was in use.
+    """
+    global async_engine, AsyncSessionLocal
+    if aiosqlite is None:
+        raise ImportError("async_api requires aiosqlite: pip install aiosqlite")
+    url = async_url(url or database.DATABASE_URL)
+    if database.is_memory_url(url):
+        # The async engine has its own connections, which would each see a different empty database
+        raise ValueError("async_api needs a database file, not an in-memory database")
+    settings = database.profile_settings(profile, **pragmas)
+    async_engine = create_async_engine(
+        url, connect_args={"check_same_thread": False}, poolclass=AsyncAdaptedQueuePool,
+        pool_size=database.POOL_SIZE, max_overflow=database.MAX_OVERFLOW,
+    )
+    database.install_connection_events(async_engine.sync_engine, settings)
+    # Objects stay readable after commit without another round trip
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+    return async_engine
+
+
+async def dispose():
+    """Close all pooled connections of the async engine."""
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+@asynccontextmanager
+async def async_session():
+    """A new AsyncSession, closed on exit (uncommitted work is rolled back)."""
+    if AsyncSessionLocal is None:
+        configure_async_engine()
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def _read(core, *args, session=None):
+    """Run a sync query core in `session`, or in a short-lived session of its own."""
+    if session is not None:
+        return await session.run_sync(core, *args)
+    async with async_session() as own:
+        return await own.run_sync(core, *args)
+
+
+async def _write(core, *args, session=None):
+    """Like _read, but commits (or rolls back) when it owns the session."""
+    if session is not None:
+        return await session.run_sync(core, *args)
+    async with async_session() as own:
+        try:
+            result = await own.run_sync(core, *args)
+            await own.commit()
+            return result
+        except Exception:
+            await own.rollback()
+            raise
+
+
+# ---- expenses ----
+
+async def add_expense(title: str, amount: float, expense_date: date, category_id: int,
+                      dedup: str = None, session=None) -> Expense:
+    """Add a new expense and return it (dedup as in expense_module.add_expense)."""
+    return await _write(expense_module._add_expense, title, amount, expense_date, category_id, dedup,
+                        session=session)
+
+
+async def update_expense(expense_id: int, title: str = None, amount: float = None,
+                         expense_date: date = None, category_id: int = None, session=None) -> Expense | None:
+    """Update the given fields of an expense; None if it does not exist."""
+    return await _write(expense_module._update_expense, expense_id, title, amount, expense_date, category_id,
+                        session=session)
+
+
+async def delete_expense(expense_id: int, session=None) -> bool:
+    """Delete an expense by ID. Returns False if not found."""
+    return await _write(expense_module._delete_expense, expense_id, session=session)
+
+
+async def get_expense_by_id(expense_id: int, session=None) -> ExpenseRow | None:
+    return await _read(expense_module._get_expense_by_id, expense_id, session=session)
+
+
+async def list_recent_expenses(limit: int = 20, session=None) -> list[ExpenseRow]:
+    return await _read(expense_module._list_recent_expenses, limit, session=session)
+
+
+async def iter_recent_expenses(batch_size: int = 200):
+    """Async generator over expenses newest first as ExpenseRow (keyset pages)."""
+    last = None
+    while True:
+        page = await _read(expense_module._recent_page, last, batch_size)
+        for expense in page:
+            yield expense
+        if len(page) < batch_size:
+            return
+        last = (page[-1].date, page[-1].id)
+
+
+# ---- reports ----
+
+async def category_analytics(session=None) -> list[tuple[str, float]]:
+    return await _read(report_module._category_analytics, session=session)
+
+
+async def category_analytics_for_month(year_month: str, session=None) -> list[tuple[str, float]]:
+    return await _read(report_module._category_analytics_for_month, year_month, session=session)
+
+
+async def total_spending(session=None) -> float:
+    return await _read(report_module._total_spending, session=session)
+
+
+async def total_spending_for_month(year_month: str, session=None) -> float:
+    return await _read(report_module._total_spending_for_month, year_month, session=session)
+
+
+async def category_analytics_for_months(months: list[str]) -> dict[str, list[tuple[str, float]]]:
+    """Category totals for several months (YYYY-MM), read concurrently: {month: rows}."""
+    results = await asyncio.gather(*(category_analytics_for_month(m) for m in months))
+    return dict(zip(months, results))
+
+
+async def spending_series(start_date: date, end_date: date, bucket: str = "month", by_category: bool = False,
+                          session=None) -> list[SeriesPoint]:
+    return await _read(report_module._spending_series, start_date, end_date, bucket, by_category, session=session)
+
+
+async def pivot_report(start_month: str, end_month: str, period: str = "month", session=None) -> PivotReport:
+    return await _read(report_module._pivot_report, start_month, end_month, period, session=session)
+
+
+async def verify_rollup(tolerance: float = 0.005, session=None) -> dict:
+    return await _read(report_module._verify_rollup, tolerance, session=session)
+
+
+async def rebuild_rollup() -> int:
+    """Recompute expense_rollup. Returns the number of rollup rows."""
+    async with async_session() as session:
+        try:
+            await session.run_sync(report_module._rebuild_rollup)
+            await session.commit()
+            cache.clear()
+        except Exception:
+            await session.rollback()
+            raise
+        return await session.run_sync(report_module._rollup_row_count)
+
+
+# ---- search ----
+
+async def search_by_date(expense_date: date, session=None) -> list[ExpenseRow]:
+    return await _read(search_module._search_by_date, expense_date, session=session)
+
+
+async def search_by_date_range(start_date: date, end_date: date, session=None) -> list[ExpenseRow]:
+    return await _read(search_module._search_by_date_range, start_date, end_date, session=session)
+
+
+async def iter_by_date_range(start_date: date, end_date: date, batch_size: int = search_module.DEFAULT_BATCH_SIZE):
+    """Async generator over expenses in a date range, ordered by (date, id), in keyset pages."""
+    params = {"last_date": start_date.isoformat(), "last_id": 0, "end": end_date.isoformat(), "limit": batch_size}
+    while True:
+        rows = await _read(search_module._date_range_page, dict(params))
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            return
+        params["last_date"], params["last_id"] = rows[-1].date.isoformat(), rows[-1].id
+
+
+async def search_by_title(query: str, start_date: date = None, end_date: date = None,
+                          category_id: int = None, limit: int = 20, offset: int = 0, session=None) -> list[ExpenseRow]:
+    return await _read(search_module._search_by_title, query, start_date, end_date, category_id, limit, offset,
+                       session=session)
+
+
+async def rebuild_title_index():
+    await _write(search_module._rebuild_title_index)
+    cache.clear()
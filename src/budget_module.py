@@ -1,14 +1,33 @@
 """
 FinTrack Pro - Budget Module
-Set monthly limit, compare with spending, alert when exceeded
+Set monthly limits (overall and per category), compare with spending, alert
+when exceeded or when a category budget threshold is crossed
 """
 
+import json
+import warnings
+from contextvars import ContextVar
+from sqlalchemy import event, text
 from sqlalchemy.orm import Session
+import cache
+import database
 from database import get_session
-from models import Budget
-from report_module import total_spending_for_month
+from instrumentation import instrumented
+from models import Budget, CategoryBudget
+from read_models import (
+    BUDGET_ALERT_COLUMNS, BUDGET_COLUMNS, CATEGORY_BUDGET_COLUMNS, BudgetAlertRow, BudgetRow, CategoryBudgetRow,
+    budget_alert_rows, budget_rows, category_budget_rows,
+)
+from report_module import months_between
 
+DEFAULT_THRESHOLDS = (0.8, 1.0)
 
+_alert_callbacks = []
+# Set while alerts are being dispatched, so the dispatch's own commit does not dispatch again
+_dispatching: ContextVar[bool] = ContextVar("fintrack_budget_dispatching", default=False)
+
+
+@instrumented
 def set_budget(month: str, limit: float) -> Budget:
     """Set or update monthly budget (month format: YYYY-MM)."""
     session = get_session()
@@ -29,24 +48,22 @@ def set_budget(month: str, limit: float) -> Budget:
         session.close()
 
 
-def get_budget(month: str) -> Budget | None:
+@instrumented
+def get_budget(month: str) -> BudgetRow | None:
     """Get budget for a month (YYYY-MM)."""
     session = get_session()
     try:
-        return session.query(Budget).filter(Budget.month == month).first()
+        rows = budget_rows(session.execute(
+            text(f"SELECT {BUDGET_COLUMNS} FROM budgets b WHERE b.month = :month"), {"month": month}
+        ))
+        return rows[0] if rows else None
     finally:
         session.close()
 
 
-def check_budget_alert(month: str) -> dict:
-    """
-    Compare spending with budget for the month.
-    Returns: { "month", "limit", "spent", "remaining", "exceeded", "message" }
-    """
-    budget = get_budget(month)
-    spent = total_spending_for_month(month)
-
-    if not budget:
+def _budget_status(month: str, limit: float | None, spent: float) -> dict:
+    """Build the status dict returned by check_budget_alert."""
+    if limit is None:
         return {
             "month": month,
             "limit": None,
@@ -56,7 +73,6 @@ def check_budget_alert(month: str) -> dict:
             "message": f"No budget set for {month}. Total spent: {spent:.2f}",
         }
 
-    limit = budget.limit
     remaining = limit - spent
     exceeded = spent > limit
 
@@ -75,10 +91,285 @@ def check_budget_alert(month: str) -> dict:
     }
 
 
-def list_all_budgets():
-    """List all budget records."""
+@instrumented
+@cache.cached(lambda months: ("budgets", *(cache.month_scope(m) for m in months)))
+def budget_status_for_months(months: list[str]) -> list[dict]:
+    """
+    Budget status for many months (YYYY-MM) in one query: the month list is
+    joined against budgets and the per-month spend from expense_rollup_all
+    (archived years included).
+    Returns one check_budget_alert-style dict per distinct month, in order.
+    """
+    months = sorted(set(months))
+    if not months:
+        return []
+    values = ", ".join(f"(:m{i})" for i in range(len(months)))
+    sql = text(f"""
+        WITH m(month) AS (VALUES {values})
+        SELECT m.month, b."limit", COALESCE(s.spent, 0) AS spent
+        FROM m
+        LEFT JOIN budgets b ON b.month = m.month
+        LEFT JOIN (
+            SELECT year_month, SUM(total) AS spent
+            FROM expense_rollup_all
+            WHERE year_month IN (SELECT month FROM m)
+            GROUP BY year_month
+        ) s ON s.year_month = m.month
+        ORDER BY m.month
+    """)
+    session = get_session()
+    try:
+        rows = session.execute(sql, {f"m{i}": m for i, m in enumerate(months)}).fetchall()
+    finally:
+        session.close()
+    return [_budget_status(month, limit, float(spent)) for month, limit, spent in rows]
+
+
+@instrumented
+def budget_status_range(start_month: str, end_month: str) -> list[dict]:
+    """Budget status for every month from start_month to end_month inclusive."""
+    return budget_status_for_months(months_between(start_month, end_month))
+
+
+@instrumented
+def check_budget_alert(month: str) -> dict:
+    """
+    Compare spending with budget for the month.
+    Returns: { "month", "limit", "spent", "remaining", "exceeded", "message" }
+    """
+    return budget_status_for_months([month])[0]
+
+
+@instrumented
+def list_all_budgets() -> list[BudgetRow]:
+    """List all budget records, newest month first."""
     session = get_session()
     try:
-        return session.query(Budget).order_by(Budget.month.desc()).all()
+        return budget_rows(session.execute(text(f"SELECT {BUDGET_COLUMNS} FROM budgets b ORDER BY b.month DESC")))
     finally:
         session.close()
+
+
+# ---- per-category budgets ----
+#
+# Spending per (month, category) is already kept current by the expense_rollup
+# triggers; the budget alert triggers (database.BUDGET_ALERT_TRIGGERS) compare
+# it with category_budgets after every change, inside the writing transaction.
+
+def _thresholds_json(thresholds) -> str:
+    levels = sorted({float(t) for t in thresholds})
+    if not levels or levels[0] <= 0:
+        raise ValueError("thresholds must be positive fractions of the limit, e.g. (0.8, 1.0)")
+    return json.dumps(levels)
+
+
+def _evaluate_alerts(session, month: str, category_id: int):
+    """Raise or clear alerts for one (month, category) after its budget changed."""
+    for sql in database.budget_alert_sql(":month", ":category_id"):
+        session.execute(text(sql), {"month": month, "category_id": category_id})
+
+
+@instrumented
+def set_category_budget(month: str, category_id: int, limit: float,
+                        thresholds=DEFAULT_THRESHOLDS) -> CategoryBudget:
+    """
+    Set or update a category's budget for a month (YYYY-MM). `thresholds`
+    are fractions of the limit (default 80% and 100%); reaching one raises a
+    budget alert. Spending already past a threshold raises it right away.
+    """
+    limit = float(limit)
+    if limit <= 0:
+        raise ValueError("limit must be positive")
+    levels = _thresholds_json(thresholds)
+    session = get_session()
+    try:
+        budget = session.query(CategoryBudget).filter(
+            CategoryBudget.month == month, CategoryBudget.category_id == int(category_id)
+        ).first()
+        if budget:
+            budget.limit = limit
+            budget.thresholds = levels
+        else:
+            budget = CategoryBudget(month=month, category_id=int(category_id), limit=limit, thresholds=levels)
+            session.add(budget)
+        session.flush()
+        _evaluate_alerts(session, month, int(category_id))
+        session.commit()
+        session.refresh(budget)
+        return budget
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+@instrumented
+def delete_category_budget(month: str, category_id: int) -> bool:
+    """Remove a category budget (its open alerts are cleared). Returns False if there was none."""
+    session = get_session()
+    try:
+        budget = session.query(CategoryBudget).filter(
+            CategoryBudget.month == month, CategoryBudget.category_id == int(category_id)
+        ).first()
+        if not budget:
+            return False
+        session.delete(budget)
+        session.flush()
+        _evaluate_alerts(session, month, int(category_id))
+        session.commit()
+        return True
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+@instrumented
+def list_category_budgets(month: str) -> list[CategoryBudgetRow]:
+    """Category budgets of a month (YYYY-MM), by category name."""
+    session = get_session()
+    try:
+        return category_budget_rows(session.execute(text(f"""
+            SELECT {CATEGORY_BUDGET_COLUMNS}
+            FROM category_budgets cb
+            LEFT JOIN categories c ON c.id = cb.category_id
+            WHERE cb.month = :month
+            ORDER BY c.name
+        """), {"month": month}))
+    finally:
+        session.close()
+
+
+@instrumented
+@cache.cached(lambda month: ("budgets", cache.month_scope(month)))
+def category_budget_status(month: str) -> list[dict]:
+    """
+    Limit, spent, remaining and thresholds reached for each category budget
+    of a month (YYYY-MM), spend read from expense_rollup_all.
+    Returns: [{ "month", "category_id", "category", "limit", "spent", "remaining",
+    "percent", "exceeded", "thresholds", "reached" }]
+    """
+    session = get_session()
+    try:
+        rows = session.execute(text(f"""
+            SELECT {CATEGORY_BUDGET_COLUMNS}, COALESCE(s.spent, 0)
+            FROM category_budgets cb
+            LEFT JOIN categories c ON c.id = cb.category_id
+            LEFT JOIN (
+                SELECT category_id, SUM(total) AS spent
+                FROM expense_rollup_all
+                WHERE year_month = :month
+                GROUP BY category_id
+            ) s ON s.category_id = cb.category_id
+            WHERE cb.month = :month
+            ORDER BY c.name
+        """), {"month": month}).fetchall()
+    finally:
+        session.close()
+    status = []
+    for budget, spent in zip(category_budget_rows(row[:6] for row in rows), (float(row[6]) for row in rows)):
+        status.append({
+            "month": budget.month,
+            "category_id": budget.category_id,
+            "category": budget.category_name,
+            "limit": budget.limit,
+            "spent": spent,
+            "remaining": budget.limit - spent,
+            "percent": spent / budget.limit * 100,
+            "exceeded": spent > budget.limit,
+            "thresholds": list(budget.thresholds),
+            "reached": [t for t in budget.thresholds if spent >= budget.limit * t],
+        })
+    return status
+
+
+@instrumented
+def list_budget_alerts(month: str = None, open_only: bool = False) -> list[BudgetAlertRow]:
+    """Budget alerts, newest first; optionally one month's, or only those not cleared yet."""
+    filters, params = [], {}
+    if month:
+        filters.append("a.month = :month")
+        params["month"] = month
+    if open_only:
+        filters.append("a.cleared_at IS NULL")
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    session = get_session()
+    try:
+        return budget_alert_rows(session.execute(text(f"""
+            SELECT {BUDGET_ALERT_COLUMNS}
+            FROM budget_alerts a
+            LEFT JOIN categories c ON c.id = a.category_id
+            {where}
+            ORDER BY a.id DESC
+        """), params))
+    finally:
+        session.close()
+
+
+def on_budget_alert(callback):
+    """
+    Register callback(alert: BudgetAlertRow), called once per threshold
+    crossing after the write that crossed it has committed. Returns the
+    callback, so it can be used as a decorator.
+    """
+    _alert_callbacks.append(callback)
+    return callback
+
+
+def remove_budget_alert_callback(callback):
+    _alert_callbacks.remove(callback)
+
+
+@instrumented
+def dispatch_budget_alerts() -> list[BudgetAlertRow]:
+    """
+    Hand every alert not notified yet to the registered callbacks. Alerts are
+    claimed with one UPDATE of notified_at before the callbacks run, so each
+    goes out once, also with several processes on the database. Runs by
+    itself after every commit while callbacks are registered.
+    Returns the alerts dispatched.
+    """
+    if not _alert_callbacks:
+        return []
+    token = _dispatching.set(True)
+    # A session of its own, never the caller's unit of work
+    session = database.SessionLocal()
+    try:
+        if session.execute(text("SELECT 1 FROM budget_alerts WHERE notified_at IS NULL LIMIT 1")).first() is None:
+            return []
+        ids = session.execute(text(f"""
+            UPDATE budget_alerts SET notified_at = {database.UPDATED_AT_SQL}
+            WHERE notified_at IS NULL
+            RETURNING id
+        """)).scalars().all()
+        alerts = budget_alert_rows(session.execute(text(f"""
+            SELECT {BUDGET_ALERT_COLUMNS}
+            FROM budget_alerts a
+            LEFT JOIN categories c ON c.id = a.category_id
+            WHERE a.id IN (SELECT value FROM json_each(:ids))
+            ORDER BY a.id
+        """), {"ids": json.dumps(ids)}))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+        _dispatching.reset(token)
+    for alert in alerts:
+        for callback in list(_alert_callbacks):
+            callback(alert)
+    return alerts
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_after_commit(session):
+    if not _alert_callbacks or _dispatching.get() or session.in_nested_transaction():
+        return
+    try:
+        dispatch_budget_alerts()
+    except Exception as e:
+        # The write has committed; a failing callback must not look like a failed write
+        warnings.warn(f"Budget alert dispatch failed: {e}")
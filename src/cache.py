@@ -0,0 +1,209 @@
+"""
+FinTrack Pro - Result Cache
+In-process LRU + TTL cache for report, search, budget and forecast results,
+invalidated by per-scope generation counters that writes bump on commit
+"""
+
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import Budget, Category, CategoryBudget, Expense, Subscription
+
+# FINTRACK_CACHE=0 turns the cache off; set_enabled() switches it at runtime
+ENABLED = os.environ.get("FINTRACK_CACHE", "1") != "0"
+MAX_ENTRIES = int(os.environ.get("FINTRACK_CACHE_SIZE", "1024"))
+# Bounds staleness from writes this process cannot see (other processes on the same file)
+DEFAULT_TTL = float(os.environ.get("FINTRACK_CACHE_TTL", "60"))
+
+_PENDING_KEY = "fintrack_cache_scopes"
+
+_lock = threading.Lock()
+_entries: OrderedDict = OrderedDict()  # key -> (expires_at, scopes, generations, value)
+_generations: dict[str, int] = {}
+_stats = {"hits": 0, "misses": 0, "stale": 0, "expired": 0, "evictions": 0}
+# Set while a unit of work is open: its reads may see uncommitted rows, so they bypass the cache
+_bypass: ContextVar[bool] = ContextVar("fintrack_cache_bypass", default=False)
+
+
+def month_scope(d) -> str:
+    """Scope for expenses of one month: expenses:YYYY-MM (d is a date or an ISO string)."""
+    return "expenses:" + (d.isoformat() if isinstance(d, date) else str(d))[:7]
+
+
+def expense_scopes(dates) -> set[str]:
+    """Scopes a write to expenses on `dates` invalidates: all-time results plus each month."""
+    return {"expenses"} | {month_scope(d) for d in dates if d}
+
+
+def bump(*scopes: str):
+    """Invalidate every cached result that depends on any of `scopes`."""
+    with _lock:
+        for scope in scopes:
+            _generations[scope] = _generations.get(scope, 0) + 1
+
+
+def invalidate_on_commit(session, *scopes: str):
+    """
+    Bump `scopes` once `session`'s transaction commits (for writes done with
+    raw SQL, which the ORM flush hook below cannot see). Discarded on rollback.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).update(scopes)
+
+
+def clear():
+    """Drop all cached results."""
+    with _lock:
+        _entries.clear()
+
+
+def set_enabled(enabled: bool):
+    global ENABLED
+    ENABLED = bool(enabled)
+    if not ENABLED:
+        clear()
+
+
+def stats() -> dict:
+    """Hit/miss counters plus current size; hit_rate is hits / lookups."""
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "entries": len(_entries),
+            "max_entries": MAX_ENTRIES,
+            "hit_rate": _stats["hits"] / lookups if lookups else 0.0,
+            "enabled": ENABLED,
+        }
+
+
+def reset_stats():
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+@contextmanager
+def bypass():
+    """Neither read nor fill the cache inside this block (used by unit_of_work)."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def _freeze(value):
+    """Hashable form of an argument (lists and dicts become tuples)."""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _copy(value):
+    """Fresh containers for the caller, so mutating a result cannot corrupt the cache."""
+    if isinstance(value, list):
+        return [dict(v) if isinstance(v, dict) else v for v in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def cached(scopes, ttl: float = None):
+    """
+    Decorator caching a function's result per arguments.
+    `scopes` is a tuple of scope names, or a function of the call's
+    arguments returning them; the entry is valid until one of those scopes
+    is bumped, the TTL passes, or it is evicted as least recently used.
+    """
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        lifetime = DEFAULT_TTL if ttl is None else ttl
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED or _bypass.get():
+                return fn(*args, **kwargs)
+            key = (name, _freeze(args), _freeze(kwargs))
+            now = time.monotonic()
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None:
+                    expires_at, entry_scopes, generations, value = entry
+                    if now >= expires_at:
+                        _stats["expired"] += 1
+                        del _entries[key]
+                    elif generations != tuple(_generations.get(s, 0) for s in entry_scopes):
+                        _stats["stale"] += 1
+                        del _entries[key]
+                    else:
+                        _stats["hits"] += 1
+                        _entries.move_to_end(key)
+                        return _copy(value)
+                _stats["misses"] += 1
+                call_scopes = tuple(scopes(*args, **kwargs) if callable(scopes) else scopes)
+                # Taken before the query runs: a write committed meanwhile makes this entry stale
+                generations = tuple(_generations.get(s, 0) for s in call_scopes)
+            value = fn(*args, **kwargs)
+            with _lock:
+                _entries[key] = (now + lifetime, call_scopes, generations, _copy(value))
+                _entries.move_to_end(key)
+                while len(_entries) > MAX_ENTRIES:
+                    _entries.popitem(last=False)
+                    _stats["evictions"] += 1
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+# ---- ORM write tracking: every flushed change is mapped to the scopes it affects ----
+
+def _scopes_of(obj) -> set[str]:
+    if isinstance(obj, Expense):
+        dates = {obj.date}
+        history = inspect(obj).attrs.date.history
+        dates.update(history.deleted or ())
+        return expense_scopes(dates)
+    if isinstance(obj, (Budget, CategoryBudget)):
+        return {"budgets"}
+    if isinstance(obj, Subscription):
+        return {"subscriptions"}
+    if isinstance(obj, Category):
+        return {"categories"}
+    return set()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session, flush_context):
+    # new / dirty / deleted and attribute history still show the pre-flush state here
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        pending.update(_scopes_of(obj))
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session):
+    if session.in_nested_transaction():
+        return  # savepoint released: wait for the real COMMIT
+    scopes = session.info.pop(_PENDING_KEY, None)
+    if scopes:
+        if "categories" in scopes:
+            clear()  # category names appear in almost every cached result
+        bump(*scopes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    # A savepoint rollback keeps the pending scopes; bumping a few too many is harmless
+    if not session.in_nested_transaction():
+        session.info.pop(_PENDING_KEY, None)
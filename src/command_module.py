@@ -0,0 +1,359 @@
+"""
+FinTrack Pro - Command Module
+Scripted commands for main.py: one function per menu action, taking plain
+keyword arguments and returning JSON-serialisable results, plus a JSONL
+batch runner that executes many commands over one shared connection
+"""
+
+import json
+from datetime import date, timedelta
+from database import unit_of_work
+
+DEFAULT_COMMIT_EVERY = 1000
+
+
+def _date(value) -> date | None:
+    """ISO date string (or date) -> date; None passes through."""
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def _today() -> date:
+    return date.today()
+
+
+def _expense(e) -> dict:
+    return {
+        "id": e.id, "title": e.title, "amount": e.amount, "date": e.date.isoformat(),
+        "category_id": e.category_id, "category": getattr(e, "category_name", None),
+    }
+
+
+def _search_row(r) -> dict:
+    return {"id": r[0], "title": r[1], "amount": r[2], "date": str(r[3]), "category": r[4]}
+
+
+def _subscription(s) -> dict:
+    return {
+        "id": s.id, "name": s.name, "amount": s.amount, "next_date": s.next_date.isoformat(),
+        "frequency": s.frequency, "interval": s.interval,
+        "end_date": s.end_date.isoformat() if s.end_date else None, "category_id": s.category_id,
+    }
+
+
+def cmd_add(title: str, amount: float, category_id: int, date: str = None, dedup: str = None) -> dict:
+    """With dedup, skip / merge return the existing expense and flag reports duplicate_of."""
+    from expense_module import add_expense
+    expense = add_expense(title, float(amount), _date(date) or _today(), int(category_id), dedup)
+    result = _expense(expense)
+    if dedup:
+        result["duplicate_of"] = expense.duplicate_of
+    return result
+
+
+def cmd_update(id: int, title: str = None, amount: float = None, date: str = None, category_id: int = None) -> dict:
+    from expense_module import update_expense
+    expense = update_expense(int(id), title, amount, _date(date), category_id)
+    if expense is None:
+        raise LookupError(f"Expense {id} not found")
+    return _expense(expense)
+
+
+def cmd_delete(id: int) -> dict:
+    from expense_module import delete_expense
+    if not delete_expense(int(id)):
+        raise LookupError(f"Expense {id} not found")
+    return {"deleted": int(id)}
+
+
+def cmd_recent(limit: int = 20) -> list[dict]:
+    from expense_module import list_recent_expenses
+    return [_expense(e) for e in list_recent_expenses(int(limit))]
+
+
+def cmd_search(date: str = None, end: str = None, title: str = None, start: str = None,
+               category_id: int = None, limit: int = 20, offset: int = 0) -> list[dict]:
+    """Search by title (with optional start/end/category filters) or by date / date range."""
+    if title:
+        from search_module import search_by_title
+        rows = search_by_title(title, _date(start), _date(end), category_id, int(limit), int(offset))
+    elif date and end:
+        from search_module import search_by_date_range
+        rows = search_by_date_range(_date(date), _date(end))
+    elif date:
+        from search_module import search_by_date
+        rows = search_by_date(_date(date))
+    else:
+        raise ValueError("search needs 'title' or 'date'")
+    return [_search_row(r) for r in rows]
+
+
+def cmd_analytics(month: str = None) -> dict:
+    from report_module import category_analytics, category_analytics_for_month, total_spending, total_spending_for_month
+    if month:
+        rows, total = category_analytics_for_month(month), total_spending_for_month(month)
+    else:
+        rows, total = category_analytics(), total_spending()
+    return {"categories": [{"category": name, "total": tot} for name, tot in rows], "total": total}
+
+
+def cmd_series(start: str, end: str, bucket: str = "month", by_category: bool = False) -> list[dict]:
+    """Spending per day / week / month / quarter / year, optionally per category."""
+    from report_module import spending_series
+    return [
+        {"start": p.start.isoformat(), "label": p.label, "total": p.total, "count": p.count,
+         **({"category_id": p.category_id, "category": p.category_name} if by_category else {})}
+        for p in spending_series(_date(start), _date(end), bucket, bool(by_category))
+    ]
+
+
+def cmd_pivot(start: str, end: str, period: str = "month", csv: str = None):
+    """Category x period matrix (YYYY-MM range) with totals and changes; with csv, written there ("-" = stdout)."""
+    from report_module import pivot_report, write_pivot_csv
+    report = pivot_report(start, end, period)
+    if csv:
+        return {"path": csv, "rows": write_pivot_csv(report, csv)}
+    return {
+        "period": report.period,
+        "labels": list(report.labels),
+        "starts": [d.isoformat() for d in report.starts],
+        "rows": [row._asdict() for row in report.rows],
+        "totals": report.totals._asdict(),
+    }
+
+
+def cmd_budget(action: str, month: str = None, limit: float = None, end: str = None, category_id: int = None,
+               thresholds=None, by_category: bool = False, open_only: bool = False):
+    """
+    Actions: set (month, limit; with category_id a category budget, optional
+    thresholds), delete (month, category_id), status (month, optional end
+    month for a range, or by_category for the month's category budgets),
+    alerts (optional month).
+    """
+    import budget_module
+    if action == "alerts":
+        return [row._asdict() for row in budget_module.list_budget_alerts(month, bool(open_only))]
+    if not month:
+        raise ValueError(f"budget {action} needs 'month'")
+    if action == "set":
+        if limit is None:
+            raise ValueError("budget set needs 'limit'")
+        if category_id is not None:
+            if isinstance(thresholds, str):
+                thresholds = [t for t in thresholds.split(",") if t.strip()]
+            budget = budget_module.set_category_budget(
+                month, int(category_id), float(limit), thresholds or budget_module.DEFAULT_THRESHOLDS
+            )
+            return {"month": budget.month, "category_id": budget.category_id, "limit": budget.limit,
+                    "thresholds": json.loads(budget.thresholds)}
+        budget = budget_module.set_budget(month, float(limit))
+        return {"month": budget.month, "limit": budget.limit}
+    if action == "delete":
+        if category_id is None:
+            raise ValueError("budget delete needs 'category_id'")
+        return {"deleted": budget_module.delete_category_budget(month, int(category_id))}
+    if action == "status":
+        if by_category:
+            return budget_module.category_budget_status(month)
+        return budget_module.budget_status_range(month, end or month)
+    raise ValueError(f"Unknown budget action '{action}'")
+
+
+def cmd_subscriptions(action: str, id: int = None, name: str = None, amount: float = None, next_date: str = None,
+                      frequency: str = "monthly", interval: int = 1, end_date: str = None,
+                      category_id: int = None, months: int = 12):
+    """Actions: list, add, delete (id), forecast (months ahead), process-due."""
+    import subscription_module as subs
+    if action == "list":
+        return [_subscription(s) for s in subs.list_subscriptions()]
+    if action == "add":
+        if not name or amount is None or not next_date:
+            raise ValueError("subscriptions add needs 'name', 'amount' and 'next_date'")
+        return _subscription(subs.add_subscription(name, float(amount), _date(next_date), frequency or "monthly",
+                                                   int(interval or 1), _date(end_date), category_id))
+    if action == "delete":
+        if id is None or not subs.delete_subscription(int(id)):
+            raise LookupError(f"Subscription {id} not found")
+        return {"deleted": int(id)}
+    if action == "forecast":
+        start = _today()
+        year, month = divmod(start.year * 12 + start.month - 1 + int(months), 12)
+        end = date(year, month + 1, 1) - timedelta(days=1)
+        return [{"month": ym, "total": total} for ym, total in subs.forecast_by_month(start, end)]
+    if action == "process-due":
+        return subs.process_due_subscriptions()
+    raise ValueError(f"Unknown subscriptions action '{action}'")
+
+
+def cmd_import(path: str, chunk_size: int = 5000, dedup: str = None) -> dict:
+    from import_module import import_expenses
+    result = import_expenses(path, chunk_size=int(chunk_size), dedup=dedup)
+    result["errors"] = [{"line": line_no, "reason": reason} for line_no, reason in result["errors"]]
+    return result
+
+
+def cmd_export(kind: str, path: str, format: str = None, start: str = None, end: str = None,
+               category_id: int = None, incremental: bool = False, consumer: str = None,
+               batch_size: int = None) -> dict:
+    """Export expenses, subscriptions or budgets to CSV / JSONL / Parquet ("-" = stdout)."""
+    import export_module
+    return export_module.export(
+        kind, path, format, _date(start), _date(end), category_id, bool(incremental),
+        consumer or export_module.DEFAULT_CONSUMER, int(batch_size or export_module.DEFAULT_BATCH_SIZE),
+    )
+
+
+def cmd_archive(action: str, year: int = None):
+    """Actions: list, run (year), restore (year)."""
+    import archive_module
+    if action == "list":
+        return [row._asdict() for row in archive_module.list_archives()]
+    if year is None:
+        raise ValueError(f"archive {action} needs 'year'")
+    if action == "run":
+        return archive_module.archive_year(int(year))
+    if action == "restore":
+        return archive_module.restore_year(int(year))
+    raise ValueError(f"Unknown archive action '{action}'")
+
+
+def cmd_dedup(action: str, start: str = None, end: str = None, limit: int = None):
+    """Actions: scan (duplicate groups), flag (mark all but the oldest of each group)."""
+    import dedup_module
+    if action == "scan":
+        return [
+            {**cluster._asdict(), "date": cluster.date.isoformat()}
+            for cluster in dedup_module.find_duplicates(_date(start), _date(end), limit)
+        ]
+    if action == "flag":
+        return {"flagged": dedup_module.flag_duplicates(_date(start), _date(end))}
+    raise ValueError(f"Unknown dedup action '{action}'")
+
+
+def cmd_sync(action: str, path: str = None, seq: int = None, compact: bool = False, batch_size: int = None):
+    """Actions: status, push (replica path), snapshot (path), compact (seq)."""
+    import sync_module
+    if action == "status":
+        return sync_module.log_status()
+    if action == "compact":
+        if seq is None:
+            raise ValueError("sync compact needs 'seq'")
+        return {"deleted": sync_module.compact_log(int(seq))}
+    if not path:
+        raise ValueError(f"sync {action} needs 'path'")
+    if action == "push":
+        return sync_module.sync(path, int(batch_size or sync_module.DEFAULT_BATCH_SIZE))
+    if action == "snapshot":
+        return sync_module.snapshot(path, bool(compact))
+    raise ValueError(f"Unknown sync action '{action}'")
+
+
+COMMANDS = {
+    "add": cmd_add,
+    "update": cmd_update,
+    "delete": cmd_delete,
+    "recent": cmd_recent,
+    "search": cmd_search,
+    "analytics": cmd_analytics,
+    "series": cmd_series,
+    "pivot": cmd_pivot,
+    "budget": cmd_budget,
+    "subscriptions": cmd_subscriptions,
+    "import": cmd_import,
+    "archive": cmd_archive,
+    "dedup": cmd_dedup,
+    "export": cmd_export,
+    "sync": cmd_sync,
+}
+
+
+# archive and sync open their own connections (archive files, replicas) and
+# write to the live database there, which would wait on a batch group's own
+# write lock: run_batch commits the group before running them
+OWN_TRANSACTION_COMMANDS = ("archive", "sync")
+
+
+def execute(command: dict):
+    """Run one command dict ({"cmd": name, **arguments}) and return its result."""
+    args = {k: v for k, v in command.items() if k not in ("cmd", "ref") and v is not None}
+    name = command.get("cmd")
+    if name not in COMMANDS:
+        raise ValueError(f"Unknown command '{name}'. Choose from: {', '.join(COMMANDS)}")
+    return COMMANDS[name](**args)
+
+
+def run_command(command: dict) -> dict:
+    """Run one command and wrap the outcome as {"ok": True, "result"} or {"ok": False, "error"}."""
+    response = {"ref": command["ref"]} if "ref" in command else {}
+    try:
+        response.update(ok=True, result=execute(command))
+    except Exception as e:
+        response.update(ok=False, error=f"{type(e).__name__}: {e}")
+    return response
+
+
+def run_batch(lines, out, commit_every: int = DEFAULT_COMMIT_EVERY, stop_on_error: bool = False) -> dict:
+    """
+    Execute a JSONL stream of commands (one JSON object per line) and write
+    one JSON result per line to `out`. Commands share one session; every
+    `commit_every` commands are committed together, and their results are
+    written once that commit succeeded. A failed command is rolled back on
+    its own (each command runs in a savepoint) and reported; if a group's
+    commit fails, each of its commands is reported failed. Commands in
+    OWN_TRANSACTION_COMMANDS end the group: it is committed first and they
+    run on their own. With stop_on_error the batch stops at the first
+    failure, keeping earlier commits. Returns {"commands", "failed"}.
+    """
+    commit_every = max(1, int(commit_every))
+    stats = {"commands": 0, "failed": 0}
+
+    def write(responses):
+        for response in responses:
+            out.write(json.dumps(response, default=str) + "\n")
+            stats["commands"] += 1
+            stats["failed"] += not response["ok"]
+        out.flush()
+
+    numbered = enumerate(lines, 1)
+    done = False
+    while not done:
+        group, alone = [], None
+        try:
+            with unit_of_work():
+                for line_no, line in numbered:
+                    if not line.strip():
+                        continue
+                    try:
+                        command = json.loads(line)
+                        if not isinstance(command, dict):
+                            raise ValueError("each line must be a JSON object")
+                    except ValueError as e:
+                        response = {"line": line_no, "ok": False, "error": f"Invalid JSON: {e}"}
+                    else:
+                        if command.get("cmd") in OWN_TRANSACTION_COMMANDS:
+                            alone = command
+                            break
+                        response = run_command(command)
+                    group.append(response)
+                    if not response["ok"] and stop_on_error:
+                        done = True
+                        break
+                    if len(group) >= commit_every:
+                        break
+                else:
+                    done = True
+        except Exception as e:
+            # Nothing in the group was committed
+            error = f"Commit failed: {type(e).__name__}: {e}"
+            for response in group:
+                if response["ok"]:
+                    del response["result"]
+                    response.update(ok=False, error=error)
+            done = done or stop_on_error
+        write(group)
+        if alone is not None and not done:
+            response = run_command(alone)
+            write([response])
+            done = not response["ok"] and stop_on_error
+    return stats
@@ -4,26 +4,565 @@ SQLite + SQLAlchemy
 """
 
 import os
-from sqlalchemy import create_engine
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, StaticPool
+import cache
 from models import Base, Category
 
-# Database file in project root
+# Database file in project root (override with FINTRACK_DB=/path/to/file.db)
 DB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATABASE_URL = f"sqlite:///{os.path.join(DB_DIR, 'fintrack.db')}"
+DB_PATH = os.environ.get("FINTRACK_DB", os.path.join(DB_DIR, "fintrack.db"))
+DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLite pragmas applied to every new connection, by profile name.
+# cache_size is negative KiB; mmap_size is bytes.
+ENGINE_PROFILES = {
+    # WAL lets readers run alongside a writer; synchronous=NORMAL only fsyncs at checkpoints
+    "default": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    # Every commit is fsynced: survives power loss, slower writes
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    # Large one-off loads (imports, benchmarks): no fsync, big cache
+    "bulk": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    # SQLite defaults (rollback journal), e.g. for databases on network filesystems
+    "compat": {},
+}
+DEFAULT_PROFILE = os.environ.get("FINTRACK_DB_PROFILE", "default")
+
+# Connections are pooled and reused, so pragmas are paid once per connection,
+# not once per module call.
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+
+engine = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+_current_unit: ContextVar[Session | None] = ContextVar("fintrack_unit_of_work", default=None)
+
+
+def profile_settings(profile: str = None, **pragmas) -> dict:
+    """Pragmas for `profile` (default: DEFAULT_PROFILE) with keyword overrides."""
+    profile = profile or DEFAULT_PROFILE
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown engine profile '{profile}'. Choose from: {', '.join(ENGINE_PROFILES)}")
+    return {**ENGINE_PROFILES[profile], **pragmas}
+
+
+def install_connection_events(target_engine, settings: dict):
+    """
+    Apply `settings` as pragmas on every new connection and let SQLAlchemy
+    issue BEGIN itself. Shared by the sync engine and async_api's engine
+    (pass its .sync_engine).
+    """
+    @event.listens_for(target_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # pysqlite's implicit transactions break SAVEPOINT; SQLAlchemy begins instead
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    @event.listens_for(target_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+def is_memory_url(url: str) -> bool:
+    return ":memory:" in url or url.split("://", 1)[-1] in ("", "/")
+
+
+def configure_engine(url: str = None, profile: str = None, **pragmas):
+    """
+    (Re)create the engine for `url` with the pragmas of `profile`.
+    Keyword arguments override individual pragmas, e.g. synchronous="FULL".
+    Existing sessions keep their connection; new sessions use the new engine.
+    """
+    global engine, DATABASE_URL
+    url = url or DATABASE_URL
+    settings = profile_settings(profile, **pragmas)
+
+    if is_memory_url(url):
+        # One shared connection, otherwise every checkout would see an empty database
+        pool_args = {"poolclass": StaticPool}
+    else:
+        pool_args = {"poolclass": QueuePool, "pool_size": POOL_SIZE, "max_overflow": MAX_OVERFLOW}
+    new_engine = create_engine(url, echo=False, connect_args={"check_same_thread": False}, **pool_args)
+    install_connection_events(new_engine, settings)
+
+    if engine is not None:
+        engine.dispose()
+    engine = new_engine
+    DATABASE_URL = url
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_engine():
+    """Return the current engine (it is replaced by configure_engine)."""
+    return engine
+
+
+configure_engine()
+
+# Keep expense_rollup (year_month x category_id -> total, count) in step with
+# expenses inside the writing transaction, whichever code path does the write.
+ROLLUP_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert AFTER INSERT ON expenses
+    BEGIN
+        INSERT INTO expense_rollup (year_month, category_id, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.category_id, NEW.amount, 1)
+        ON CONFLICT (year_month, category_id)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete AFTER DELETE ON expenses
+    BEGIN
+        UPDATE expense_rollup SET total = total - OLD.amount, count = count - 1
+        WHERE year_month = substr(OLD.date, 1, 7) AND category_id = OLD.category_id;
+        DELETE FROM expense_rollup
+        WHERE year_month = substr(OLD.date, 1, 7) AND category_id = OLD.category_id AND count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_update
+    AFTER UPDATE OF amount, date, category_id ON expenses
+    BEGIN
+        UPDATE expense_rollup SET total = total - OLD.amount, count = count - 1
+        WHERE year_month = substr(OLD.date, 1, 7) AND category_id = OLD.category_id;
+        DELETE FROM expense_rollup
+        WHERE year_month = substr(OLD.date, 1, 7) AND category_id = OLD.category_id AND count <= 0;
+        INSERT INTO expense_rollup (year_month, category_id, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.category_id, NEW.amount, 1)
+        ON CONFLICT (year_month, category_id)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END
+    """,
+]
+
+
+# Trigger groups below can be switched off inside one transaction with
+# triggers_paused(): each trigger's WHEN clause probes trigger_pauses, which
+# is empty outside such a transaction.
+def _unless_paused(group: str) -> str:
+    return f"NOT EXISTS (SELECT 1 FROM trigger_pauses WHERE name = '{group}')"
+
+
+# updated_at stamps (UTC text, see models.utc_stamp) for incremental exports.
+# Inserts normally carry the stamp already (column default); the insert
+# trigger covers raw SQL that leaves it NULL. Updates are stamped here so
+# every write path is covered. Listing only the data columns keeps the
+# stamping UPDATE from firing the update trigger again.
+UPDATED_AT_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+TOUCH_COLUMNS = {
+    "expenses": ("title", "amount", "date", "category_id", "duplicate_of"),
+    "subscriptions": ("name", "amount", "next_date", "frequency", "interval", "end_date", "anchor_day", "category_id"),
+    "budgets": ("month", '"limit"'),
+    "category_budgets": ("month", "category_id", '"limit"', "thresholds"),
+}
+TOUCH_TRIGGERS = [
+    ddl
+    for table, columns in TOUCH_COLUMNS.items()
+    for ddl in (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_touch_insert AFTER INSERT ON {table}
+        WHEN NEW.updated_at IS NULL AND {_unless_paused("touch")}
+        BEGIN
+            UPDATE {table} SET updated_at = {UPDATED_AT_SQL} WHERE id = NEW.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_touch_update AFTER UPDATE OF {", ".join(columns)} ON {table}
+        WHEN {_unless_paused("touch")}
+        BEGIN
+            UPDATE {table} SET updated_at = {UPDATED_AT_SQL} WHERE id = NEW.id;
+        END
+        """,
+    )
+]
+
+# Append every write to expenses, subscriptions and (category) budgets to change_log in
+# the writing transaction (sync_module reads and replays it). Updates are
+# logged by the UPDATE OF updated_at trigger, which the touch triggers above
+# fire after any data column changes, so each update is logged once, with
+# the row's final values. Writes that only move rows (archive_module) or
+# replay another database's log (sync_module) pause the "change_log" group,
+# and replays also pause "touch" so rows keep the source's updated_at.
+CHANGE_LOG_COLUMNS = {table: ("id", *columns, "updated_at") for table, columns in TOUCH_COLUMNS.items()}
+
+
+def _row_json(table: str, alias: str) -> str:
+    pairs = ", ".join(f"'{column.strip(chr(34))}', {alias}.{column}" for column in CHANGE_LOG_COLUMNS[table])
+    return f"json_object({pairs})"
+
+
+CHANGE_LOG_TRIGGERS = [
+    ddl
+    for table in CHANGE_LOG_COLUMNS
+    for ddl in (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_log_insert AFTER INSERT ON {table}
+        WHEN {_unless_paused("change_log")}
+        BEGIN
+            INSERT INTO change_log (tbl, op, row_id, data) VALUES ('{table}', 'I', NEW.id, {_row_json(table, "NEW")});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_log_update AFTER UPDATE OF updated_at ON {table}
+        WHEN {_unless_paused("change_log")}
+        BEGIN
+            INSERT INTO change_log (tbl, op, row_id, data) VALUES ('{table}', 'U', NEW.id, {_row_json(table, "NEW")});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_log_delete AFTER DELETE ON {table}
+        WHEN {_unless_paused("change_log")}
+        BEGIN
+            INSERT INTO change_log (tbl, op, row_id, data) VALUES ('{table}', 'D', OLD.id, NULL);
+        END
+        """,
+    )
+]
+
+# Raise budget_alerts when a category's spending for a month reaches one of
+# its category_budgets thresholds, and clear open alerts when it falls back
+# below. The triggers run in the writing transaction after expense_rollup
+# changed, and only for (month, category) pairs that have a budget, so each
+# write pays a few index probes, never an aggregate over expenses.
+# budget_alert_sql() is also run directly when a budget is set or removed.
+# Writes that leave spending as it was (archive moves, a rollup rebuild)
+# pause the "budget_alerts" group so alerts are not cleared and raised again.
+_SPENT_SQL = (
+    "(SELECT COALESCE(SUM(r.total), 0) FROM expense_rollup_all r "
+    "WHERE r.year_month = {month} AND r.category_id = {category})"
+)
+
+
+def budget_alert_sql(month: str, category: str) -> list[str]:
+    """Clear-then-raise statements for one (month, category) pair, given as SQL expressions."""
+    spent = _SPENT_SQL.format(month=month, category=category)
+    return [
+        f"""
+        UPDATE budget_alerts SET cleared_at = {UPDATED_AT_SQL}
+        WHERE month = {month} AND category_id = {category} AND cleared_at IS NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM category_budgets b, json_each(b.thresholds) t
+              WHERE b.month = {month} AND b.category_id = {category}
+                AND t.value = budget_alerts.threshold AND {spent} >= b."limit" * t.value
+          )
+        """,
+        f"""
+        INSERT INTO budget_alerts (month, category_id, threshold, "limit", spent, created_at)
+        SELECT b.month, b.category_id, t.value, b."limit", s.spent, {UPDATED_AT_SQL}
+        FROM category_budgets b, json_each(b.thresholds) t, (SELECT {spent} AS spent) s
+        WHERE b.month = {month} AND b.category_id = {category} AND s.spent >= b."limit" * t.value
+          AND NOT EXISTS (
+              SELECT 1 FROM budget_alerts a
+              WHERE a.month = b.month AND a.category_id = b.category_id
+                AND a.threshold = t.value AND a.cleared_at IS NULL
+          )
+        """,
+    ]
+
+
+def _budget_alert_trigger(event: str, row: str) -> str:
+    body = ";\n".join(sql.strip() for sql in budget_alert_sql(f"{row}.year_month", f"{row}.category_id"))
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expense_rollup_budget_{event.split()[0].lower()} AFTER {event} ON expense_rollup
+    WHEN EXISTS (SELECT 1 FROM category_budgets WHERE month = {row}.year_month AND category_id = {row}.category_id)
+      AND {_unless_paused("budget_alerts")}
+    BEGIN
+        {body};
+    END
+    """
+
+
+BUDGET_ALERT_TRIGGERS = [
+    _budget_alert_trigger("INSERT", "NEW"),
+    _budget_alert_trigger("UPDATE OF total", "NEW"),
+    _budget_alert_trigger("DELETE", "OLD"),
+]
+
+# What reports read: live rollup plus the rollup of archived years (archive_module).
+# A month can appear in both when expenses were added to a year after it was archived.
+ROLLUP_VIEW_DDL = """
+    CREATE VIEW IF NOT EXISTS expense_rollup_all AS
+    SELECT year_month, category_id, total, count FROM expense_rollup
+    UNION ALL
+    SELECT year_month, category_id, total, count FROM archive_rollup
+"""
+
+REBUILD_ROLLUP_SQL = [
+    "DELETE FROM expense_rollup",
+    """
+    INSERT INTO expense_rollup (year_month, category_id, total, count)
+    SELECT substr(date, 1, 7), category_id, SUM(amount), COUNT(*)
+    FROM expenses
+    GROUP BY substr(date, 1, 7), category_id
+    """,
+]
+
+# Full-text index over expenses.title. External-content FTS5 table: it stores
+# only the index and reads titles from expenses; triggers keep it in sync.
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5(
+        title, content='expenses', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_insert AFTER INSERT ON expenses
+    BEGIN
+        INSERT INTO expense_fts (rowid, title) VALUES (NEW.id, NEW.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_delete AFTER DELETE ON expenses
+    BEGIN
+        INSERT INTO expense_fts (expense_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_update AFTER UPDATE OF title ON expenses
+    BEGIN
+        INSERT INTO expense_fts (expense_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+        INSERT INTO expense_fts (rowid, title) VALUES (NEW.id, NEW.title);
+    END
+    """,
+]
+
+REBUILD_FTS_SQL = "INSERT INTO expense_fts (expense_fts) VALUES ('rebuild')"
+
+# Duplicate detection (dedup_module). Expenses are duplicates when they share
+# a fingerprint: date, category, amount in cents and title ignoring case and
+# runs of spaces or tabs (the char(1, 2) replaces collapse a run to one space).
+# The fingerprint is an expression index, not a column, so SQLite keeps it for
+# every write path at the cost of one index entry; probes and the duplicate
+# scan spell out the same expressions so the planner matches them to it.
+_FINGERPRINT_TITLE_SQL = (
+    "lower(trim(replace(replace(replace(replace({title}, char(9), ' '), ' ', char(1, 2)), char(2, 1), ''), "
+    "char(1, 2), ' ')))"
+)
+
+
+def fingerprint_sql(title: str, amount: str, date: str, category: str) -> list[str]:
+    """The fingerprint's parts in index order, over the given SQL expressions."""
+    return [date, category, f"CAST(round({amount} * 100) AS INTEGER)", _FINGERPRINT_TITLE_SQL.format(title=title)]
+
+
+FINGERPRINT_INDEX_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_expenses_fingerprint ON expenses "
+    f"({', '.join(fingerprint_sql('title', 'amount', 'date', 'category_id'))})"
+)
+
+# Stored in PRAGMA user_version once init_db() has brought a database up to
+# date. Bump it whenever tables, columns, indexes, triggers or seed data change.
+SCHEMA_VERSION = 10
+
+
+class _UnitSession:
+    """
+    Session handed out by get_session() inside unit_of_work().
+    Each module call runs in its own SAVEPOINT on the shared session, so
+    commit() releases the savepoint, rollback() undoes only that call, and
+    close() discards whatever the call left uncommitted. The real COMMIT is
+    issued once, when the unit of work ends.
+    """
+
+    def __init__(self, session: Session):
+        self._session = session
+        self._savepoint = session.begin_nested()
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def commit(self):
+        self._savepoint.commit()
+        self._savepoint = self._session.begin_nested()
+
+    def rollback(self):
+        self._savepoint.rollback()
+        self._savepoint = self._session.begin_nested()
+
+    def close(self):
+        if self._savepoint.is_active:
+            self._savepoint.rollback()
 
 
 def get_session() -> Session:
-    """Return a new database session."""
+    """Return a new database session, or the current unit of work's session."""
+    unit = _current_unit.get()
+    if unit is not None:
+        return _UnitSession(unit)
     return SessionLocal()
 
 
-def init_db():
-    """Create all tables and seed default categories if empty."""
+@contextmanager
+def unit_of_work():
+    """
+    Run many module operations against one connection and one transaction:
+
+        with unit_of_work():
+            add_expense(...)
+            set_budget(...)
+
+    Module functions called inside the block share the session; it commits
+    when the block exits and rolls back if it raises. Nested blocks become
+    savepoints of the outer unit.
+    """
+    outer = _current_unit.get()
+    if outer is not None:
+        nested = _UnitSession(outer)
+        try:
+            yield outer
+            nested.commit()
+        finally:
+            nested.close()
+        return
+    session = SessionLocal()
+    token = _current_unit.set(session)
+    try:
+        # Reads inside the unit can see its uncommitted writes: keep them out of the result cache
+        with cache.bypass():
+            yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        _current_unit.reset(token)
+        session.close()
+
+
+@contextmanager
+def triggers_paused(conn, *groups: str):
+    """
+    Switch off trigger groups ("touch", "change_log", "budget_alerts") for the statements run
+    on `conn` (a connection or session) inside the block. The pause is part
+    of the caller's transaction, which must be writing: other connections
+    cannot write meanwhile and never see it. If the block raises, the
+    caller's rollback removes it.
+    """
+    params = [{"name": group} for group in groups]
+    conn.execute(text("INSERT INTO trigger_pauses (name) VALUES (:name)"), params)
+    yield
+    conn.execute(text("DELETE FROM trigger_pauses WHERE name = :name"), params)
+
+
+def _recreate_triggers(conn, ddls: list[str]):
+    """Drop and create triggers whose definitions changed since the database was last upgraded."""
+    for ddl in ddls:
+        name = re.search(r"CREATE TRIGGER IF NOT EXISTS (\w+)", ddl).group(1)
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(ddl))
+
+
+def _schema_object_exists(conn, name: str) -> bool:
+    """True if a table, index or trigger called `name` exists."""
+    return bool(conn.execute(text("SELECT COUNT(*) FROM sqlite_master WHERE name = :name"), {"name": name}).scalar())
+
+
+def _add_missing_columns(conn):
+    """ALTER TABLE ... ADD COLUMN for model columns missing from existing tables."""
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1] for row in conn.execute(text(f'PRAGMA table_info("{table.name}")'))}
+        if not existing:
+            continue
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column.type.compile(dialect=engine.dialect)}'
+            if column.server_default is not None:
+                # SQLite only allows NOT NULL on an added column when it has a default
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            conn.execute(text(ddl))
+
+
+def upgrade_schema():
+    """
+    Bring an existing database up to the current schema.
+    create_all() only creates missing tables, so columns and indexes added to
+    tables that already exist are created here, together with the
+    expense_rollup triggers and the expense_fts full-text index (both
+    backfilled the first time they are installed), the expense_rollup_all
+    view, the updated_at, change_log and budget alert triggers and the
+    expense fingerprint index. Trigger groups that can be paused are
+    recreated, so databases from before triggers_paused() get its checks.
+    """
+    with engine.begin() as conn:
+        _add_missing_columns(conn)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                # Looked up by name: checkfirst reflects all of the table's indexes,
+                # and SQLAlchemy warns about the expression index it cannot reflect
+                if not _schema_object_exists(conn, index.name):
+                    index.create(bind=conn)
+    with engine.begin() as conn:
+        has_rollup = _schema_object_exists(conn, "trg_expenses_rollup_insert")
+        for ddl in ROLLUP_TRIGGERS:
+            conn.execute(text(ddl))
+        if not has_rollup:
+            # Rollup is new for this database: backfill it from existing expenses
+            for sql in REBUILD_ROLLUP_SQL:
+                conn.execute(text(sql))
+        conn.execute(text(ROLLUP_VIEW_DDL))
+        _recreate_triggers(conn, TOUCH_TRIGGERS + CHANGE_LOG_TRIGGERS + BUDGET_ALERT_TRIGGERS)
+        conn.execute(text(FINGERPRINT_INDEX_DDL))
+    try:
+        with engine.begin() as conn:
+            has_fts = _schema_object_exists(conn, "expense_fts")
+            for ddl in FTS_DDL:
+                conn.execute(text(ddl))
+            if not has_fts:
+                conn.execute(text(REBUILD_FTS_SQL))
+    except OperationalError as e:
+        # SQLite built without FTS5: title search falls back to LIKE
+        if "fts5" not in str(e):
+            raise
+
+
+def schema_version() -> int:
+    """Schema version stamped in the database (0 for new or unstamped databases)."""
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def init_db(force: bool = False):
+    """
+    Create all tables, apply schema upgrades and seed default categories if empty.
+    Skipped (one PRAGMA read) when the database is already at SCHEMA_VERSION,
+    unless force is True.
+    """
+    if not force and schema_version() == SCHEMA_VERSION:
+        return
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
     session = get_session()
     try:
         if session.query(Category).count() == 0:
@@ -40,3 +579,5 @@ def init_db():
             session.commit()
     finally:
         session.close()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
@@ -0,0 +1,167 @@
+"""
+FinTrack Pro - Dedup Module
+Duplicate expense detection by fingerprint (date, category, amount in cents,
+normalized title; see database.FINGERPRINT_INDEX_DDL): one index probe per
+incoming row for single and bulk inserts, and a grouped scan of the index
+for duplicates already in the table
+"""
+
+import json
+from sqlalchemy import text
+import cache
+from database import fingerprint_sql, get_session
+from instrumentation import instrumented
+from read_models import DuplicateCluster, duplicate_clusters
+
+# What happens to an incoming expense that matches an existing one: it is
+# skipped, inserted with duplicate_of set to the match, or merged into the
+# match (which takes the incoming title and amount)
+MODES = ("skip", "flag", "merge")
+
+_EXPENSE_FINGERPRINT = fingerprint_sql("e.title", "e.amount", "e.date", "e.category_id")
+# Incoming rows arrive as a JSON array of [title, amount, date, category_id]
+_ROW_FINGERPRINT = fingerprint_sql(*(f"json_extract(r.value, '$[{i}]')" for i in range(4)))
+
+_MATCH_SQL = f"""
+    SELECT r.key, e.id
+    FROM json_each(:rows) r
+    JOIN expenses e ON {" AND ".join(f"{a} = {b}" for a, b in zip(_EXPENSE_FINGERPRINT, _ROW_FINGERPRINT))}
+    WHERE :before_id IS NULL OR e.id <= :before_id
+    ORDER BY r.key, e.id
+"""
+
+_MERGE_SQL = """
+    UPDATE expenses SET title = :title, amount = :amount
+    WHERE id = :id AND (title <> :title OR amount <> :amount)
+"""
+
+
+def _date_filter(start_date, end_date) -> tuple[str, dict]:
+    filters, params = [], {}
+    if start_date is not None:
+        filters.append("e.date >= :start")
+        params["start"] = str(start_date)
+    if end_date is not None:
+        filters.append("e.date <= :end")
+        params["end"] = str(end_date)
+    return (f"WHERE {' AND '.join(filters)}" if filters else ""), params
+
+
+def _matches(session, rows: list[dict], before_id: int = None) -> list[list[int]]:
+    """
+    Ids of the existing expenses sharing each row's fingerprint, oldest
+    first: one index probe per row, all in one statement. With before_id,
+    only expenses up to that id count.
+    """
+    payload = json.dumps([
+        [row["title"], row["amount"], row["date"].isoformat(), row["category_id"]] for row in rows
+    ])
+    found = [[] for _ in rows]
+    for i, expense_id in session.execute(text(_MATCH_SQL), {"rows": payload, "before_id": before_id}):
+        found[i].append(expense_id)
+    return found
+
+
+def _resolve(session, rows: list[dict], mode: str, before_id: int = None,
+             taken: dict = None) -> tuple[list[int], list[tuple[int, int]]]:
+    """
+    Apply `mode` to incoming expense rows (dicts of title, amount, date,
+    category_id). Returns the indexes of the rows still to insert and
+    (row index, existing id) for every duplicate found; "merge" callers
+    then pass the duplicates to _merge. "flag" sets duplicate_of on every
+    row it keeps (None for new ones, so a batch stays one executemany).
+
+    The n-th incoming row with some fingerprint duplicates the n-th existing
+    expense with it, so re-importing a statement with two identical charges
+    matches both, while a new second charge is still inserted. `taken`
+    carries those counts from batch to batch of one import.
+    """
+    if mode not in MODES:
+        raise ValueError(f"dedup must be one of: {', '.join(MODES)}")
+    taken = {} if taken is None else taken
+    keep, matched = [], []
+    for i, (row, match) in enumerate(zip(rows, _matches(session, rows, before_id))):
+        duplicate_of = None
+        if match:
+            # Rows with the same fingerprint match the same expenses: count them per first match
+            n = taken.get(match[0], 0)
+            taken[match[0]] = n + 1
+            if n < len(match):
+                duplicate_of = match[n]
+        if duplicate_of is not None:
+            matched.append((i, duplicate_of))
+        if duplicate_of is None or mode == "flag":
+            if mode == "flag":
+                row["duplicate_of"] = duplicate_of
+            keep.append(i)
+    return keep, matched
+
+
+def _merge(session, merges: list[tuple[dict, int]]):
+    """Give each matched expense (row, expense id) the incoming row's title and amount, where they differ."""
+    if not merges:
+        return
+    session.execute(text(_MERGE_SQL), [
+        {"id": expense_id, "title": row["title"], "amount": row["amount"]} for row, expense_id in merges
+    ])
+    cache.invalidate_on_commit(session, *cache.expense_scopes(row["date"] for row, _ in merges))
+
+
+@instrumented
+def find_duplicates(start_date=None, end_date=None, limit: int = None) -> list[DuplicateCluster]:
+    """
+    Groups of two or more expenses sharing a fingerprint, by date, within
+    start_date / end_date (inclusive) if given. One grouped query over the
+    fingerprint index; archived years are not scanned.
+    """
+    where, params = _date_filter(start_date, end_date)
+    parts = ", ".join(_EXPENSE_FINGERPRINT)
+    columns = ", ".join(
+        f"{expr} AS {name}" for expr, name in zip(_EXPENSE_FINGERPRINT, ("date", "category_id", "cents", "title_key"))
+    )
+    params["limit"] = -1 if limit is None else int(limit)
+    session = get_session()
+    try:
+        return duplicate_clusters(session.execute(text(f"""
+            SELECT g.date, g.category_id, c.name, g.cents / 100.0, g.title_key, g.ids
+            FROM (
+                SELECT {columns}, group_concat(e.id) AS ids
+                FROM expenses e
+                {where}
+                GROUP BY {parts}
+                HAVING COUNT(*) > 1
+            ) g
+            LEFT JOIN categories c ON c.id = g.category_id
+            ORDER BY g.date, g.category_id
+            LIMIT :limit
+        """), params))
+    finally:
+        session.close()
+
+
+@instrumented
+def flag_duplicates(start_date=None, end_date=None) -> int:
+    """
+    Set duplicate_of on every expense of a duplicate group except the
+    oldest, which it then points to. Already flagged expenses are left
+    alone. Returns how many were flagged.
+    """
+    where, params = _date_filter(start_date, end_date)
+    session = get_session()
+    try:
+        flagged = session.execute(text(f"""
+            UPDATE expenses SET duplicate_of = k.keep
+            FROM (
+                SELECT e.id, MIN(e.id) OVER (PARTITION BY {", ".join(_EXPENSE_FINGERPRINT)}) AS keep
+                FROM expenses e
+                {where}
+            ) k
+            WHERE expenses.id = k.id AND k.id <> k.keep AND expenses.duplicate_of IS NULL
+        """), params).rowcount
+        session.commit()
+        return flagged
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
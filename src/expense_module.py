@@ -4,9 +4,13 @@ ORM-based CRUD: Add, Update, Delete expenses
 """
 
 from datetime import date
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+import dedup_module
 from models import Expense, Category
 from database import get_session
+from instrumentation import instrumented
+from read_models import EXPENSE_COLUMNS, ExpenseRow, expense_rows
 
 
 def list_categories(session: Session) -> list[Category]:
@@ -14,17 +18,94 @@ def list_categories(session: Session) -> list[Category]:
     return session.query(Category).order_by(Category.name).all()
 
 
-def add_expense(title: str, amount: float, expense_date: date, category_id: int) -> Expense | None:
-    """Add a new expense. Returns the created expense or None on error."""
+# Cores take an open session and leave committing to the caller, so the
+# sync functions below and async_api (via AsyncSession.run_sync) share them.
+
+def _add_expense(session, title: str, amount: float, expense_date: date, category_id: int,
+                 dedup: str = None) -> Expense:
+    row = {"title": title.strip(), "amount": float(amount), "date": expense_date, "category_id": int(category_id)}
+    if dedup:
+        keep, matched = dedup_module._resolve(session, [row], dedup)
+        if not keep:
+            # Skipped or merged: hand back the expense it matched
+            if dedup == "merge":
+                dedup_module._merge(session, [(row, matched[0][1])])
+            return session.get(Expense, matched[0][1])
+    expense = Expense(**row)
+    session.add(expense)
+    session.flush()
+    return expense
+
+
+def _update_expense(session, expense_id: int, title: str = None, amount: float = None,
+                    expense_date: date = None, category_id: int = None) -> Expense | None:
+    expense = session.query(Expense).filter(Expense.id == expense_id).first()
+    if not expense:
+        return None
+    if title is not None:
+        expense.title = title.strip()
+    if amount is not None:
+        expense.amount = float(amount)
+    if expense_date is not None:
+        expense.date = expense_date
+    if category_id is not None:
+        expense.category_id = int(category_id)
+    session.flush()
+    return expense
+
+
+def _delete_expense(session, expense_id: int) -> bool:
+    expense = session.query(Expense).filter(Expense.id == expense_id).first()
+    if not expense:
+        return False
+    session.delete(expense)
+    session.flush()
+    return True
+
+
+def _get_expense_by_id(session, expense_id: int) -> ExpenseRow | None:
+    rows = expense_rows(session.execute(text(f"""
+        SELECT {EXPENSE_COLUMNS}
+        FROM expenses e
+        LEFT JOIN categories c ON c.id = e.category_id
+        WHERE e.id = :id
+    """), {"id": expense_id}))
+    return rows[0] if rows else None
+
+
+def _list_recent_expenses(session, limit: int = 20) -> list[ExpenseRow]:
+    return _recent_page(session, None, limit)
+
+
+def _recent_page(session, last: tuple | None, batch_size: int) -> list[ExpenseRow]:
+    """Up to batch_size expenses newest first, older than `last` (date, id) if given."""
+    keyset = ""
+    params = {"limit": batch_size}
+    if last is not None:
+        keyset = "WHERE e.date <= :last_date AND (e.date < :last_date OR e.id < :last_id)"
+        params["last_date"], params["last_id"] = last[0].isoformat(), last[1]
+    return expense_rows(session.execute(text(f"""
+        SELECT {EXPENSE_COLUMNS}
+        FROM expenses e
+        LEFT JOIN categories c ON c.id = e.category_id
+        {keyset}
+        ORDER BY e.date DESC, e.id DESC
+        LIMIT :limit
+    """), params))
+
+
+@instrumented
+def add_expense(title: str, amount: float, expense_date: date, category_id: int,
+                dedup: str = None) -> Expense | None:
+    """
+    Add a new expense. Returns the created expense or None on error.
+    With dedup ("skip", "flag" or "merge", see dedup_module) an expense
+    matching an existing one is not added twice: skip and merge return the
+    existing expense, flag adds it with duplicate_of set.
+    """
     session = get_session()
     try:
-        expense = Expense(
-            title=title.strip(),
-            amount=float(amount),
-            date=expense_date,
-            category_id=int(category_id),
-        )
-        session.add(expense)
+        expense = _add_expense(session, title, amount, expense_date, category_id, dedup)
         session.commit()
         session.refresh(expense)
         return expense
@@ -35,22 +116,15 @@ def add_expense(title: str, amount: float, expense_date: date, category_id: int)
         session.close()
 
 
+@instrumented
 def update_expense(expense_id: int, title: str = None, amount: float = None,
                    expense_date: date = None, category_id: int = None) -> Expense | None:
     """Update an existing expense. Only provided fields are updated."""
     session = get_session()
     try:
-        expense = session.query(Expense).filter(Expense.id == expense_id).first()
+        expense = _update_expense(session, expense_id, title, amount, expense_date, category_id)
         if not expense:
             return None
-        if title is not None:
-            expense.title = title.strip()
-        if amount is not None:
-            expense.amount = float(amount)
-        if expense_date is not None:
-            expense.date = expense_date
-        if category_id is not None:
-            expense.category_id = int(category_id)
         session.commit()
         session.refresh(expense)
         return expense
@@ -61,14 +135,13 @@ def update_expense(expense_id: int, title: str = None, amount: float = None,
         session.close()
 
 
+@instrumented
 def delete_expense(expense_id: int) -> bool:
     """Delete an expense by ID. Returns True if deleted, False if not found."""
     session = get_session()
     try:
-        expense = session.query(Expense).filter(Expense.id == expense_id).first()
-        if not expense:
+        if not _delete_expense(session, expense_id):
             return False
-        session.delete(expense)
         session.commit()
         return True
     except Exception as e:
@@ -78,24 +151,40 @@ def delete_expense(expense_id: int) -> bool:
         session.close()
 
 
-def get_expense_by_id(expense_id: int) -> Expense | None:
-    """Fetch a single expense by ID."""
+@instrumented
+def get_expense_by_id(expense_id: int) -> ExpenseRow | None:
+    """Fetch a single expense by ID, with its category name."""
     session = get_session()
     try:
-        return session.query(Expense).filter(Expense.id == expense_id).first()
+        return _get_expense_by_id(session, expense_id)
     finally:
         session.close()
 
 
-def list_recent_expenses(limit: int = 20) -> list[Expense]:
+@instrumented
+def list_recent_expenses(limit: int = 20) -> list[ExpenseRow]:
     """List recent expenses with category name (for CLI display)."""
     session = get_session()
     try:
-        return (
-            session.query(Expense)
-            .order_by(Expense.date.desc(), Expense.id.desc())
-            .limit(limit)
-            .all()
-        )
+        return _list_recent_expenses(session, limit)
     finally:
         session.close()
+
+
+def iter_recent_expenses(batch_size: int = 200):
+    """
+    Stream expenses newest first as ExpenseRow, in pages of `batch_size`
+    using a keyset on (date, id). Stop iterating at any point;
+    only the pages consumed are read.
+    """
+    last = None
+    while True:
+        session = get_session()
+        try:
+            page = _recent_page(session, last, batch_size)
+        finally:
+            session.close()
+        yield from page
+        if len(page) < batch_size:
+            return
+        last = (page[-1].date, page[-1].id)
@@ -0,0 +1,350 @@
+"""
+FinTrack Pro - Export Module
+Streaming export of expenses, subscriptions and budgets to CSV, JSONL or
+Parquet (optional: requires pyarrow), with incremental exports of the rows
+changed since the last export's change_log watermark
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from sqlalchemy import text
+import archive_module
+import sync_module
+from database import get_session
+from instrumentation import instrumented
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+
+DEFAULT_BATCH_SIZE = 5000
+# Parquet row groups collect several batches: still bounded, but not tiny
+PARQUET_ROW_GROUP_ROWS = 100_000
+DEFAULT_CONSUMER = "default"
+FORMATS = ("csv", "jsonl", "parquet")
+
+# kind -> what to read. columns are (name, SQL expression, type); "date" is the
+# column date filters apply to (compared as YYYY-MM for monthly budgets).
+# Each kind is also the change_log table name incremental exports read.
+EXPORTS = {
+    "expenses": {
+        "from": "{schema}.expenses e JOIN categories c ON c.id = e.category_id",
+        "id": "e.id",
+        "columns": [
+            ("id", "e.id", "int"),
+            ("title", "e.title", "str"),
+            ("amount", "e.amount", "float"),
+            ("date", "e.date", "date"),
+            ("category_id", "e.category_id", "int"),
+            ("category", "c.name", "str"),
+            ("updated_at", "e.updated_at", "stamp"),
+        ],
+        "date": "e.date",
+        "category": "e.category_id",
+        "updated_at": "e.updated_at",
+        "archived": True,
+    },
+    "subscriptions": {
+        "from": "subscriptions s LEFT JOIN categories c ON c.id = s.category_id",
+        "id": "s.id",
+        "columns": [
+            ("id", "s.id", "int"),
+            ("name", "s.name", "str"),
+            ("amount", "s.amount", "float"),
+            ("next_date", "s.next_date", "date"),
+            ("frequency", "s.frequency", "str"),
+            ("interval", "s.interval", "int"),
+            ("end_date", "s.end_date", "date"),
+            ("anchor_day", "s.anchor_day", "int"),
+            ("category_id", "s.category_id", "int"),
+            ("category", "c.name", "str"),
+            ("updated_at", "s.updated_at", "stamp"),
+        ],
+        "date": "s.next_date",
+        "category": "s.category_id",
+        "updated_at": "s.updated_at",
+    },
+    "budgets": {
+        "from": "budgets b",
+        "id": "b.id",
+        "columns": [
+            ("id", "b.id", "int"),
+            ("month", "b.month", "str"),
+            ("limit", 'b."limit"', "float"),
+            ("updated_at", "b.updated_at", "stamp"),
+        ],
+        "date": "b.month",
+        "monthly": True,
+        "updated_at": "b.updated_at",
+    },
+}
+
+
+def _detect_format(path: str) -> str:
+    """Guess the output format from the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Cannot detect export format for '{path}'. Use .csv, .jsonl or .parquet")
+
+
+def _select(spec: dict, schema: str, filters: list[str]) -> str:
+    columns = []
+    for name, expr, _ in spec["columns"]:
+        if schema != "main" and expr == spec["updated_at"]:
+            expr = "NULL"  # archive files do not track updated_at
+        columns.append(f'{expr} AS "{name}"')
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    return f"SELECT {', '.join(columns)} FROM {spec['from'].format(schema=schema)} {where}"
+
+
+class _CsvWriter:
+    def __init__(self, f, columns):
+        self._writer = csv.writer(f)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+class _JsonlWriter:
+    def __init__(self, f, columns):
+        self._f = f
+        self._columns = columns
+
+    def write(self, rows):
+        columns = self._columns
+        self._f.write("".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows))
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter:
+    """
+    Converts each batch to Arrow columns right away and writes a row group
+    once PARQUET_ROW_GROUP_ROWS rows have been collected.
+    """
+
+    _TYPES = {"int": "int64", "float": "float64", "str": "string"}
+
+    def __init__(self, path, columns, types):
+        self._types = types
+        fields = []
+        for name, kind in zip(columns, types):
+            if kind == "date":
+                fields.append(pa.field(name, pa.date32()))
+            elif kind == "stamp":
+                fields.append(pa.field(name, pa.timestamp("ms")))
+            else:
+                fields.append(pa.field(name, getattr(pa, self._TYPES[kind])()))
+        self._schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._batches = []
+        self._buffered = 0
+
+    def write(self, rows):
+        if not rows:
+            return
+        arrays = []
+        for values, kind, field in zip(zip(*rows), self._types, self._schema):
+            if kind in ("date", "stamp"):
+                # SQLite returns ISO text; Arrow parses it
+                arrays.append(pa.array(values, pa.string()).cast(field.type))
+            else:
+                arrays.append(pa.array(values, field.type))
+        self._batches.append(pa.RecordBatch.from_arrays(arrays, schema=self._schema))
+        self._buffered += len(rows)
+        if self._buffered >= PARQUET_ROW_GROUP_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._batches:
+            self._writer.write_table(pa.Table.from_batches(self._batches), row_group_size=self._buffered)
+        self._batches, self._buffered = [], 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def _read_watermark(session, kind: str, consumer: str) -> tuple[int | None, str | None]:
+    """(seq, updated_at) of `consumer`'s watermark for `kind`; (None, None) before its first export."""
+    row = session.execute(
+        text("SELECT seq, updated_at FROM export_watermarks WHERE kind = :kind AND consumer = :consumer"),
+        {"kind": kind, "consumer": consumer},
+    ).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def _save_watermark(kind: str, consumer: str, seq: int, updated_at: str | None, rows: int):
+    session = get_session()
+    try:
+        session.execute(text("""
+            INSERT INTO export_watermarks (kind, consumer, seq, updated_at, exported_at, rows)
+            VALUES (:kind, :consumer, :seq, :updated_at, strftime('%Y-%m-%d %H:%M:%f', 'now'), :rows)
+            ON CONFLICT (kind, consumer) DO UPDATE SET
+                seq = excluded.seq, updated_at = excluded.updated_at,
+                exported_at = excluded.exported_at, rows = excluded.rows
+        """), {"kind": kind, "consumer": consumer, "seq": seq, "updated_at": updated_at, "rows": rows})
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+@instrumented
+def export(kind: str, path: str, fmt: str = None, start_date=None, end_date=None, category_id: int = None,
+           incremental: bool = False, consumer: str = DEFAULT_CONSUMER, batch_size: int = DEFAULT_BATCH_SIZE,
+           progress=None) -> dict:
+    """
+    Stream `kind` (expenses, subscriptions or budgets) to `path` ("-" for
+    stdout, CSV or JSONL only). Rows come from one cursor in batches of
+    `batch_size`, so memory stays constant however many rows there are;
+    files are written under a temporary name and renamed when complete.
+
+    start_date / end_date (dates or ISO strings, inclusive) filter on the
+    expense date, the subscription's next charge date or the budget month;
+    category_id filters expenses and subscriptions. Expense exports include
+    archived years the date range overlaps.
+
+    With incremental, only rows with a change_log entry after `consumer`'s
+    watermark for this kind are exported (all rows the first time, or when
+    the log was compacted past the watermark), and the watermark then moves
+    to the last seq the export's read could see. Seqs are assigned under
+    the write lock, so a later commit always lands after the watermark,
+    unlike updated_at stamps, which are taken before it. Deletes are not
+    exported. Incremental exports read the live database only.
+
+    `progress`, if given, is called with the running result after every batch.
+    Returns: { "kind", "format", "path", "rows", "bytes", "seconds",
+    "rows_per_sec", "incremental", "watermark" } (watermark: the saved seq).
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export '{kind}'. Choose from: {', '.join(EXPORTS)}")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    fmt = fmt or ("csv" if path == "-" else _detect_format(path))
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'")
+    if fmt == "parquet" and pa is None:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+    if fmt == "parquet" and path == "-":
+        raise ValueError("Parquet export needs a file path")
+    spec = EXPORTS[kind]
+    if category_id is not None and "category" not in spec:
+        raise ValueError(f"{kind} cannot be filtered by category")
+
+    filters, params = [], {}
+    for name, value, op in (("start", start_date, ">="), ("end", end_date, "<=")):
+        if value is not None:
+            value = str(value)[:7] if spec.get("monthly") else str(value)
+            filters.append(f"{spec['date']} {op} :{name}")
+            params[name] = value
+    if category_id is not None:
+        filters.append(f"{spec['category']} = :category_id")
+        params["category_id"] = int(category_id)
+
+    columns = [name for name, _, _ in spec["columns"]]
+    stamp_index = columns.index("updated_at")
+    result = {"kind": kind, "format": fmt, "path": path, "rows": 0, "bytes": None, "seconds": 0.0,
+              "rows_per_sec": 0.0, "incremental": incremental, "watermark": None}
+    started = time.perf_counter()
+    tmp_path = f"{path}.tmp" if path != "-" else None
+
+    session = get_session()
+    try:
+        seq = newest = None
+        if incremental:
+            since, newest = _read_watermark(session, kind, consumer)
+            # Read in the same transaction as the rows: every change up to seq is visible to it
+            seq = sync_module._last_seq(session)
+            if since is not None and since >= sync_module._compacted_through(session):
+                filters.append(
+                    f"{spec['id']} IN (SELECT row_id FROM change_log WHERE tbl = :tbl AND op <> 'D' AND seq > :since)"
+                )
+                params.update(tbl=kind, since=since)
+            elif since is None and newest is not None:
+                # Watermark saved before seq was tracked: one last run by updated_at
+                filters.append(f"{spec['updated_at']} >= :watermark")
+                params["watermark"] = newest
+            schemas = ["main"]
+        elif spec.get("archived"):
+            schemas = archive_module.partitions(session, start_date, end_date)
+        else:
+            schemas = ["main"]
+        sql = " UNION ALL ".join(_select(spec, schema, filters) for schema in schemas)
+        rows = session.execute(text(sql), params, execution_options={"yield_per": batch_size})
+
+        f = sys.stdout if path == "-" else None
+        if fmt == "parquet":
+            writer = _ParquetWriter(tmp_path, columns, [t for _, _, t in spec["columns"]])
+        else:
+            if f is None:
+                f = open(tmp_path, "w", newline="", encoding="utf-8")
+            writer = (_CsvWriter if fmt == "csv" else _JsonlWriter)(f, columns)
+        try:
+            for batch in rows.partitions(batch_size):
+                writer.write(batch)
+                stamps = [row[stamp_index] for row in batch if row[stamp_index] is not None]
+                if stamps and (newest is None or max(stamps) > newest):
+                    newest = max(stamps)
+                result["rows"] += len(batch)
+                _update_rate(result, started)
+                if progress:
+                    progress(result)
+            writer.close()
+        finally:
+            if f is not None and f is not sys.stdout:
+                f.close()
+    except BaseException:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        session.close()
+
+    if tmp_path:
+        os.replace(tmp_path, path)
+        result["bytes"] = os.path.getsize(path)
+    else:
+        sys.stdout.flush()
+    if incremental:
+        _save_watermark(kind, consumer, seq, newest, result["rows"])
+        result["watermark"] = seq
+    _update_rate(result, started)
+    return result
+
+
+@instrumented
+def list_watermarks() -> list[dict]:
+    """Incremental export watermarks: [{ "kind", "consumer", "seq", "updated_at", "exported_at", "rows" }]."""
+    columns = ("kind", "consumer", "seq", "updated_at", "exported_at", "rows")
+    session = get_session()
+    try:
+        rows = session.execute(text(
+            f"SELECT {', '.join(columns)} FROM export_watermarks ORDER BY kind, consumer"
+        )).fetchall()
+    finally:
+        session.close()
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _update_rate(result: dict, started: float):
+    elapsed = time.perf_counter() - started
+    result["seconds"] = elapsed
+    result["rows_per_sec"] = result["rows"] / elapsed if elapsed > 0 else 0.0
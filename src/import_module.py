@@ -0,0 +1,213 @@
+"""
+FinTrack Pro - Import Module
+Streaming bulk import of expenses from CSV / JSONL files
+"""
+
+import csv
+import json
+import os
+import time
+from datetime import date, datetime
+from sqlalchemy import insert, text
+from sqlalchemy.exc import SQLAlchemyError
+import cache
+import dedup_module
+from database import get_session
+from instrumentation import instrumented
+from models import Expense, Category
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+
+
+def _parse_date(value) -> date:
+    """Parse YYYY-MM-DD, DD/MM/YYYY or DD-MM-YYYY to date."""
+    if isinstance(value, date):
+        return value
+    s = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"invalid date {value!r}")
+
+
+def _detect_format(path: str) -> str:
+    """Guess the file format from its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Cannot detect import format for '{path}'. Use .csv or .jsonl")
+
+
+def _iter_records(path: str, fmt: str):
+    """Yield (line_number, record) pairs one at a time from a CSV or JSONL file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, e
+                    continue
+                yield line_no, record
+
+
+def _load_category_ids(session) -> dict[str, int]:
+    """Map lower-cased category name -> categories.id (one query per import)."""
+    return {name.lower(): cid for cid, name in session.query(Category.id, Category.name)}
+
+
+def _to_row(record, category_ids: dict[str, int]) -> dict:
+    """Validate one input record and convert it to an expenses row."""
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    title = str(record.get("title") or "").strip()
+    if not title:
+        raise ValueError("title is empty")
+    amount = float(record.get("amount"))
+    if amount <= 0:
+        raise ValueError("amount must be positive")
+    expense_date = _parse_date(record.get("date"))
+    if record.get("category_id") not in (None, ""):
+        category_id = int(record["category_id"])
+        if category_id not in category_ids.values():
+            raise ValueError(f"unknown category_id {category_id}")
+    else:
+        name = str(record.get("category") or "").strip().lower()
+        if name not in category_ids:
+            raise ValueError(f"unknown category {record.get('category')!r}")
+        category_id = category_ids[name]
+    return {"title": title, "amount": amount, "date": expense_date, "category_id": category_id}
+
+
+def _insert_chunk(session, chunk: list[tuple[int, dict]], result: dict, dedup: str = None,
+                  before_id: int = None, taken: dict = None):
+    """
+    Insert a chunk in one transaction using a single executemany.
+    If the database rejects the batch, retry row by row inside savepoints so
+    only the offending rows are rejected. With dedup, duplicates are
+    resolved first (dedup_module).
+    """
+    scopes = cache.expense_scopes(row["date"] for _, row in chunk)
+    matched, merges = [], []
+    if dedup:
+        keep, matched = dedup_module._resolve(session, [row for _, row in chunk], dedup, before_id, taken)
+        if dedup == "merge":
+            merges = [(chunk[i][1], expense_id) for i, expense_id in matched]
+        chunk = [chunk[i] for i in keep]
+    try:
+        if chunk:
+            session.execute(insert(Expense), [row for _, row in chunk])
+        dedup_module._merge(session, merges)
+        cache.invalidate_on_commit(session, *scopes)
+        session.commit()
+        result["inserted"] += len(chunk)
+        result["duplicates"] += len(matched)
+        return
+    except SQLAlchemyError:
+        session.rollback()
+
+    for line_no, row in chunk:
+        savepoint = session.begin_nested()
+        try:
+            session.execute(insert(Expense), row)
+            savepoint.commit()
+            result["inserted"] += 1
+        except SQLAlchemyError as e:
+            savepoint.rollback()
+            _reject(result, line_no, str(e.orig) if getattr(e, "orig", None) else str(e))
+    dedup_module._merge(session, merges)
+    cache.invalidate_on_commit(session, *scopes)
+    session.commit()
+    result["duplicates"] += len(matched)
+
+
+def _reject(result: dict, line_no: int, reason: str):
+    result["rejected"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append((line_no, reason))
+
+
+@instrumented
+def import_expenses(path: str, fmt: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    progress=None, dedup: str = None) -> dict:
+    """
+    Stream expenses from a CSV or JSONL file into the database.
+
+    Each record needs title, amount, date and either category (name) or
+    category_id. Rows are inserted in chunks of `chunk_size`, one transaction
+    per chunk; invalid rows are rejected individually. Memory use is bounded
+    by the chunk size. `progress`, if given, is called with the running
+    result dict after every chunk.
+
+    With dedup ("skip", "flag" or "merge", see dedup_module) every row is
+    probed against the expenses that existed before the import started, so
+    overlapping statements can be imported again; identical rows within the
+    file are not duplicates of each other. Dedup also keeps a small counter
+    per matched expense for the length of the import.
+
+    Returns: { "inserted", "rejected", "duplicates", "errors", "seconds",
+    "rows_per_sec" } where errors holds up to MAX_REPORTED_ERRORS
+    (line_number, reason) pairs.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    fmt = fmt or _detect_format(path)
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported import format '{fmt}'")
+    if dedup and dedup not in dedup_module.MODES:
+        raise ValueError(f"dedup must be one of: {', '.join(dedup_module.MODES)}")
+
+    result = {"inserted": 0, "rejected": 0, "duplicates": 0, "errors": [], "seconds": 0.0, "rows_per_sec": 0.0}
+    started = time.perf_counter()
+    session = get_session()
+    try:
+        category_ids = _load_category_ids(session)
+        # Rows this import inserts are never duplicates of each other: only match what was there before
+        before_id = session.execute(text("SELECT COALESCE(MAX(id), 0) FROM expenses")).scalar() if dedup else None
+        taken = {}
+        chunk = []
+        for line_no, record in _iter_records(path, fmt):
+            if isinstance(record, Exception):
+                _reject(result, line_no, f"invalid JSON: {record}")
+                continue
+            try:
+                chunk.append((line_no, _to_row(record, category_ids)))
+            except (TypeError, ValueError) as e:
+                _reject(result, line_no, str(e))
+                continue
+            if len(chunk) >= chunk_size:
+                _insert_chunk(session, chunk, result, dedup, before_id, taken)
+                chunk = []
+                _update_rate(result, started)
+                if progress:
+                    progress(result)
+        if chunk:
+            _insert_chunk(session, chunk, result, dedup, before_id, taken)
+        _update_rate(result, started)
+        if progress:
+            progress(result)
+        return result
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def _update_rate(result: dict, started: float):
+    elapsed = time.perf_counter() - started
+    result["seconds"] = elapsed
+    result["rows_per_sec"] = result["inserted"] / elapsed if elapsed > 0 else 0.0
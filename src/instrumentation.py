@@ -0,0 +1,249 @@
+"""
+FinTrack Pro - Instrumentation
+Opt-in latency histograms for SQL statements and module functions,
+built on SQLAlchemy engine and session events
+"""
+
+import bisect
+import functools
+import json
+import os
+import re
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+BUCKET_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+MAX_STATEMENTS = 500
+MAX_SLOW_PLANS = 50
+
+_enabled = False
+_explain_threshold_ms = None
+_lock = threading.Lock()
+_statements = {}
+_functions = {}
+_transactions = {"begun": 0, "ended": 0}
+_slow_plans = []
+
+
+class Histogram:
+    """Fixed log-spaced latency buckets plus count, total and max."""
+
+    __slots__ = ("buckets", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (max for the open bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                (f"<={bound}ms" if i < len(BUCKET_BOUNDS_MS) else f">{BUCKET_BOUNDS_MS[-1]}ms"): n
+                for i, (bound, n) in enumerate(zip(BUCKET_BOUNDS_MS + (None,), self.buckets))
+                if n
+            },
+        }
+
+
+def _statement_key(statement: str) -> str:
+    """Collapse whitespace and long VALUES/IN lists so similar statements share a histogram."""
+    key = re.sub(r"\s+", " ", statement).strip()
+    key = re.sub(r"(\(\?(?:, \?)*\)(?:, )?){2,}", "(?), ... ", key)
+    return key[:300]
+
+
+# ---- SQLAlchemy event handlers (registered only while enabled) ----
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("fintrack_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("fintrack_query_start")
+    if not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    key = _statement_key(statement)
+    with _lock:
+        stats = _statements.get(key)
+        if stats is None:
+            if len(_statements) >= MAX_STATEMENTS:
+                key = "<other statements>"
+                stats = _statements.get(key)
+            if stats is None:
+                stats = _statements[key] = {"latency": Histogram(), "rows_affected": None, "executemany": 0}
+        stats["latency"].add(ms)
+        # sqlite3 reports -1 for reads, so only writes get a count (None: never wrote)
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            stats["rows_affected"] = (stats["rows_affected"] or 0) + cursor.rowcount
+        if executemany:
+            stats["executemany"] += 1
+    if (_explain_threshold_ms is not None and ms >= _explain_threshold_ms and not executemany
+            and statement.lstrip()[:6].upper() in ("SELECT", "WITH S", "WITH M", "WITH R")):
+        _capture_plan(cursor, statement, parameters, ms)
+
+
+def _capture_plan(cursor, statement, parameters, ms):
+    """Record EXPLAIN QUERY PLAN for a slow read, on the same DBAPI connection."""
+    try:
+        plan = cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, parameters or ()).fetchall()
+    except Exception as e:  # never let diagnostics break the query
+        plan = [(None, None, None, f"EXPLAIN failed: {e}")]
+    with _lock:
+        _slow_plans.append({
+            "statement": _statement_key(statement),
+            "ms": round(ms, 3),
+            "plan": [row[3] for row in plan],
+        })
+        del _slow_plans[:-MAX_SLOW_PLANS]
+
+
+# Session events only see transactions (sessions open lazily and have no
+# open/close hooks), so these count root transactions begun and ended:
+# a gap that keeps growing points at sessions left open
+def _after_begin(session, transaction, connection):
+    if transaction.parent is None:
+        with _lock:
+            _transactions["begun"] += 1
+
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None and transaction.nested is False:
+        with _lock:
+            _transactions["ended"] += 1
+
+
+_LISTENERS = (
+    (Engine, "before_cursor_execute", _before_cursor_execute),
+    (Engine, "after_cursor_execute", _after_cursor_execute),
+    (Session, "after_begin", _after_begin),
+    (Session, "after_transaction_end", _after_transaction_end),
+)
+
+
+# ---- public API ----
+
+def enable(explain_threshold_ms: float = None):
+    """
+    Start recording. Statements slower than explain_threshold_ms (if given)
+    also get their EXPLAIN QUERY PLAN captured.
+    """
+    global _enabled, _explain_threshold_ms
+    _explain_threshold_ms = explain_threshold_ms
+    if _enabled:
+        return
+    for target, name, fn in _LISTENERS:
+        event.listen(target, name, fn)
+    _enabled = True
+
+
+def disable():
+    """Stop recording and remove the event listeners (collected data is kept)."""
+    global _enabled
+    if not _enabled:
+        return
+    for target, name, fn in _LISTENERS:
+        event.remove(target, name, fn)
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Discard all collected data."""
+    with _lock:
+        _statements.clear()
+        _functions.clear()
+        _transactions["begun"] = _transactions["ended"] = 0
+        _slow_plans.clear()
+
+
+def instrumented(fn):
+    """
+    Decorator for module functions: records call latency while
+    instrumentation is enabled; otherwise a single flag check.
+    """
+    name = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            with _lock:
+                hist = _functions.get(name)
+                if hist is None:
+                    hist = _functions[name] = Histogram()
+                hist.add(ms)
+
+    return wrapper
+
+
+def snapshot() -> dict:
+    """All collected data as plain dicts, slowest (by total time) first."""
+    with _lock:
+        statements = sorted(_statements.items(), key=lambda kv: kv[1]["latency"].total_ms, reverse=True)
+        functions = sorted(_functions.items(), key=lambda kv: kv[1].total_ms, reverse=True)
+        return {
+            "enabled": _enabled,
+            "explain_threshold_ms": _explain_threshold_ms,
+            "transactions": dict(_transactions),
+            "functions": {name: hist.to_dict() for name, hist in functions},
+            "statements": [
+                {"statement": sql, "rows_affected": s["rows_affected"], "executemany": s["executemany"],
+                 **s["latency"].to_dict()}
+                for sql, s in statements
+            ],
+            "slow_plans": list(_slow_plans),
+        }
+
+
+def dump_json(path: str = None) -> str:
+    """Return the snapshot as JSON, also writing it to `path` if given."""
+    data = json.dumps(snapshot(), indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+    return data
+
+
+# FINTRACK_INSTRUMENT=1 enables recording from startup; FINTRACK_EXPLAIN_MS sets the plan threshold
+if os.environ.get("FINTRACK_INSTRUMENT") == "1":
+    enable(float(os.environ["FINTRACK_EXPLAIN_MS"]) if os.environ.get("FINTRACK_EXPLAIN_MS") else None)
@@ -3,26 +3,15 @@ FinTrack Pro – CLI Finance Manager
 Personal finance management: expenses, subscriptions, budgets, analytics
 """
 
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 import sys
 import os
 
 # Ensure src is on path when run from project root or from src
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import init_db, get_session
-from expense_module import (
-    list_categories,
-    add_expense,
-    update_expense,
-    delete_expense,
-    get_expense_by_id,
-    list_recent_expenses,
-)
-from report_module import category_analytics, category_analytics_for_month, total_spending, total_spending_for_month
-from budget_module import set_budget, get_budget, check_budget_alert
-from search_module import search_by_date, search_by_date_range
-from subscription_module import add_subscription, list_subscriptions, delete_subscription
+# Feature modules are imported inside the run_* functions, so a launch only
+# loads what the chosen action needs.
 
 
 def parse_date(s: str) -> date | None:
@@ -59,6 +48,8 @@ def print_header(title: str):
 
 
 def run_add_expense():
+    from database import get_session
+    from expense_module import list_categories, add_expense
     print_header("Add Expense")
     session = get_session()
     try:
@@ -106,13 +97,15 @@ def run_add_expense():
 
 
 def run_update_expense():
+    from database import get_session
+    from expense_module import list_categories, list_recent_expenses, get_expense_by_id, update_expense
     print_header("Update Expense")
     recent = list_recent_expenses(10)
     if not recent:
         print("No expenses to update.")
         return
     for e in recent:
-        cat_name = e.category.name if e.category else "?"
+        cat_name = e.category_name or "?"
         print(f"  {e.id}. {e.title} | {e.amount:.2f} | {e.date} | {cat_name}")
     eid_str = input("Expense ID to update: ").strip()
     try:
@@ -144,6 +137,7 @@ def run_update_expense():
 
 
 def run_delete_expense():
+    from expense_module import list_recent_expenses, delete_expense
     print_header("Delete Expense")
     recent = list_recent_expenses(15)
     if not recent:
@@ -164,6 +158,7 @@ def run_delete_expense():
 
 
 def run_search_by_date():
+    from search_module import search_by_date, iter_by_date_range
     print_header("Search by Date")
     date_str = input("Date (YYYY-MM-DD or DD/MM/YYYY): ").strip()
     if not date_str:
@@ -173,6 +168,24 @@ def run_search_by_date():
     if not d:
         print("Invalid date.")
         return
+    end_str = input("End date for a range (Enter for single day): ").strip()
+    if end_str:
+        end = parse_date(end_str)
+        if not end or end < d:
+            print("Invalid end date.")
+            return
+        print(f"Expenses from {d} to {end}:")
+        count = 0
+        total = 0
+        for r in iter_by_date_range(d, end):
+            print(f"  {r[3]} ID {r[0]}: {r[1]} - {r[2]:.2f} ({r[4]})")
+            count += 1
+            total += r[2]
+        if not count:
+            print("  None.")
+            return
+        print(f"  {count} expenses, Total: {total:.2f}")
+        return
     rows = search_by_date(d)
     if not rows:
         print(f"No expenses on {d}")
@@ -185,8 +198,46 @@ def run_search_by_date():
     print(f"  Total: {total:.2f}")
 
 
+def run_search_by_title(page_size: int = 20):
+    from search_module import search_by_title
+    print_header("Search by Title")
+    query = input('Search (words, prefix*, "exact phrase"): ').strip()
+    if not query:
+        print("Search text required.")
+        return
+    start_str = input("From date (Enter for any): ").strip()
+    end_str = input("To date (Enter for any): ").strip()
+    start = parse_date(start_str) if start_str else None
+    end = parse_date(end_str) if end_str else None
+    if (start_str and not start) or (end_str and not end):
+        print("Invalid date.")
+        return
+    cat_str = input("Category ID (Enter for any): ").strip()
+    category_id = int(cat_str) if cat_str.isdigit() else None
+    offset = 0
+    while True:
+        rows = search_by_title(query, start, end, category_id, limit=page_size, offset=offset)
+        if not rows:
+            print("No matches." if offset == 0 else "No more matches.")
+            return
+        for r in rows:
+            print(f"  {r[3]} ID {r[0]}: {r[1]} - {r[2]:.2f} ({r[4]})")
+        if len(rows) < page_size or input("Enter for more, q to stop: ").strip().lower() == "q":
+            return
+        offset += page_size
+
+
 def run_category_analytics():
+    from report_module import (
+        category_analytics,
+        category_analytics_for_month,
+        total_spending,
+        total_spending_for_month,
+    )
     print_header("Category Analytics")
+    if input("[t]otals or category x period [p]ivot [t]: ").strip().lower().startswith("p"):
+        run_pivot_report()
+        return
     month_str = input("Month YYYY-MM (Enter for all time): ").strip()
     if month_str:
         ym = parse_month(month_str)
@@ -206,7 +257,57 @@ def run_category_analytics():
     print(f"  TOTAL: {total:.2f}")
 
 
+def _format_change(change) -> str:
+    return "-" if change is None else f"{change * 100:+.1f}%"
+
+
+def print_pivot(report):
+    lines = (*report.rows, report.totals._replace(category_name="TOTAL"))
+    w = max(9, *(len(f"{v:.2f}") + 1 for row in lines for v in (*row.values, row.total)))
+    print(f"  {'Category':<15}" + "".join(f"{label:>{w}}" for label in report.labels) + f"{'Total':>{w}}{'YoY':>9}")
+    for row in lines:
+        cells = "".join(f"{v:>{w}.2f}" for v in row.values)
+        print(f"  {row.category_name or '-':<15}{cells}{row.total:>{w}.2f}{_format_change(row.total_yoy_change):>9}")
+    if report.period != "year":
+        print(f"  {'vs prev':<15}" + "".join(f"{_format_change(c):>{w}}" for c in report.totals.previous_change))
+    print(f"  {'YoY':<15}" + "".join(f"{_format_change(c):>{w}}" for c in report.totals.yoy_change))
+
+
+def run_pivot_report():
+    from report_module import pivot_report, write_pivot_csv
+    this_month = datetime.now().strftime("%Y-%m")
+    end = parse_month(input(f"Last month YYYY-MM [{this_month}]: ").strip() or this_month)
+    if not end:
+        print("Invalid month. Use YYYY-MM.")
+        return
+    year, month = int(end[:4]), int(end[5:])
+    default_start = f"{year - 1}-{month + 1:02d}" if month < 12 else f"{year}-01"  # twelve months
+    start = parse_month(input(f"First month YYYY-MM [{default_start}]: ").strip() or default_start)
+    if not start:
+        print("Invalid month. Use YYYY-MM.")
+        return
+    period = input("Period (month/quarter/year) [month]: ").strip().lower() or "month"
+    try:
+        report = pivot_report(start, end, period)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    if not report.rows:
+        print("No expenses in this period.")
+        return
+    print_pivot(report)
+    path = input("\nSave as CSV (file path, Enter to skip): ").strip()
+    if path:
+        try:
+            write_pivot_csv(report, path)
+        except OSError as e:
+            print(f"Error: {e}")
+            return
+        print(f"Saved to {path}")
+
+
 def run_monthly_budget_alert():
+    from budget_module import check_budget_alert, category_budget_status
     print_header("Monthly Budget Alert")
     month_str = input("Month (YYYY-MM) [current]: ").strip()
     ym = datetime.now().strftime("%Y-%m") if not month_str else parse_month(month_str or datetime.now().strftime("%Y-%m"))
@@ -216,9 +317,18 @@ def run_monthly_budget_alert():
     print(result["message"])
     if result["exceeded"]:
         print("  >>> Budget exceeded! <<<")
+    rows = category_budget_status(ym)
+    if rows:
+        print("\n  Category budgets:")
+        for r in rows:
+            flag = "  EXCEEDED" if r["exceeded"] else ""
+            print(f"  {r['category']:<20} {r['spent']:>10.2f} / {r['limit']:<10.2f} {r['percent']:>6.1f}%{flag}")
 
 
 def run_set_budget():
+    from budget_module import set_budget, set_category_budget
+    from database import get_session
+    from expense_module import list_categories
     print_header("Set Monthly Budget")
     month_str = input("Month (YYYY-MM): ").strip() or datetime.now().strftime("%Y-%m")
     ym = parse_month(month_str)
@@ -233,24 +343,83 @@ def run_set_budget():
     except ValueError as e:
         print(f"Invalid limit: {e}")
         return
-    set_budget(ym, limit)
-    print(f"Budget for {ym} set to {limit:.2f}")
+    session = get_session()
+    try:
+        categories = list_categories(session)
+    finally:
+        session.close()
+    for i, c in enumerate(categories, 1):
+        print(f"  {i}. {c.name}")
+    cat_choice = input("Category number (blank for overall): ").strip()
+    if not cat_choice:
+        set_budget(ym, limit)
+        print(f"Budget for {ym} set to {limit:.2f}")
+        return
+    try:
+        idx = int(cat_choice)
+        if not 1 <= idx <= len(categories):
+            raise ValueError
+    except ValueError:
+        print("Invalid choice.")
+        return
+    category = categories[idx - 1]
+    thresholds_str = input("Alert thresholds in % [80,100]: ").strip() or "80,100"
+    try:
+        thresholds = [float(t) / 100 for t in thresholds_str.split(",") if t.strip()]
+        set_category_budget(ym, category.id, limit, thresholds)
+    except ValueError as e:
+        print(f"Invalid thresholds: {e}")
+        return
+    print(f"Budget for {category.name} in {ym} set to {limit:.2f}")
+
+
+def run_budget_dashboard():
+    from budget_module import budget_status_range
+    print_header("Budget Dashboard")
+    now = datetime.now()
+    # Default to the last 12 months including the current one
+    year, month = (now.year, now.month - 11) if now.month == 12 else (now.year - 1, now.month + 1)
+    default_start = f"{year:04d}-{month:02d}"
+    start_str = input(f"From month (YYYY-MM) [{default_start}]: ").strip()
+    end_str = input(f"To month (YYYY-MM) [{now.strftime('%Y-%m')}]: ").strip()
+    start = parse_month(start_str) if start_str else default_start
+    end = parse_month(end_str) if end_str else now.strftime("%Y-%m")
+    if not start or not end or start > end:
+        print("Invalid month range. Use YYYY-MM.")
+        return
+    print(f"  {'Month':<8} {'Limit':>10} {'Spent':>10} {'Remaining':>10}  Status")
+    for row in budget_status_range(start, end):
+        if row["limit"] is None:
+            print(f"  {row['month']:<8} {'-':>10} {row['spent']:>10.2f} {'-':>10}  no budget")
+        else:
+            status = "EXCEEDED" if row["exceeded"] else "ok"
+            print(f"  {row['month']:<8} {row['limit']:>10.2f} {row['spent']:>10.2f} {row['remaining']:>10.2f}  {status}")
 
 
-def run_list_recent():
+def run_list_recent(page_size: int = 20):
+    from expense_module import iter_recent_expenses
     print_header("Recent Expenses")
-    expenses = list_recent_expenses(20)
-    if not expenses:
-        print("No expenses yet.")
-        return
-    for e in expenses:
-        cat = e.category.name if e.category else "?"
+    shown = 0
+    for e in iter_recent_expenses(page_size):
+        cat = e.category_name or "?"
         print(f"  {e.id}. {e.date} | {e.title} | {e.amount:.2f} | {cat}")
+        shown += 1
+        if shown % page_size == 0 and input("Enter for more, q to stop: ").strip().lower() == "q":
+            return
+    if not shown:
+        print("No expenses yet.")
 
 
 def run_subscriptions():
+    from subscription_module import (
+        add_subscription,
+        list_subscriptions,
+        delete_subscription,
+        forecast_by_month,
+        FREQUENCIES,
+    )
     print_header("Subscriptions")
-    print("1. List  2. Add  3. Delete")
+    print("1. List  2. Add  3. Delete  4. Forecast")
     choice = input("Choice: ").strip()
     if choice == "1":
         subs = list_subscriptions()
@@ -258,7 +427,9 @@ def run_subscriptions():
             print("No subscriptions.")
             return
         for s in subs:
-            print(f"  {s.id}. {s.name} - {s.amount:.2f} (next: {s.next_date})")
+            every = s.frequency if s.interval == 1 else f"every {s.interval} {s.frequency}"
+            until = f", until {s.end_date}" if s.end_date else ""
+            print(f"  {s.id}. {s.name} - {s.amount:.2f} {every} (next: {s.next_date}{until})")
     elif choice == "2":
         name = input("Name: ").strip()
         amount_str = input("Amount: ").strip()
@@ -270,8 +441,17 @@ def run_subscriptions():
         if not d:
             print("Invalid date.")
             return
+        frequency = input(f"Frequency ({'/'.join(FREQUENCIES)}) [monthly]: ").strip().lower() or "monthly"
+        interval_str = input("Every N periods [1]: ").strip()
+        end_str = input("End date (Enter for none): ").strip()
+        end_date = parse_date(end_str) if end_str else None
+        if end_str and not end_date:
+            print("Invalid end date.")
+            return
+        cat_str = input("Category ID for booked charges (Enter for Other): ").strip()
+        category_id = int(cat_str) if cat_str.isdigit() else None
         try:
-            add_subscription(name, float(amount_str), d)
+            add_subscription(name, float(amount_str), d, frequency, int(interval_str or 1), end_date, category_id)
             print("Subscription added.")
         except Exception as e:
             print(f"Error: {e}")
@@ -284,10 +464,331 @@ def run_subscriptions():
             print("Deleted.")
         else:
             print("Not found or invalid ID.")
+    elif choice == "4":
+        months_str = input("Months ahead [12]: ").strip()
+        months = int(months_str) if months_str.isdigit() and int(months_str) > 0 else 12
+        start = date.today()
+        year, month = divmod(start.year * 12 + start.month - 1 + months, 12)
+        end = date(year, month + 1, 1) - timedelta(days=1)
+        total = 0
+        for ym, amount in forecast_by_month(start, end):
+            print(f"  {ym}: {amount:.2f}")
+            total += amount
+        print(f"  TOTAL: {total:.2f}")
+
+
+def run_bulk_import():
+    from import_module import import_expenses
+    print_header("Bulk Import")
+    path = input("File path (.csv or .jsonl): ").strip()
+    if not path or not os.path.isfile(path):
+        print("File not found.")
+        return
+    chunk_str = input("Chunk size [5000]: ").strip()
+    chunk_size = int(chunk_str) if chunk_str.isdigit() and int(chunk_str) > 0 else 5000
+    dedup_str = input("Rows already in the database: [k]eep, [s]kip, [f]lag, [m]erge [k]: ").strip().lower()
+    dedup = {"s": "skip", "f": "flag", "m": "merge"}.get(dedup_str[:1])
+
+    def progress(result):
+        print(f"  {result['inserted']} rows imported ({result['rows_per_sec']:.0f} rows/sec)")
+
+    try:
+        result = import_expenses(path, chunk_size=chunk_size, progress=progress, dedup=dedup)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    print(f"Imported {result['inserted']} rows, rejected {result['rejected']} "
+          f"in {result['seconds']:.2f}s ({result['rows_per_sec']:.0f} rows/sec)")
+    if dedup:
+        print(f"{result['duplicates']} rows matched existing expenses ({dedup})")
+    for line_no, reason in result["errors"]:
+        print(f"  line {line_no}: {reason}")
+
+
+def run_export():
+    from export_module import export, DEFAULT_BATCH_SIZE
+    print_header("Export")
+    kind = input("Export (expenses/subscriptions/budgets) [expenses]: ").strip().lower() or "expenses"
+    path = input("File path (.csv, .jsonl or .parquet): ").strip()
+    if not path:
+        print("No file path given.")
+        return
+    start = input("Start date (YYYY-MM-DD, blank for all): ").strip() or None
+    end = input("End date (YYYY-MM-DD, blank for all): ").strip() or None
+    incremental = input("Only rows changed since the last export? (y/N): ").strip().lower() == "y"
 
+    def progress(result):
+        print(f"  {result['rows']} rows exported ({result['rows_per_sec']:.0f} rows/sec)")
 
-def main():
+    try:
+        result = export(kind, path, start_date=start, end_date=end, incremental=incremental,
+                        batch_size=DEFAULT_BATCH_SIZE, progress=progress)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"Error: {e}")
+        return
+    print(f"Exported {result['rows']} rows ({result['bytes']} bytes) to {result['path']} "
+          f"in {result['seconds']:.2f}s ({result['rows_per_sec']:.0f} rows/sec)")
+
+
+def run_maintenance():
+    from report_module import verify_rollup, rebuild_rollup
+    from search_module import rebuild_title_index
+    import archive_module
+    import dedup_module
+    print_header("Maintenance")
+    print("1. Verify rollup  2. Rebuild rollup  3. Rebuild title search index")
+    print("4. List archives  5. Archive a year  6. Restore an archived year")
+    print("7. Find duplicate expenses")
+    choice = input("Choice: ").strip()
+    if choice == "1":
+        result = verify_rollup()
+        if result["ok"]:
+            print(f"Rollup OK ({result['checked']} month/category rows checked).")
+            return
+        print(f"Rollup has {len(result['mismatches'])} mismatched rows:")
+        for ym, cat_id, r_total, r_count, raw_total, raw_count in result["mismatches"]:
+            print(f"  {ym} category {cat_id}: rollup {r_total:.2f} ({r_count}) vs expenses {raw_total:.2f} ({raw_count})")
+        print("Run 'Rebuild rollup' to repair.")
+    elif choice == "2":
+        rows = rebuild_rollup()
+        print(f"Rollup rebuilt ({rows} month/category rows).")
+    elif choice == "3":
+        rebuild_title_index()
+        print("Title search index rebuilt.")
+    elif choice == "4":
+        archives = archive_module.list_archives()
+        if not archives:
+            print("No archived years.")
+        for a in archives:
+            print(f"  {a.year}: {a.expense_count} expenses, {a.total:.2f} | {a.path} (archived {a.archived_at})")
+    elif choice in ("5", "6"):
+        try:
+            year = int(input("Year: ").strip())
+        except ValueError:
+            print("Invalid year.")
+            return
+        try:
+            if choice == "5":
+                result = archive_module.archive_year(year)
+                print(f"Moved {result['moved']} expenses to {result['path']} "
+                      f"({result['expenses']} archived for {year}, total {result['total']:.2f}).")
+            else:
+                result = archive_module.restore_year(year)
+                print(f"Restored {result['restored']} expenses from {year}.")
+        except (ValueError, LookupError) as e:
+            print(e)
+    elif choice == "7":
+        clusters = dedup_module.find_duplicates()
+        if not clusters:
+            print("No duplicate expenses.")
+            return
+        for c in clusters[:50]:
+            ids = ", ".join(str(i) for i in c.ids)
+            print(f"  {c.date} {c.category_name or '-':<14} {c.amount:>10.2f}  {c.title}  (ids {ids})")
+        if len(clusters) > 50:
+            print(f"  ... and {len(clusters) - 50} more groups")
+        if input(f"Flag all but the oldest expense of the {len(clusters)} groups? (y/N): ").strip().lower() == "y":
+            print(f"Flagged {dedup_module.flag_duplicates()} expenses as duplicates.")
+    else:
+        print("Invalid option.")
+
+
+def run_diagnostics(top: int = 10):
+    import instrumentation
+    print_header("Diagnostics")
+    state = "on" if instrumentation.is_enabled() else "off"
+    print(f"Instrumentation is {state}.")
+    print("1. Enable  2. Disable  3. Show stats  4. Dump JSON  5. Reset")
+    choice = input("Choice: ").strip()
+    if choice == "1":
+        threshold_str = input("Capture query plans for statements slower than (ms, Enter for never): ").strip()
+        try:
+            threshold = float(threshold_str) if threshold_str else None
+        except ValueError:
+            print("Invalid threshold.")
+            return
+        instrumentation.enable(threshold)
+        print("Instrumentation enabled.")
+    elif choice == "2":
+        instrumentation.disable()
+        print("Instrumentation disabled (collected data kept).")
+    elif choice == "3":
+        import cache
+        stats = instrumentation.snapshot()
+        print(f"Transactions begun: {stats['transactions']['begun']}, ended: {stats['transactions']['ended']}")
+        c = cache.stats()
+        print(f"Result cache: {'on' if c['enabled'] else 'off'}, {c['entries']} entries, "
+              f"{c['hits']} hits / {c['misses']} misses ({c['hit_rate']:.0%})")
+        print(f"\n  {'Calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'Max ms':>8}  Function")
+        for name, h in list(stats["functions"].items())[:top]:
+            print(f"  {h['count']:>6} {h['p50_ms']:>8} {h['p95_ms']:>8} {h['max_ms']:>8.2f}  {name}")
+        print(f"\n  {'Calls':>6} {'Total ms':>9} {'p95 ms':>8} {'Rows':>7}  Statement")
+        for s in stats["statements"][:top]:
+            rows = "-" if s["rows_affected"] is None else s["rows_affected"]
+            print(f"  {s['count']:>6} {s['total_ms']:>9.2f} {s['p95_ms']:>8} {rows:>7}  {s['statement'][:70]}")
+        for p in stats["slow_plans"][-top:]:
+            print(f"\n  {p['ms']:.2f} ms: {p['statement'][:70]}")
+            for step in p["plan"]:
+                print(f"    {step}")
+    elif choice == "4":
+        path = input("Output file [fintrack_diagnostics.json]: ").strip() or "fintrack_diagnostics.json"
+        try:
+            instrumentation.dump_json(path)
+        except OSError as e:
+            print(f"Error: {e}")
+            return
+        print(f"Written to {path}")
+    elif choice == "5":
+        instrumentation.reset()
+        print("Collected data discarded.")
+    else:
+        print("Invalid option.")
+
+
+def build_parser():
+    """Subcommands for scripted use; arguments map 1:1 onto command_module keywords."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="FinTrack Pro. Without a command, starts the interactive menu. "
+                    "Scripted commands print their result as one JSON line.",
+    )
+    sub = parser.add_subparsers(dest="cmd")
+
+    p = sub.add_parser("add", help="add an expense")
+    p.add_argument("--title", required=True)
+    p.add_argument("--amount", type=float, required=True)
+    p.add_argument("--category-id", type=int, required=True)
+    p.add_argument("--date", help="YYYY-MM-DD (default today)")
+    p.add_argument("--dedup", choices=("skip", "flag", "merge"), help="if it matches an existing expense")
+
+    p = sub.add_parser("update", help="update an expense")
+    p.add_argument("id", type=int)
+    p.add_argument("--title")
+    p.add_argument("--amount", type=float)
+    p.add_argument("--date")
+    p.add_argument("--category-id", type=int)
+
+    p = sub.add_parser("delete", help="delete an expense")
+    p.add_argument("id", type=int)
+
+    p = sub.add_parser("recent", help="list recent expenses")
+    p.add_argument("--limit", type=int, default=20)
+
+    p = sub.add_parser("search", help="search by date, date range or title")
+    p.add_argument("--date", help="single day, or range start with --end")
+    p.add_argument("--end")
+    p.add_argument("--title", help='full-text query (words, prefix*, "phrase")')
+    p.add_argument("--start", help="with --title: earliest date")
+    p.add_argument("--category-id", type=int)
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--offset", type=int, default=0)
+
+    p = sub.add_parser("analytics", help="category totals")
+    p.add_argument("--month", help="YYYY-MM (default all time)")
+
+    p = sub.add_parser("series", help="spending per day, week, month, quarter or year")
+    p.add_argument("start", help="YYYY-MM-DD")
+    p.add_argument("end", help="YYYY-MM-DD")
+    p.add_argument("--bucket", choices=("day", "week", "month", "quarter", "year"), default="month")
+    p.add_argument("--by-category", action="store_true", help="one series per category")
+
+    p = sub.add_parser("pivot", help="category x month / quarter / year matrix with changes")
+    p.add_argument("start", help="YYYY-MM")
+    p.add_argument("end", help="YYYY-MM")
+    p.add_argument("--period", choices=("month", "quarter", "year"), default="month")
+    p.add_argument("--csv", help='write CSV to this file ("-" for stdout)')
+
+    p = sub.add_parser("budget", help="set a budget, show budget status or list budget alerts")
+    p.add_argument("action", choices=("set", "delete", "status", "alerts"))
+    p.add_argument("month", nargs="?", help="YYYY-MM (optional for alerts)")
+    p.add_argument("limit", type=float, nargs="?")
+    p.add_argument("--end", help="status: last month of a range")
+    p.add_argument("--category-id", type=int, help="set / delete: a category budget")
+    p.add_argument("--by-category", action="store_true", help="status: the month's category budgets")
+    p.add_argument("--thresholds", help="set: alert levels as fractions of the limit (default 0.8,1.0)")
+    p.add_argument("--open-only", action="store_true", help="alerts: only those not cleared")
+
+    p = sub.add_parser("subscriptions", help="list, add, delete, forecast or book subscriptions")
+    p.add_argument("action", choices=("list", "add", "delete", "forecast", "process-due"))
+    p.add_argument("--id", type=int)
+    p.add_argument("--name")
+    p.add_argument("--amount", type=float)
+    p.add_argument("--next-date")
+    p.add_argument("--frequency", default="monthly")
+    p.add_argument("--interval", type=int, default=1)
+    p.add_argument("--end-date")
+    p.add_argument("--category-id", type=int)
+    p.add_argument("--months", type=int, default=12)
+
+    p = sub.add_parser("import", help="bulk import a CSV or JSONL file")
+    p.add_argument("path")
+    p.add_argument("--chunk-size", type=int, default=5000)
+    p.add_argument("--dedup", choices=("skip", "flag", "merge"), help="rows matching existing expenses")
+
+    p = sub.add_parser("archive", help="move a closed year to its own database file, or restore it")
+    p.add_argument("action", choices=("list", "run", "restore"))
+    p.add_argument("year", type=int, nargs="?")
+
+    p = sub.add_parser("dedup", help="find duplicate expenses, or flag all but the oldest of each group")
+    p.add_argument("action", choices=("scan", "flag"))
+    p.add_argument("--start", help="YYYY-MM-DD")
+    p.add_argument("--end", help="YYYY-MM-DD")
+    p.add_argument("--limit", type=int, help="scan: at most this many groups")
+
+    p = sub.add_parser("sync", help="change log: replicate to another database file, snapshot, compact")
+    p.add_argument("action", choices=("status", "push", "snapshot", "compact"))
+    p.add_argument("path", nargs="?", help="push: replica file; snapshot: new file")
+    p.add_argument("--seq", type=int, help="compact: delete log entries up to this seq")
+    p.add_argument("--compact", action="store_true", help="snapshot: then compact the log behind it")
+    p.add_argument("--batch-size", type=int)
+
+    p = sub.add_parser("export", help="stream expenses, subscriptions or budgets to a file")
+    p.add_argument("kind", choices=("expenses", "subscriptions", "budgets"))
+    p.add_argument("path", help='output file (.csv, .jsonl, .parquet) or "-" for stdout')
+    p.add_argument("--format", choices=("csv", "jsonl", "parquet"), help="default: from the file extension")
+    p.add_argument("--start", help="YYYY-MM-DD")
+    p.add_argument("--end", help="YYYY-MM-DD")
+    p.add_argument("--category-id", type=int)
+    p.add_argument("--incremental", action="store_true", help="only rows changed since the last incremental export")
+    p.add_argument("--consumer", help="watermark name for --incremental (default: default)")
+    p.add_argument("--batch-size", type=int)
+
+    p = sub.add_parser("batch", help="run JSONL commands from stdin, write JSONL results to stdout")
+    p.add_argument("--commit-every", type=int, default=1000, help="commands per transaction (default 1000)")
+    p.add_argument("--stop-on-error", action="store_true")
+    return parser
+
+
+def run_script(argv: list[str]) -> int:
+    """Run one scripted command (or a batch) and return the exit status."""
+    import json
+    args = build_parser().parse_args(argv)
+    from database import init_db
+    init_db()
+    import command_module
+    if args.cmd == "batch":
+        stats = command_module.run_batch(sys.stdin, sys.stdout, args.commit_every, args.stop_on_error)
+        return 1 if stats["failed"] else 0
+    response = command_module.run_command(vars(args))
+    # An export to stdout owns stdout; its status line goes to stderr
+    to_stderr = (args.cmd == "export" and args.path == "-") or (args.cmd == "pivot" and args.csv == "-")
+    print(json.dumps(response, default=str), file=sys.stderr if to_stderr else sys.stdout)
+    return 0 if response["ok"] else 1
+
+
+def run_interactive():
+    from budget_module import on_budget_alert
+    from database import init_db
+    from subscription_module import process_due_subscriptions
     init_db()
+    on_budget_alert(lambda a: print(
+        f"\n  ALERT: {a.category_name} spending for {a.month} reached {a.threshold:.0%} "
+        f"of {a.limit:.2f} ({a.spent:.2f})"
+    ))
+    due = process_due_subscriptions()
+    if due["booked"]:
+        print(f"\n  Booked {due['booked']} subscription charges from {due['subscriptions']} subscriptions.")
     print("\n  FinTrack Pro – CLI Finance Manager")
     print("  --------------------------------")
     while True:
@@ -300,6 +801,12 @@ def main():
         print("  7. Set Monthly Budget")
         print("  8. Recent Expenses")
         print("  9. Subscriptions")
+        print("  10. Bulk Import")
+        print("  11. Maintenance")
+        print("  12. Search by Title")
+        print("  13. Budget Dashboard")
+        print("  14. Diagnostics")
+        print("  15. Export")
         print("  0. Exit")
         choice = input("\nChoice: ").strip()
         if choice == "1":
@@ -320,6 +827,18 @@ def main():
             run_list_recent()
         elif choice == "9":
             run_subscriptions()
+        elif choice == "10":
+            run_bulk_import()
+        elif choice == "11":
+            run_maintenance()
+        elif choice == "12":
+            run_search_by_title()
+        elif choice == "13":
+            run_budget_dashboard()
+        elif choice == "14":
+            run_diagnostics()
+        elif choice == "15":
+            run_export()
         elif choice == "0":
             print("Goodbye.")
             break
@@ -327,5 +846,13 @@ def main():
             print("Invalid option.")
 
 
+def main(argv: list[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_script(argv)
+    run_interactive()
+    return 0
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
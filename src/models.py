@@ -1,16 +1,25 @@
 """
 FinTrack Pro - SQLAlchemy ORM Models
 Database: SQLite
-Tables: categories, expenses, subscriptions, budgets
+Tables: categories, expenses, subscriptions, budgets, expense_rollup, archives, archive_rollup,
+export_watermarks, change_log, sync_state, trigger_pauses, category_budgets, budget_alerts
 """
 
-from datetime import date
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from datetime import date, datetime, timezone
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
 
 
+def utc_stamp() -> str:
+    """
+    Current UTC time as 'YYYY-MM-DD HH:MM:SS.fff', the updated_at format
+    (the same text SQLite's strftime('%Y-%m-%d %H:%M:%f', 'now') produces).
+    """
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:23]
+
+
 class Category(Base):
     """Category table: id, name"""
     __tablename__ = "categories"
@@ -26,7 +35,7 @@ class Category(Base):
 
 
 class Expense(Base):
-    """Expense table: id, title, amount, date, category_id"""
+    """Expense table: id, title, amount, date, category_id, duplicate_of"""
     __tablename__ = "expenses"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -34,21 +43,59 @@ class Expense(Base):
     amount = Column(Float, nullable=False)
     date = Column(Date, nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    # Set on insert here, and on update by a trigger (database.TOUCH_TRIGGERS); drives incremental exports
+    updated_at = Column(String(23), nullable=True, default=utc_stamp)
+    # Set when the expense was kept although it matched an existing one (dedup_module, "flag")
+    duplicate_of = Column(Integer, nullable=True)
 
     category = relationship("Category", back_populates="expenses")
 
+    # Date-range scans (reports, search), per-category month lookups, incremental exports,
+    # flagged duplicates. The duplicate fingerprint index is database.FINGERPRINT_INDEX_DDL.
+    __table_args__ = (
+        Index("ix_expenses_date", "date"),
+        Index("ix_expenses_category_date", "category_id", "date"),
+        Index("ix_expenses_updated_at", "updated_at"),
+        Index("ix_expenses_duplicate_of", "duplicate_of", sqlite_where=text("duplicate_of IS NOT NULL")),
+    )
+
     def __repr__(self):
         return f"<Expense(id={self.id}, title='{self.title}', amount={self.amount})>"
 
 
+class ExpenseRollup(Base):
+    """
+    Rollup table: year_month, category_id, total, count
+    Maintained by triggers on expenses (see database.ROLLUP_TRIGGERS).
+    """
+    __tablename__ = "expense_rollup"
+
+    year_month = Column(String(7), primary_key=True)  # Format: YYYY-MM
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ExpenseRollup(year_month='{self.year_month}', category_id={self.category_id}, total={self.total})>"
+
+
 class Subscription(Base):
-    """Subscription table: id, name, amount, next_date"""
+    """Subscription table: id, name, amount, next_date, frequency, interval, end_date, anchor_day, category_id"""
     __tablename__ = "subscriptions"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(200), nullable=False)
     amount = Column(Float, nullable=False)
     next_date = Column(Date, nullable=False)
+    # Recurrence: every `interval` months / years / weeks / days, until end_date (inclusive)
+    frequency = Column(String(10), nullable=False, default="monthly", server_default="monthly")
+    interval = Column(Integer, nullable=False, default=1, server_default="1")
+    end_date = Column(Date, nullable=True)
+    # Day of month for monthly/yearly charges, so the 31st stays the 31st after a short month
+    anchor_day = Column(Integer, nullable=True)
+    # Category for the expenses booked from this subscription (None = "Other")
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    updated_at = Column(String(23), nullable=True, default=utc_stamp)
 
     def __repr__(self):
         return f"<Subscription(id={self.id}, name='{self.name}', amount={self.amount})>"
@@ -61,6 +108,171 @@ class Budget(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     month = Column(String(7), nullable=False, unique=True)  # Format: YYYY-MM
     limit = Column(Float, nullable=False)
+    updated_at = Column(String(23), nullable=True, default=utc_stamp)
 
     def __repr__(self):
         return f"<Budget(month='{self.month}', limit={self.limit})>"
+
+
+class CategoryBudget(Base):
+    """
+    Category budget table: id, month, category_id, limit, thresholds
+    Monthly limit for one category. thresholds is a JSON array of fractions
+    of the limit (e.g. [0.8, 1.0]); crossing one raises a budget_alerts row.
+    """
+    __tablename__ = "category_budgets"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    month = Column(String(7), nullable=False)  # Format: YYYY-MM
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    limit = Column(Float, nullable=False)
+    thresholds = Column(String(100), nullable=False, default="[0.8, 1.0]")
+    updated_at = Column(String(23), nullable=True, default=utc_stamp)
+
+    category = relationship("Category")
+
+    __table_args__ = (
+        UniqueConstraint("month", "category_id", name="uq_category_budgets_month_category"),
+    )
+
+    def __repr__(self):
+        return f"<CategoryBudget(month='{self.month}', category_id={self.category_id}, limit={self.limit})>"
+
+
+class BudgetAlert(Base):
+    """
+    Budget alert table: id, month, category_id, threshold, limit, spent, created_at, cleared_at, notified_at
+    One row per crossing of a category budget threshold, written by triggers
+    in the transaction that crossed it. cleared_at is set when spending falls
+    back below the threshold (the next crossing is a new alert); notified_at
+    when the alert was handed to the registered callbacks.
+    """
+    __tablename__ = "budget_alerts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    month = Column(String(7), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    threshold = Column(Float, nullable=False)
+    limit = Column(Float, nullable=False)
+    spent = Column(Float, nullable=False)
+    created_at = Column(String(23), nullable=False)
+    cleared_at = Column(String(23), nullable=True)
+    notified_at = Column(String(23), nullable=True)
+
+    __table_args__ = (
+        # At most one open alert per threshold: the trigger's NOT EXISTS check is an index probe
+        Index("uq_budget_alerts_open", "month", "category_id", "threshold", unique=True,
+              sqlite_where=text("cleared_at IS NULL")),
+        Index("ix_budget_alerts_pending", "notified_at", sqlite_where=text("notified_at IS NULL")),
+    )
+
+    def __repr__(self):
+        return f"<BudgetAlert(month='{self.month}', category_id={self.category_id}, threshold={self.threshold})>"
+
+
+class Archive(Base):
+    """
+    Archive registry: year, path, expense_count, total, archived_at
+    One row per closed year moved to its own database file (see archive_module).
+    """
+    __tablename__ = "archives"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    path = Column(String(500), nullable=False)  # relative to the live database's directory, or absolute
+    expense_count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+    archived_at = Column(Date, nullable=False)
+
+    def __repr__(self):
+        return f"<Archive(year={self.year}, path='{self.path}', expense_count={self.expense_count})>"
+
+
+class ArchiveRollup(Base):
+    """
+    Rollup of archived expenses: year_month, category_id, total, count
+    Kept in the live database so reports never have to open archive files.
+    """
+    __tablename__ = "archive_rollup"
+
+    year_month = Column(String(7), primary_key=True)  # Format: YYYY-MM
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ArchiveRollup(year_month='{self.year_month}', category_id={self.category_id}, total={self.total})>"
+
+
+class ExportWatermark(Base):
+    """
+    Export watermark table: kind, consumer, seq, updated_at, exported_at, rows
+    The change_log seq the last incremental export of `kind` (expenses,
+    subscriptions, budgets) to `consumer` read up to, and the newest
+    updated_at it delivered (see export_module).
+    """
+    __tablename__ = "export_watermarks"
+
+    kind = Column(String(20), primary_key=True)
+    consumer = Column(String(100), primary_key=True)
+    seq = Column(Integer, nullable=True)  # NULL for watermarks saved before seq was tracked
+    updated_at = Column(String(23), nullable=True)
+    exported_at = Column(String(23), nullable=False)
+    rows = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ExportWatermark(kind='{self.kind}', consumer='{self.consumer}', updated_at='{self.updated_at}')>"
+
+
+class ChangeLog(Base):
+    """
+    Change log table: seq, tbl, op, row_id, data
+    One entry per insert (I), update (U) or delete (D) of an expense,
+    subscription or budget, written by triggers in the same transaction.
+    data is the row as a JSON object (NULL for deletes). Archiving a year
+    (I) or restoring it (D) is one 'archives' entry with the year as row_id,
+    written by archive_module instead of an entry per moved expense.
+    AUTOINCREMENT keeps seq increasing even after compaction deletes the
+    oldest entries.
+    """
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    tbl = Column(String(20), nullable=False)
+    op = Column(String(1), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    data = Column(String, nullable=True)
+
+    def __repr__(self):
+        return f"<ChangeLog(seq={self.seq}, tbl='{self.tbl}', op='{self.op}', row_id={self.row_id})>"
+
+
+class SyncState(Base):
+    """
+    Sync state table: source, seq, synced_at
+    In a replica: the last change_log seq of `source` (the source database
+    path) applied to it (see sync_module).
+    """
+    __tablename__ = "sync_state"
+
+    source = Column(String(500), primary_key=True)
+    seq = Column(Integer, nullable=False, default=0)
+    synced_at = Column(String(23), nullable=False)
+
+    def __repr__(self):
+        return f"<SyncState(source='{self.source}', seq={self.seq})>"
+
+
+class TriggerPause(Base):
+    """
+    Trigger pause table: name
+    While a transaction holds a row here, the triggers of that group do
+    nothing (see database.triggers_paused). Rows never outlive the writing
+    transaction, so other connections never see them.
+    """
+    __tablename__ = "trigger_pauses"
+
+    name = Column(String(20), primary_key=True)
+
+    def __repr__(self):
+        return f"<TriggerPause(name='{self.name}')>"
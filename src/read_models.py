@@ -0,0 +1,205 @@
+"""
+FinTrack Pro - Read Models
+Immutable row types returned by the listing and search functions, built
+straight from joined SQL rows instead of ORM instances
+"""
+
+import json
+from datetime import date
+from typing import NamedTuple
+
+# Column lists matching the row types below (expenses e, categories c, subscriptions s).
+# Expense columns are aliased so ORDER BY id / date also works on UNION ALL results.
+EXPENSE_COLUMNS = (
+    "e.id AS id, e.title AS title, e.amount AS amount, e.date AS date, "
+    "c.name AS category_name, e.category_id AS category_id"
+)
+SUBSCRIPTION_COLUMNS = (
+    "s.id, s.name, s.amount, s.next_date, s.frequency, s.interval, s.end_date, s.category_id, c.name AS category_name"
+)
+BUDGET_COLUMNS = 'b.id, b.month, b."limit"'
+ARCHIVE_COLUMNS = "a.year, a.path, a.expense_count, a.total, a.archived_at"
+CHANGE_COLUMNS = "l.seq, l.tbl, l.op, l.row_id, l.data"
+CATEGORY_BUDGET_COLUMNS = 'cb.id, cb.month, cb.category_id, c.name AS category_name, cb."limit", cb.thresholds'
+BUDGET_ALERT_COLUMNS = (
+    'a.id, a.month, a.category_id, c.name AS category_name, a.threshold, a."limit", a.spent, '
+    "a.created_at, a.cleared_at"
+)
+
+
+class ExpenseRow(NamedTuple):
+    """
+    One expense with its category name. The first five fields keep the
+    (id, title, amount, date, category_name) order search results always had.
+    """
+    id: int
+    title: str
+    amount: float
+    date: date
+    category_name: str | None
+    category_id: int
+
+
+class SubscriptionRow(NamedTuple):
+    id: int
+    name: str
+    amount: float
+    next_date: date
+    frequency: str
+    interval: int
+    end_date: date | None
+    category_id: int | None
+    category_name: str | None
+
+
+class BudgetRow(NamedTuple):
+    id: int
+    month: str
+    limit: float
+
+
+class CategoryBudgetRow(NamedTuple):
+    id: int
+    month: str
+    category_id: int
+    category_name: str | None
+    limit: float
+    thresholds: tuple[float, ...]
+
+
+class BudgetAlertRow(NamedTuple):
+    """One threshold crossing; cleared_at is set once spending fell back below it."""
+    id: int
+    month: str
+    category_id: int
+    category_name: str | None
+    threshold: float
+    limit: float
+    spent: float
+    created_at: str
+    cleared_at: str | None
+
+
+class ArchiveRow(NamedTuple):
+    year: int
+    path: str
+    expense_count: int
+    total: float
+    archived_at: date
+
+
+class ChangeRow(NamedTuple):
+    """One change_log entry; data is the row after an insert or update, None for a delete."""
+    seq: int
+    table: str
+    op: str
+    row_id: int
+    data: dict | None
+
+
+class SeriesPoint(NamedTuple):
+    """One time bucket of report_module.spending_series (category fields are None unless split by category)."""
+    start: date
+    label: str
+    total: float
+    count: int
+    category_id: int | None
+    category_name: str | None
+
+
+class PivotRow(NamedTuple):
+    """
+    One category's line of report_module.pivot_report (category fields are
+    None on the totals line). Changes are fractions (0.25 = +25%), None when
+    there was nothing to compare with.
+    """
+    category_id: int | None
+    category_name: str | None
+    values: tuple[float, ...]
+    total: float
+    previous_change: tuple[float | None, ...]
+    yoy_change: tuple[float | None, ...]
+    total_yoy_change: float | None
+
+
+class PivotReport(NamedTuple):
+    """Category x period matrix: one value per period (labels / starts) on every row."""
+    period: str
+    starts: tuple[date, ...]
+    labels: tuple[str, ...]
+    rows: tuple[PivotRow, ...]
+    totals: PivotRow
+
+
+class DuplicateCluster(NamedTuple):
+    """Expenses sharing one fingerprint (dedup_module); title is the normalized title, ids oldest first."""
+    date: date
+    category_id: int
+    category_name: str | None
+    amount: float
+    title: str
+    ids: tuple[int, ...]
+
+
+def _date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _fetch(rows):
+    """All rows of a Result in one call (iterating a Result fetches row by row), or `rows` as given."""
+    fetchall = getattr(rows, "fetchall", None)
+    return fetchall() if fetchall else rows
+
+
+def expense_rows(rows) -> list[ExpenseRow]:
+    """Raw EXPENSE_COLUMNS rows (a Result or any iterable) -> ExpenseRow (ISO date strings become dates)."""
+    # expenses.date is NOT NULL and SQLite returns it as text, so parse without the _date checks
+    parse = date.fromisoformat
+    return [ExpenseRow(i, title, amount, parse(d), name, cat) for i, title, amount, d, name, cat in _fetch(rows)]
+
+
+def subscription_rows(rows) -> list[SubscriptionRow]:
+    """Raw SUBSCRIPTION_COLUMNS rows -> SubscriptionRow."""
+    return [
+        SubscriptionRow(i, name, amount, _date(next_date), frequency, interval, _date(end_date), cat, cat_name)
+        for i, name, amount, next_date, frequency, interval, end_date, cat, cat_name in _fetch(rows)
+    ]
+
+
+def budget_rows(rows) -> list[BudgetRow]:
+    """Raw BUDGET_COLUMNS rows -> BudgetRow."""
+    return [BudgetRow(*row) for row in _fetch(rows)]
+
+
+def change_rows(rows) -> list[ChangeRow]:
+    """Raw CHANGE_COLUMNS rows -> ChangeRow (JSON payloads decoded)."""
+    return [
+        ChangeRow(seq, table, op, row_id, json.loads(data) if data is not None else None)
+        for seq, table, op, row_id, data in _fetch(rows)
+    ]
+
+
+def category_budget_rows(rows) -> list[CategoryBudgetRow]:
+    """Raw CATEGORY_BUDGET_COLUMNS rows -> CategoryBudgetRow (thresholds JSON decoded)."""
+    return [
+        CategoryBudgetRow(i, month, cat, name, limit, tuple(json.loads(thresholds)))
+        for i, month, cat, name, limit, thresholds in _fetch(rows)
+    ]
+
+
+def budget_alert_rows(rows) -> list[BudgetAlertRow]:
+    """Raw BUDGET_ALERT_COLUMNS rows -> BudgetAlertRow."""
+    return [BudgetAlertRow(*row) for row in _fetch(rows)]
+
+
+def duplicate_clusters(rows) -> list[DuplicateCluster]:
+    """Raw (date, category_id, category_name, amount, title, comma-separated ids) rows -> DuplicateCluster."""
+    return [
+        DuplicateCluster(_date(d), cat, name, amount, title, tuple(sorted(int(i) for i in ids.split(","))))
+        for d, cat, name, amount, title, ids in _fetch(rows)
+    ]
+
+
+def archive_rows(rows) -> list[ArchiveRow]:
+    """Raw ARCHIVE_COLUMNS rows -> ArchiveRow."""
+    return [ArchiveRow(year, path, count, total, _date(at)) for year, path, count, total, at in _fetch(rows)]
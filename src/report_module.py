@@ -1,72 +1,454 @@
 """
 FinTrack Pro - Report Module
-Category-wise totals using raw SQL (GROUP BY, JOIN)
+Category-wise totals, time-bucketed spending series and category x period
+pivot reports using raw SQL (GROUP BY, JOIN) over the expense_rollup table
+(plus the rollup of archived years, via the expense_rollup_all view)
 """
 
+import csv
+import sys
+from datetime import date, timedelta
 from sqlalchemy import text
-from database import get_session
+import archive_module
+import cache
+from database import budget_alert_sql, get_session, triggers_paused, REBUILD_ROLLUP_SQL
+from instrumentation import instrumented
+from read_models import PivotReport, PivotRow, SeriesPoint
 
+# Pivot report periods -> periods per year (how far back the year-over-year column looks)
+PIVOT_PERIODS = {"month": 12, "quarter": 4, "year": 1}
 
+# bucket -> SQL expression mapping an ISO date expression {d} to the first day of its bucket
+# (ISO weeks start on Monday: 'weekday 0' moves to the week's Sunday, then back six days)
+BUCKETS = {
+    "day": "{d}",
+    "week": "date({d}, 'weekday 0', '-6 days')",
+    "month": "substr({d}, 1, 7) || '-01'",
+    "quarter": "substr({d}, 1, 5) || printf('%02d', (CAST(substr({d}, 6, 2) AS INTEGER) - 1) / 3 * 3 + 1) || '-01'",
+    "year": "substr({d}, 1, 4) || '-01-01'",
+}
+
+
+def month_bounds(year_month: str) -> tuple[str, str]:
+    """
+    Half-open ISO date range [start, end) for a month (YYYY-MM).
+    Comparing e.date against these bounds lets SQLite use ix_expenses_date
+    instead of evaluating strftime() on every row.
+    """
+    year, month = int(year_month[:4]), int(year_month[5:7])
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def months_between(start_month: str, end_month: str) -> list[str]:
+    """All months from start_month to end_month inclusive, as YYYY-MM."""
+    year, month = int(start_month[:4]), int(start_month[5:7])
+    end_year, end_mon = int(end_month[:4]), int(end_month[5:7])
+    months = []
+    while (year, month) <= (end_year, end_mon):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+# Query cores take an open session so the sync functions below and
+# async_api (via AsyncSession.run_sync) run the same SQL.
+
+def _category_analytics(session) -> list[tuple[str, float]]:
+    sql = text("""
+        SELECT c.name, SUM(r.total) AS total
+        FROM categories c
+        JOIN expense_rollup_all r ON c.id = r.category_id
+        GROUP BY c.name
+        ORDER BY total DESC
+    """)
+    rows = session.execute(sql).fetchall()
+    return [(row[0], float(row[1])) for row in rows]
+
+
+def _category_analytics_for_month(session, year_month: str) -> list[tuple[str, float]]:
+    sql = text("""
+        SELECT c.name, SUM(r.total) AS total
+        FROM categories c
+        JOIN expense_rollup_all r ON c.id = r.category_id
+        WHERE r.year_month = :ym
+        GROUP BY c.name
+        ORDER BY total DESC
+    """)
+    rows = session.execute(sql, {"ym": year_month}).fetchall()
+    return [(row[0], float(row[1])) for row in rows]
+
+
+def _total_spending(session) -> float:
+    return float(session.execute(text("SELECT COALESCE(SUM(total), 0) FROM expense_rollup_all")).scalar())
+
+
+def _total_spending_for_month(session, year_month: str) -> float:
+    result = session.execute(
+        text("SELECT COALESCE(SUM(total), 0) FROM expense_rollup_all WHERE year_month = :ym"),
+        {"ym": year_month},
+    )
+    return float(result.scalar())
+
+
+def _bucket_start(d: date, bucket: str) -> date:
+    if bucket == "day":
+        return d
+    if bucket == "week":
+        return d - timedelta(days=d.weekday())
+    if bucket == "month":
+        return d.replace(day=1)
+    if bucket == "quarter":
+        return date(d.year, (d.month - 1) // 3 * 3 + 1, 1)
+    return date(d.year, 1, 1)
+
+
+def bucket_label(start: date, bucket: str) -> str:
+    """YYYY-MM-DD (day), YYYY-Www (ISO week), YYYY-MM (month), YYYY-Qn (quarter) or YYYY (year)."""
+    if bucket == "day":
+        return start.isoformat()
+    if bucket == "week":
+        year, week, _ = start.isocalendar()
+        return f"{year:04d}-W{week:02d}"
+    if bucket == "month":
+        return start.isoformat()[:7]
+    if bucket == "quarter":
+        return f"{start.year:04d}-Q{(start.month - 1) // 3 + 1}"
+    return f"{start.year:04d}"
+
+
+def _next_bucket(d: date, bucket: str) -> date:
+    """First day of the bucket after the one starting on d."""
+    if bucket == "day":
+        return d + timedelta(days=1)
+    if bucket == "week":
+        return d + timedelta(days=7)
+    months = {"month": 1, "quarter": 3, "year": 12}[bucket]
+    month = d.month - 1 + months
+    return date(d.year + month // 12, month % 12 + 1, 1)
+
+
+def _series_ranges(start: date, end: date, bucket: str):
+    """
+    Split [start, end] into whole months answered from the rollup
+    (first_month, last_month or None) and the remaining raw date ranges.
+    Day and week buckets cannot use the monthly rollup at all.
+    """
+    if bucket in ("day", "week"):
+        return None, [(start, end)]
+    first = start if start.day == 1 else _next_bucket(start.replace(day=1), "month")
+    after = _next_bucket(end.replace(day=1), "month")
+    stop = after if end == after - timedelta(days=1) else end.replace(day=1)  # first day not covered by whole months
+    if first >= stop:
+        return None, [(start, end)]
+    raw = []
+    if start < first:
+        raw.append((start, first - timedelta(days=1)))
+    if stop <= end:
+        raw.append((stop, end))
+    return (first.isoformat()[:7], (stop - timedelta(days=1)).isoformat()[:7]), raw
+
+
+def _spending_series(session, start_date: date, end_date: date, bucket: str = "month",
+                     by_category: bool = False) -> list[SeriesPoint]:
+    start, end = date.fromisoformat(str(start_date)), date.fromisoformat(str(end_date))
+    months, raw = _series_ranges(start, end, bucket)
+    to_bucket = BUCKETS[bucket]
+    arms, params = [], {}
+    if months:
+        arms.append(f"""
+            SELECT {to_bucket.format(d="(r.year_month || '-01')")} AS bucket, r.category_id AS category_id,
+                   r.total AS total, r.count AS count
+            FROM expense_rollup_all r
+            WHERE r.year_month >= :first_month AND r.year_month <= :last_month
+        """)
+        params["first_month"], params["last_month"] = months
+    for i, (raw_start, raw_end) in enumerate(raw):
+        params[f"start{i}"], params[f"end{i}"] = raw_start.isoformat(), raw_end.isoformat()
+        for schema in archive_module.partitions(session, raw_start, raw_end):
+            arms.append(f"""
+                SELECT {to_bucket.format(d="e.date")} AS bucket, e.category_id AS category_id,
+                       SUM(e.amount) AS total, COUNT(*) AS count
+                FROM {schema}.expenses e
+                WHERE e.date >= :start{i} AND e.date <= :end{i}
+                GROUP BY 1, 2
+            """)
+    if by_category:
+        sql = f"""
+            SELECT u.bucket, SUM(u.total), SUM(u.count), u.category_id, c.name
+            FROM ({" UNION ALL ".join(arms)}) u
+            LEFT JOIN categories c ON c.id = u.category_id
+            GROUP BY u.bucket, u.category_id
+        """
+    else:
+        sql = f"SELECT u.bucket, SUM(u.total), SUM(u.count) FROM ({' UNION ALL '.join(arms)}) u GROUP BY u.bucket"
+    sums = {}
+    categories = {}
+    for row in session.execute(text(sql), params).fetchall():
+        key = (row[0], row[3]) if by_category else (row[0], None)
+        sums[key] = (float(row[1]), int(row[2]))
+        if by_category:
+            categories[row[3]] = row[4]
+
+    # Zero-fill every bucket (for each category with spending in the range)
+    series = []
+    split = sorted(categories.items(), key=lambda item: (item[1] or "", item[0])) if by_category else [(None, None)]
+    current = _bucket_start(start, bucket)
+    while current <= end:
+        key, label = current.isoformat(), bucket_label(current, bucket)
+        for category_id, name in split:
+            total, count = sums.get((key, category_id), (0.0, 0))
+            series.append(SeriesPoint(current, label, total, count, category_id, name))
+        current = _next_bucket(current, bucket)
+    return series
+
+
+def _change(current: float, before: float) -> float | None:
+    return (current - before) / before if before else None
+
+
+def _pivot_row(category_id, name, totals: list[float], per_year: int) -> PivotRow:
+    """Row from totals over the shown periods preceded by one year of earlier periods."""
+    shown = range(per_year, len(totals))
+    values = tuple(totals[per_year:])
+    total = sum(values)
+    return PivotRow(
+        category_id, name, values, total,
+        tuple(_change(totals[i], totals[i - 1]) for i in shown),
+        tuple(_change(totals[i], totals[i - per_year]) for i in shown),
+        _change(total, sum(totals[:len(values)])),
+    )
+
+
+def _pivot_report(session, start_month: str, end_month: str, period: str = "month") -> PivotReport:
+    per_year = PIVOT_PERIODS[period]
+    start = _bucket_start(date.fromisoformat(f"{start_month}-01"), period)
+    end = _next_bucket(_bucket_start(date.fromisoformat(f"{end_month}-01"), period), period) - timedelta(days=1)
+    # Whole periods from a year earlier: one rollup query covers the comparisons too
+    first = start.replace(year=start.year - 1)
+    starts = [first]
+    while _next_bucket(starts[-1], period) <= end:
+        starts.append(_next_bucket(starts[-1], period))
+    grid, names = {}, {}
+    for point in _spending_series(session, first, end, period, by_category=True):
+        # Points come bucket by bucket, every category in each, so each list follows `starts`
+        grid.setdefault(point.category_id, []).append(point.total)
+        names[point.category_id] = point.category_name
+    shown = starts[per_year:]
+    rows = sorted(
+        (_pivot_row(category_id, names[category_id], totals, per_year)
+         for category_id, totals in grid.items() if any(totals[per_year:])),
+        key=lambda row: (-row.total, row.category_name or ""),
+    )
+    column_totals = [sum(column) for column in zip(*grid.values())] or [0.0] * len(starts)
+    return PivotReport(
+        period, tuple(shown), tuple(bucket_label(d, period) for d in shown), tuple(rows),
+        _pivot_row(None, None, column_totals, per_year),
+    )
+
+
+def _verify_rollup(session, tolerance: float = 0.005) -> dict:
+    sql = text("""
+        SELECT year_month, category_id,
+               SUM(rollup_total), SUM(rollup_count), SUM(raw_total), SUM(raw_count)
+        FROM (
+            SELECT year_month, category_id,
+                   total AS rollup_total, count AS rollup_count, 0 AS raw_total, 0 AS raw_count
+            FROM expense_rollup
+            UNION ALL
+            SELECT substr(date, 1, 7), category_id, 0, 0, SUM(amount), COUNT(*)
+            FROM expenses
+            GROUP BY substr(date, 1, 7), category_id
+        )
+        GROUP BY year_month, category_id
+        ORDER BY year_month, category_id
+    """)
+    checked = 0
+    mismatches = []
+    for ym, cat_id, r_total, r_count, raw_total, raw_count in session.execute(sql):
+        checked += 1
+        if r_count != raw_count or abs((r_total or 0) - (raw_total or 0)) > tolerance:
+            mismatches.append((ym, cat_id, float(r_total or 0), int(r_count or 0),
+                               float(raw_total or 0), int(raw_count or 0)))
+    return {"ok": not mismatches, "checked": checked, "mismatches": mismatches}
+
+
+def _rebuild_rollup(session):
+    # Every rollup row is deleted and inserted again: instead of letting the
+    # alert triggers clear and raise each alert, check every budget once
+    # against the rebuilt totals, which only changes alerts whose crossing did
+    with triggers_paused(session, "budget_alerts"):
+        for sql in REBUILD_ROLLUP_SQL:
+            session.execute(text(sql))
+    budgets = [dict(row) for row in session.execute(text("SELECT month, category_id FROM category_budgets")).mappings()]
+    if budgets:
+        for sql in budget_alert_sql(":month", ":category_id"):
+            session.execute(text(sql), budgets)
+
+
+def _rollup_row_count(session) -> int:
+    return session.execute(text("SELECT COUNT(*) FROM expense_rollup")).scalar()
+
+
+@instrumented
+@cache.cached(("expenses",))
 def category_analytics():
     """
-    Category-wise total spending using raw SQL:
-    SELECT c.name, SUM(e.amount) FROM categories c
-    JOIN expenses e ON c.id = e.category_id
+    Category-wise total spending, answered from the rollup tables:
+    SELECT c.name, SUM(r.total) FROM categories c
+    JOIN expense_rollup_all r ON c.id = r.category_id
     GROUP BY c.name;
+    Cost depends on the number of months x categories, not on expenses,
+    and archived years are included without opening their files.
     """
     session = get_session()
     try:
-        sql = text("""
-            SELECT c.name, SUM(e.amount) AS total
-            FROM categories c
-            JOIN expenses e ON c.id = e.category_id
-            GROUP BY c.name
-            ORDER BY total DESC
-        """)
-        result = session.execute(sql)
-        rows = result.fetchall()
-        return [(row[0], float(row[1])) for row in rows]
+        return _category_analytics(session)
     finally:
         session.close()
 
 
+@instrumented
+@cache.cached(lambda year_month: (cache.month_scope(year_month),))
 def category_analytics_for_month(year_month: str):
     """Category-wise total for a specific month (YYYY-MM)."""
     session = get_session()
     try:
-        sql = text("""
-            SELECT c.name, SUM(e.amount) AS total
-            FROM categories c
-            JOIN expenses e ON c.id = e.category_id
-            WHERE strftime('%Y-%m', e.date) = :ym
-            GROUP BY c.name
-            ORDER BY total DESC
-        """)
-        result = session.execute(sql, {"ym": year_month})
-        rows = result.fetchall()
-        return [(row[0], float(row[1])) for row in rows]
+        return _category_analytics_for_month(session, year_month)
     finally:
         session.close()
 
 
+@instrumented
+@cache.cached(("expenses",))
 def total_spending():
-    """Total of all expenses (raw SQL)."""
+    """Total of all expenses (from the rollup)."""
     session = get_session()
     try:
-        result = session.execute(text("SELECT COALESCE(SUM(amount), 0) FROM expenses"))
-        return float(result.scalar())
+        return _total_spending(session)
     finally:
         session.close()
 
 
+@instrumented
+@cache.cached(lambda year_month: (cache.month_scope(year_month),))
 def total_spending_for_month(year_month: str) -> float:
     """Total spending for a given month (YYYY-MM)."""
     session = get_session()
     try:
-        result = session.execute(
-            text("SELECT COALESCE(SUM(amount), 0) FROM expenses WHERE strftime('%Y-%m', date) = :ym"),
-            {"ym": year_month},
-        )
-        return float(result.scalar())
+        return _total_spending_for_month(session, year_month)
+    finally:
+        session.close()
+
+
+@instrumented
+@cache.cached(("expenses",))
+def spending_series(start_date, end_date, bucket: str = "month", by_category: bool = False) -> list[SeriesPoint]:
+    """
+    Total and count of expenses per bucket ("day", "week" (ISO, from Monday),
+    "month", "quarter" or "year") from start_date to end_date inclusive
+    (dates or ISO strings), oldest first, with zeros for empty buckets.
+    Each point has the bucket's first day and a label (see bucket_label).
+    by_category splits every bucket per category that has spending in the
+    range. The first and last bucket cover only the part inside the range.
+
+    Aggregation runs in SQLite: whole months come from the rollup (archived
+    years included), partial months and day/week buckets from the date
+    index, so only the buckets leave the database.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    if str(start_date) > str(end_date):
+        raise ValueError("start_date must not be after end_date")
+    session = get_session()
+    try:
+        return _spending_series(session, start_date, end_date, bucket, by_category)
+    finally:
+        session.close()
+
+
+@instrumented
+@cache.cached(("expenses",))
+def pivot_report(start_month: str, end_month: str, period: str = "month") -> PivotReport:
+    """
+    Category x period spending matrix from start_month to end_month
+    (YYYY-MM, inclusive; quarters and years are shown whole), with each
+    category's total over the range, the per-period totals across
+    categories, and the change of every cell against the period before and
+    the same period a year earlier. Categories without spending in the range
+    are left out; rows are sorted by total, largest first.
+
+    One aggregate query over the rollup (archived years included) returns
+    every cell, the year before included; the pivot is built from its rows.
+    """
+    if period not in PIVOT_PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PIVOT_PERIODS)}")
+    if start_month > end_month:
+        raise ValueError("start_month must not be after end_month")
+    session = get_session()
+    try:
+        return _pivot_report(session, start_month, end_month, period)
+    finally:
+        session.close()
+
+
+def _percent(change: float | None) -> str:
+    return "" if change is None else f"{change * 100:.1f}"
+
+
+def write_pivot_csv(report: PivotReport, path: str) -> int:
+    """
+    Write a pivot report as CSV ("-" for stdout): one line per category and
+    a TOTAL line, with every period's value, its change against the previous
+    period and a year earlier (in %; one change column for yearly reports),
+    the range total and its year-over-year change. Returns the lines written.
+    """
+    yearly = report.period == "year"  # the previous period is the year before
+    header = ["category"]
+    for label in report.labels:
+        header += [label] + ([] if yearly else [f"{label} vs prev %"]) + [f"{label} YoY %"]
+    header += ["total", "total YoY %"]
+    f = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in (*report.rows, report.totals._replace(category_name="TOTAL")):
+            line = [row.category_name]
+            for value, previous, yoy in zip(row.values, row.previous_change, row.yoy_change):
+                line += [f"{value:.2f}"] + ([] if yearly else [_percent(previous)]) + [_percent(yoy)]
+            writer.writerow(line + [f"{row.total:.2f}", _percent(row.total_yoy_change)])
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    return len(report.rows) + 1
+
+
+@instrumented
+def verify_rollup(tolerance: float = 0.005) -> dict:
+    """
+    Compare expense_rollup against a fresh aggregate of the raw expenses table.
+    Returns: { "ok", "checked", "mismatches" } where each mismatch is
+    (year_month, category_id, rollup_total, rollup_count, raw_total, raw_count).
+    """
+    session = get_session()
+    try:
+        return _verify_rollup(session, tolerance)
+    finally:
+        session.close()
+
+
+@instrumented
+def rebuild_rollup() -> int:
+    """Recompute expense_rollup from the raw expenses table. Returns the number of rollup rows."""
+    session = get_session()
+    try:
+        _rebuild_rollup(session)
+        session.commit()
+        cache.clear()
+        return _rollup_row_count(session)
+    except Exception as e:
+        session.rollback()
+        raise e
     finally:
         session.close()
@@ -1,48 +1,199 @@
 """
 FinTrack Pro - Search Module
-Find expenses by date using SQL
+Find expenses by date using SQL, and by title using an FTS5 index
 """
 
+import re
 from datetime import date
 from sqlalchemy import text
-from database import get_session
+from sqlalchemy.exc import OperationalError
+import archive_module
+import cache
+from database import get_session, REBUILD_FTS_SQL
+from instrumentation import instrumented
+from read_models import EXPENSE_COLUMNS, ExpenseRow, expense_rows
+from report_module import months_between
 
+DEFAULT_BATCH_SIZE = 500
 
-def search_by_date(expense_date: date) -> list[tuple]:
+# One partition's part of a search: the live database ("main") or an archived year
+_EXPENSES_ARM = f"""
+    SELECT {EXPENSE_COLUMNS}
+    FROM {{schema}}.expenses e
+    JOIN categories c ON e.category_id = c.id
+"""
+
+
+# Query cores take an open session so the sync functions below and
+# async_api (via AsyncSession.run_sync) run the same SQL. Each runs on the
+# live database plus the archives its date range overlaps (archive_module).
+
+def _search_by_date(session, expense_date: date) -> list[ExpenseRow]:
+    sql = archive_module.routed_sql(session, _EXPENSES_ARM + "WHERE e.date = :d", "id", expense_date, expense_date)
+    return expense_rows(session.execute(text(sql), {"d": expense_date.isoformat()}))
+
+
+def _search_by_date_range(session, start_date: date, end_date: date) -> list[ExpenseRow]:
+    sql = archive_module.routed_sql(
+        session, _EXPENSES_ARM + "WHERE e.date BETWEEN :start AND :end", "date, id", start_date, end_date
+    )
+    return expense_rows(session.execute(text(sql), {"start": start_date.isoformat(), "end": end_date.isoformat()}))
+
+
+def _date_range_page(session, params: dict) -> list[ExpenseRow]:
+    """One keyset page for iter_by_date_range (params: last_date, last_id, end, limit)."""
+    sql = archive_module.routed_sql(session, _EXPENSES_ARM + """
+        WHERE e.date >= :last_date AND (e.date > :last_date OR e.id > :last_id)
+          AND e.date <= :end
+    """, "date, id", params["last_date"], params["end"], paged=True)
+    return expense_rows(session.execute(text(sql), {**params, "offset": 0}))
+
+
+def _fts_query(query: str) -> str:
+    """
+    Turn user input into an FTS5 MATCH expression.
+    "double quoted" text is a phrase, a trailing * makes a prefix query
+    (uber* matches "Uber", "UberEats"), and all terms must match. Terms are
+    quoted so FTS5 operators in the input are treated as plain words.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if phrase.strip():
+            terms.append('"' + phrase.strip().replace('"', '""') + '"')
+        elif word:
+            prefix = word.endswith("*")
+            word = word.rstrip("*").replace('"', '""')
+            if word:
+                terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _search_by_title(session, query: str, start_date: date = None, end_date: date = None,
+                     category_id: int = None, limit: int = 20, offset: int = 0) -> list[ExpenseRow]:
+    match = _fts_query(query)
+    if not match:
+        return []
+    filters = []
+    params = {"limit": limit, "offset": offset}
+    if start_date:
+        filters.append("AND e.date >= :start")
+        params["start"] = start_date.isoformat()
+    if end_date:
+        filters.append("AND e.date <= :end")
+        params["end"] = end_date.isoformat()
+    if category_id is not None:
+        filters.append("AND e.category_id = :cat")
+        params["cat"] = int(category_id)
+
+    arm = f"""
+        SELECT {EXPENSE_COLUMNS}, bm25(expense_fts) AS score
+        FROM {{schema}}.expense_fts f
+        JOIN {{schema}}.expenses e ON e.id = f.rowid
+        JOIN categories c ON e.category_id = c.id
+        WHERE expense_fts MATCH :match {' '.join(filters)}
+    """
+    try:
+        sql = archive_module.routed_sql(session, arm, "score, date DESC, id DESC", start_date, end_date, paged=True)
+        rows = session.execute(text(sql), {**params, "match": match})
+        return expense_rows(row[:6] for row in rows)
+    except OperationalError as e:
+        if "expense_fts" not in str(e):
+            raise
+    # No FTS5 in this SQLite build: substring match on every word instead
+    session.rollback()
+    words = [w.strip('"*') for w in re.findall(r'"[^"]*"|\S+', query)]
+    like = " ".join(f"AND e.title LIKE :w{i}" for i in range(len(words)))
+    params.update({f"w{i}": f"%{w}%" for i, w in enumerate(words)})
+    arm = _EXPENSES_ARM + f"WHERE 1 = 1 {like} {' '.join(filters)}"
+    sql = archive_module.routed_sql(session, arm, "date DESC, id DESC", start_date, end_date, paged=True)
+    return expense_rows(session.execute(text(sql), params))
+
+
+def _rebuild_title_index(session):
+    session.execute(text(REBUILD_FTS_SQL))
+
+
+def _range_scopes(start_date: date, end_date: date) -> tuple[str, ...]:
+    """Cache scopes for a date range: one per month, or all expenses for ranges over two years."""
+    months = months_between(start_date.isoformat()[:7], end_date.isoformat()[:7])
+    if len(months) > 24:
+        return ("expenses",)
+    return tuple(cache.month_scope(m) for m in months)
+
+
+@instrumented
+@cache.cached(lambda expense_date: (cache.month_scope(expense_date),))
+def search_by_date(expense_date: date) -> list[ExpenseRow]:
     """
     Search expenses by exact date using raw SQL.
-    Returns list of (id, title, amount, date, category_name).
+    Returns ExpenseRow (id, title, amount, date, category_name, category_id) rows.
     """
     session = get_session()
     try:
-        sql = text("""
-            SELECT e.id, e.title, e.amount, e.date, c.name AS category_name
-            FROM expenses e
-            JOIN categories c ON e.category_id = c.id
-            WHERE e.date = :d
-            ORDER BY e.id
-        """)
-        result = session.execute(sql, {"d": expense_date.isoformat()})
-        return result.fetchall()
+        return _search_by_date(session, expense_date)
     finally:
         session.close()
 
 
-def search_by_date_range(start_date: date, end_date: date) -> list[tuple]:
+@instrumented
+@cache.cached(lambda start_date, end_date: _range_scopes(start_date, end_date))
+def search_by_date_range(start_date: date, end_date: date) -> list[ExpenseRow]:
     """Search expenses within a date range. Same column format as search_by_date."""
     session = get_session()
     try:
-        sql = text("""
-            SELECT e.id, e.title, e.amount, e.date, c.name AS category_name
-            FROM expenses e
-            JOIN categories c ON e.category_id = c.id
-            WHERE e.date BETWEEN :start AND :end
-            ORDER BY e.date, e.id
-        """)
-        result = session.execute(
-            sql,
-            {"start": start_date.isoformat(), "end": end_date.isoformat()},
-        )
-        return result.fetchall()
+        return _search_by_date_range(session, start_date, end_date)
+    finally:
+        session.close()
+
+
+def iter_by_date_range(start_date: date, end_date: date, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Stream expenses within a date range, ordered by (date, id).
+    Same column format as search_by_date_range, but rows are fetched in
+    pages of `batch_size` using a keyset on (date, id), each page in its own
+    short read, so memory stays bounded and the first row arrives after one
+    page regardless of how wide the range is.
+    """
+    params = {"last_date": start_date.isoformat(), "last_id": 0, "end": end_date.isoformat(), "limit": batch_size}
+    while True:
+        session = get_session()
+        try:
+            rows = _date_range_page(session, params)
+        finally:
+            session.close()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        params["last_date"], params["last_id"] = rows[-1].date.isoformat(), rows[-1].id
+
+
+@instrumented
+@cache.cached(("expenses",))
+def search_by_title(query: str, start_date: date = None, end_date: date = None,
+                    category_id: int = None, limit: int = 20, offset: int = 0) -> list[ExpenseRow]:
+    """
+    Full-text search over expense titles, best matches first (bm25).
+    Supports prefix (uber*) and "phrase" queries, optionally restricted to a
+    date range and category; page with limit/offset.
+    Same column format as search_by_date.
+    """
+    session = get_session()
+    try:
+        return _search_by_title(session, query, start_date, end_date, category_id, limit, offset)
+    finally:
+        session.close()
+
+
+@instrumented
+def rebuild_title_index():
+    """Backfill / rebuild the expense_fts index from the expenses table."""
+    session = get_session()
+    try:
+        _rebuild_title_index(session)
+        session.commit()
+        cache.clear()
+    except Exception as e:
+        session.rollback()
+        raise e
     finally:
         session.close()
@@ -1,18 +1,48 @@
 """
 FinTrack Pro - Subscription Module
-Track recurring subscriptions (ORM-based)
+Track recurring subscriptions (ORM-based) and forecast future charges
 """
 
-from datetime import date
-from database import get_session
+import calendar
+from datetime import date, timedelta
+from sqlalchemy import text
+import cache
+from database import get_session, UPDATED_AT_SQL
+from instrumentation import instrumented
 from models import Subscription
+from read_models import SUBSCRIPTION_COLUMNS, SubscriptionRow, subscription_rows
+from report_module import month_bounds, months_between
 
+FREQUENCIES = ("monthly", "yearly", "weekly", "days")
 
-def add_subscription(name: str, amount: float, next_date: date) -> Subscription:
-    """Add a new subscription."""
+
+def _validate_recurrence(frequency: str, interval: int):
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+    if int(interval) < 1:
+        raise ValueError("interval must be at least 1")
+
+
+@instrumented
+def add_subscription(name: str, amount: float, next_date: date, frequency: str = "monthly",
+                     interval: int = 1, end_date: date = None, category_id: int = None) -> Subscription:
+    """
+    Add a new subscription charged every `interval` months/years/weeks/days
+    from next_date. Charges are booked under category_id ("Other" if None).
+    """
+    _validate_recurrence(frequency, interval)
     session = get_session()
     try:
-        sub = Subscription(name=name.strip(), amount=float(amount), next_date=next_date)
+        sub = Subscription(
+            name=name.strip(),
+            amount=float(amount),
+            next_date=next_date,
+            frequency=frequency,
+            interval=int(interval),
+            end_date=end_date,
+            anchor_day=next_date.day,
+            category_id=int(category_id) if category_id is not None else None,
+        )
         session.add(sub)
         session.commit()
         session.refresh(sub)
@@ -24,15 +54,61 @@ def add_subscription(name: str, amount: float, next_date: date) -> Subscription:
         session.close()
 
 
-def list_subscriptions():
-    """List all subscriptions."""
+@instrumented
+def update_subscription(sub_id: int, name: str = None, amount: float = None, next_date: date = None,
+                        frequency: str = None, interval: int = None, end_date: date = None,
+                        category_id: int = None) -> Subscription | None:
+    """Update a subscription. Only provided fields are updated."""
     session = get_session()
     try:
-        return session.query(Subscription).order_by(Subscription.next_date).all()
+        sub = session.query(Subscription).filter(Subscription.id == sub_id).first()
+        if not sub:
+            return None
+        _validate_recurrence(
+            frequency if frequency is not None else sub.frequency,
+            interval if interval is not None else sub.interval,
+        )
+        if name is not None:
+            sub.name = name.strip()
+        if amount is not None:
+            sub.amount = float(amount)
+        if next_date is not None:
+            sub.next_date = next_date
+            sub.anchor_day = next_date.day
+        if frequency is not None:
+            sub.frequency = frequency
+        if interval is not None:
+            sub.interval = int(interval)
+        if end_date is not None:
+            sub.end_date = end_date
+        if category_id is not None:
+            sub.category_id = int(category_id)
+        session.commit()
+        session.refresh(sub)
+        return sub
+    except Exception as e:
+        session.rollback()
+        raise e
     finally:
         session.close()
 
 
+@instrumented
+def list_subscriptions() -> list[SubscriptionRow]:
+    """List all subscriptions by next charge date, with the booking category's name."""
+    session = get_session()
+    try:
+        return subscription_rows(session.execute(text(f"""
+            SELECT {SUBSCRIPTION_COLUMNS}
+            FROM subscriptions s
+            LEFT JOIN categories c ON c.id = s.category_id
+            ORDER BY s.next_date, s.id
+        """)))
+    finally:
+        session.close()
+
+
+@instrumented
 def delete_subscription(sub_id: int) -> bool:
     """Delete a subscription by ID."""
     session = get_session()
@@ -48,3 +124,206 @@ def delete_subscription(sub_id: int) -> bool:
         raise e
     finally:
         session.close()
+
+
+def _add_months(year: int, month: int, months: int, day: int) -> date:
+    """Date `months` after (year, month), on `day` clamped to the month's length."""
+    index = year * 12 + (month - 1) + months
+    y, m = divmod(index, 12)
+    return date(y, m + 1, min(day, calendar.monthrange(y, m + 1)[1]))
+
+
+def _nth_occurrence(next_date: date, frequency: str, interval: int, anchor_day: int, k: int) -> date:
+    """The k-th charge date counting from next_date (k = 0 is next_date itself)."""
+    step = max(int(interval or 1), 1)
+    if frequency in ("monthly", "yearly"):
+        months = step * (12 if frequency == "yearly" else 1)
+        return _add_months(next_date.year, next_date.month, k * months, anchor_day or next_date.day)
+    return next_date + timedelta(days=k * step * (7 if frequency == "weekly" else 1))
+
+
+def expand_occurrences(next_date: date, frequency: str, interval: int, start: date, end: date,
+                       end_date: date = None, anchor_day: int = None) -> list[date]:
+    """
+    Charge dates of one subscription between start and end (inclusive).
+    Occurrences are counted from next_date, so the first one is next_date
+    itself; the index of the first occurrence inside the horizon is computed
+    directly instead of stepping through earlier periods.
+    """
+    last = min(end, end_date) if end_date else end
+    if next_date > last:
+        return []
+    step = max(int(interval or 1), 1)
+    dates = []
+    if frequency in ("monthly", "yearly"):
+        months = step * (12 if frequency == "yearly" else 1)
+        elapsed = (start.year - next_date.year) * 12 + (start.month - next_date.month)
+        k = max(0, elapsed // months - 1)
+        while True:
+            d = _nth_occurrence(next_date, frequency, interval, anchor_day, k)
+            if d > last:
+                break
+            if d >= start and d >= next_date:
+                dates.append(d)
+            k += 1
+    else:
+        days = step * (7 if frequency == "weekly" else 1)
+        k = max(0, -(-(start - next_date).days // days))
+        d = next_date + timedelta(days=k * days)
+        delta = timedelta(days=days)
+        while d <= last:
+            dates.append(d)
+            d += delta
+    return dates
+
+
+def _count_occurrences(next_date: date, days: int, lo: date, hi: date) -> int:
+    """Number of dates next_date + k*days (k >= 0) within [lo, hi]."""
+    lo = max(lo, next_date)
+    if hi < lo:
+        return 0
+    first = -(-(lo - next_date).days // days)
+    last = (hi - next_date).days // days
+    return max(0, last - first + 1)
+
+
+def _load_subscriptions(start: date, end: date) -> list[tuple]:
+    """All subscriptions that can charge between start and end, in one query."""
+    session = get_session()
+    try:
+        rows = session.execute(text("""
+            SELECT id, name, amount, next_date, frequency, interval, end_date, anchor_day
+            FROM subscriptions
+            WHERE next_date <= :end AND (end_date IS NULL OR end_date >= :start)
+        """), {"start": start.isoformat(), "end": end.isoformat()}).fetchall()
+    finally:
+        session.close()
+    return [
+        (sub_id, name, amount, date.fromisoformat(next_date), frequency, interval,
+         date.fromisoformat(end_date) if end_date else None, anchor_day)
+        for sub_id, name, amount, next_date, frequency, interval, end_date, anchor_day in rows
+    ]
+
+
+@instrumented
+@cache.cached(("subscriptions",))
+def forecast_occurrences(start: date, end: date) -> list[tuple[date, int, str, float]]:
+    """
+    Every projected charge between start and end (inclusive) as
+    (date, subscription_id, name, amount), ordered by date.
+    All subscriptions are read in one query and expanded together; results
+    are cached per (start, end) until a subscription is added, updated or
+    deleted.
+    """
+    occurrences = []
+    for sub_id, name, amount, next_date, frequency, interval, end_date, anchor_day in _load_subscriptions(start, end):
+        for d in expand_occurrences(next_date, frequency, interval, start, end, end_date, anchor_day):
+            occurrences.append((d, sub_id, name, amount))
+    occurrences.sort()
+    return occurrences
+
+
+@instrumented
+@cache.cached(("subscriptions",))
+def forecast_by_month(start: date, end: date) -> list[tuple[str, float]]:
+    """
+    Projected subscription total per month (YYYY-MM) from start to end,
+    zero-filled. Weekly and every-N-days subscriptions are counted per month
+    arithmetically rather than expanded date by date, so the cost is
+    subscriptions x months. Cached like forecast_occurrences.
+    """
+    months = months_between(start.isoformat()[:7], end.isoformat()[:7])
+    totals = dict.fromkeys(months, 0.0)
+    windows = []
+    for ym in months:
+        lo, hi = month_bounds(ym)
+        windows.append((ym, max(start, date.fromisoformat(lo)), min(end, date.fromisoformat(hi) - timedelta(days=1))))
+
+    for _, _, amount, next_date, frequency, interval, end_date, anchor_day in _load_subscriptions(start, end):
+        if frequency in ("monthly", "yearly"):
+            for d in expand_occurrences(next_date, frequency, interval, start, end, end_date, anchor_day):
+                totals[f"{d.year:04d}-{d.month:02d}"] += amount
+            continue
+        days = max(int(interval or 1), 1) * (7 if frequency == "weekly" else 1)
+        for ym, lo, hi in windows:
+            if end_date and end_date < hi:
+                hi = end_date
+            n = _count_occurrences(next_date, days, lo, hi)
+            if n:
+                totals[ym] += n * amount
+
+    return list(totals.items())
+
+
+@instrumented
+def process_due_subscriptions(today: date = None) -> dict:
+    """
+    Book every subscription charge due up to `today` as an expense and move
+    next_date past today, in one transaction. Charges missed over several
+    periods are all booked. The charge dates are computed in Python, then
+    staged in temp tables so the expense rows are inserted and next_date
+    advanced with one INSERT ... SELECT and one UPDATE. Re-running is a
+    no-op because next_date has already moved past today; the UPDATE only
+    touches rows whose next_date is unchanged since they were read.
+    Returns: { "booked", "subscriptions" }
+    """
+    today = today or date.today()
+    session = get_session()
+    try:
+        due = session.execute(text("""
+            SELECT id, next_date, frequency, interval, end_date, anchor_day
+            FROM subscriptions
+            WHERE next_date <= :today AND (end_date IS NULL OR next_date <= end_date)
+        """), {"today": today.isoformat()}).fetchall()
+        if not due:
+            return {"booked": 0, "subscriptions": 0}
+
+        charges, advances = [], []
+        for sub_id, next_date, frequency, interval, end_date, anchor_day in due:
+            first = date.fromisoformat(next_date)
+            limit = min(today, date.fromisoformat(end_date)) if end_date else today
+            k = 0
+            d = first
+            while d <= limit:
+                charges.append({"sub_id": sub_id, "date": d.isoformat()})
+                k += 1
+                d = _nth_occurrence(first, frequency, interval, anchor_day, k)
+            advances.append({"sub_id": sub_id, "old_next": next_date, "new_next": d.isoformat()})
+
+        session.execute(text("CREATE TEMP TABLE IF NOT EXISTS due_charges (sub_id INTEGER, date TEXT)"))
+        session.execute(text(
+            "CREATE TEMP TABLE IF NOT EXISTS due_advances (sub_id INTEGER PRIMARY KEY, old_next TEXT, new_next TEXT)"
+        ))
+        session.execute(text("DELETE FROM due_charges"))
+        session.execute(text("DELETE FROM due_advances"))
+        session.execute(text("INSERT INTO due_charges (sub_id, date) VALUES (:sub_id, :date)"), charges)
+        session.execute(
+            text("INSERT INTO due_advances (sub_id, old_next, new_next) VALUES (:sub_id, :old_next, :new_next)"),
+            advances,
+        )
+        booked = session.execute(text(f"""
+            INSERT INTO expenses (title, amount, date, category_id, updated_at)
+            SELECT s.name, s.amount, c.date,
+                   COALESCE(s.category_id, (SELECT id FROM categories WHERE name = 'Other')),
+                   {UPDATED_AT_SQL}
+            FROM due_charges c
+            JOIN due_advances a ON a.sub_id = c.sub_id
+            JOIN subscriptions s ON s.id = c.sub_id AND s.next_date = a.old_next
+            ORDER BY c.date, c.sub_id
+        """)).rowcount
+        advanced = session.execute(text("""
+            UPDATE subscriptions
+            SET next_date = (SELECT new_next FROM due_advances a WHERE a.sub_id = subscriptions.id),
+                anchor_day = COALESCE(anchor_day, CAST(strftime('%d', next_date) AS INTEGER))
+            WHERE id IN (SELECT sub_id FROM due_advances a WHERE a.old_next = subscriptions.next_date)
+        """)).rowcount
+        session.execute(text("DELETE FROM due_charges"))
+        session.execute(text("DELETE FROM due_advances"))
+        cache.invalidate_on_commit(session, "subscriptions", *cache.expense_scopes(c["date"] for c in charges))
+        session.commit()
+        return {"booked": booked, "subscriptions": advanced}
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
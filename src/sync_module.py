@@ -0,0 +1,381 @@
+"""
+FinTrack Pro - Sync Module
+Incremental replication and backups from the change_log table: read the
+changes after a sequence number, replay them into another database, and
+take snapshots (VACUUM INTO) behind which the log can be compacted
+"""
+
+import os
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+import archive_module
+import database
+from database import CHANGE_LOG_COLUMNS, get_session
+from instrumentation import instrumented
+from models import SyncState, TriggerPause
+from read_models import CHANGE_COLUMNS, ChangeRow, change_rows
+
+DEFAULT_BATCH_SIZE = 5000
+
+_NOW_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def source_name() -> str:
+    """How replicas identify this database in their sync_state: its absolute path."""
+    url = database.get_engine().url
+    if database.is_memory_url(str(url)):
+        raise ValueError("Sync needs a database file, not an in-memory database")
+    return os.path.abspath(url.database)
+
+
+def _upsert_sql(table: str) -> str:
+    columns = CHANGE_LOG_COLUMNS[table]
+    names = [column.strip('"') for column in columns]
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + n for n in names)}) "
+        f"ON CONFLICT (id) DO UPDATE SET {updates}"
+    )
+
+
+def _last_seq(session) -> int:
+    """Highest seq ever assigned (AUTOINCREMENT keeps it in sqlite_sequence)."""
+    return session.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")).scalar() or 0
+
+
+def _compacted_through(session) -> int:
+    """Highest seq no longer in the log: changes after it can still be read."""
+    oldest = session.execute(text("SELECT MIN(seq) FROM change_log")).scalar()
+    return oldest - 1 if oldest is not None else _last_seq(session)
+
+
+def _changes_since(session, seq: int, limit: int = None) -> list[ChangeRow]:
+    compacted = _compacted_through(session)
+    if seq < compacted:
+        raise LookupError(f"Changes up to seq {compacted} have been compacted; re-seed the replica from a snapshot")
+    return change_rows(session.execute(
+        text(f"SELECT {CHANGE_COLUMNS} FROM change_log l WHERE l.seq > :seq ORDER BY l.seq LIMIT :limit"),
+        {"seq": seq, "limit": -1 if limit is None else limit},
+    ))
+
+
+def _synced_seq(session, source: str) -> int:
+    return session.execute(
+        text("SELECT seq FROM sync_state WHERE source = :source"), {"source": source}
+    ).scalar() or 0
+
+
+def _save_synced_seq(session, source: str, seq: int):
+    session.execute(text(f"""
+        INSERT INTO sync_state (source, seq, synced_at) VALUES (:source, :seq, {_NOW_SQL})
+        ON CONFLICT (source) DO UPDATE SET seq = excluded.seq, synced_at = excluded.synced_at
+    """), {"source": source, "seq": seq})
+
+
+def _apply_changes(session, changes, source: str) -> tuple[int, int, ChangeRow | None]:
+    """
+    Replay changes after the replica's recorded seq, up to the first
+    archive move; returns (applied, new seq, that move or None). Consecutive
+    upserts (or deletes) of one table go to the database as one executemany.
+    """
+    last = _synced_seq(session, source)
+    applied = 0
+    group, group_key = [], None
+
+    def flush():
+        if not group:
+            return
+        table, op = group_key
+        if op == "D":
+            session.execute(text(f"DELETE FROM {table} WHERE id = :id"), group)
+        else:
+            session.execute(text(_upsert_sql(table)), group)
+        group.clear()
+
+    move = None
+    for change in changes:
+        if change.seq <= last:
+            continue  # already applied by an earlier sync
+        if change.table == "archives":
+            move = change
+            break
+        if change.table not in CHANGE_LOG_COLUMNS:
+            raise ValueError(f"Unknown table '{change.table}' in change {change.seq}")
+        key = (change.table, "D" if change.op == "D" else "U")
+        if key != group_key:
+            flush()
+            group_key = key
+        if change.op == "D":
+            group.append({"id": change.row_id})
+        else:
+            names = [column.strip('"') for column in CHANGE_LOG_COLUMNS[change.table]]
+            group.append({name: change.data.get(name) for name in names})
+        last = change.seq
+        applied += 1
+    flush()
+    _save_synced_seq(session, source, last)
+    return applied, last, move
+
+
+def _replay_move(target_engine, TargetSession, change: ChangeRow, source: str):
+    """
+    Archive (I) or restore (D) a year in the replica, into the replica's own
+    archive file, then record the change's seq. archive_module runs in its
+    own transactions, so this is not atomic: replaying it again archives
+    nothing new, and a year already restored is left alone. Raises
+    LookupError if the replica's archive file for the year is missing: the
+    archived rows exist nowhere else the replica can read them from.
+    """
+    with target_engine.connect() as conn:
+        path = archive_module._registered_path(conn, change.row_id)
+    if path is not None and not os.path.exists(path):
+        raise LookupError(f"The replica's archive of {change.row_id} is missing ({path}); "
+                          "seed it again from a new snapshot")
+    try:
+        if change.op == "D":
+            archive_module._restore_year(target_engine, change.row_id, log=False)
+        else:
+            archive_module._archive_year(target_engine, change.row_id, log=False)
+    except LookupError:
+        pass
+    session = TargetSession()
+    try:
+        _save_synced_seq(session, source, change.seq)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def _open_target(path: str):
+    """Engine and session factory for another FinTrack database file."""
+    target_engine = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+    database.install_connection_events(target_engine, database.profile_settings())
+    for model in (SyncState, TriggerPause):
+        model.__table__.create(bind=target_engine, checkfirst=True)
+    return target_engine, sessionmaker(bind=target_engine, autoflush=False)
+
+
+@instrumented
+def current_seq() -> int:
+    """Sequence number of the newest change (0 if nothing has been logged)."""
+    session = get_session()
+    try:
+        return _last_seq(session)
+    finally:
+        session.close()
+
+
+@instrumented
+def log_status() -> dict:
+    """{ "seq", "compacted_through", "entries" } of the live change log."""
+    session = get_session()
+    try:
+        return {
+            "seq": _last_seq(session),
+            "compacted_through": _compacted_through(session),
+            "entries": session.execute(text("SELECT COUNT(*) FROM change_log")).scalar(),
+        }
+    finally:
+        session.close()
+
+
+@instrumented
+def changes_since(seq: int = 0, limit: int = None) -> list[ChangeRow]:
+    """
+    Changes after `seq`, oldest first (at most `limit`). Raises LookupError
+    if some of them were compacted away.
+    """
+    session = get_session()
+    try:
+        return _changes_since(session, int(seq), limit)
+    finally:
+        session.close()
+
+
+def iter_changes(seq: int = 0, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Stream the changes after `seq` in pages of `batch_size`."""
+    while True:
+        page = changes_since(seq, batch_size)
+        yield from page
+        if len(page) < batch_size:
+            return
+        seq = page[-1].seq
+
+
+@instrumented
+def apply_changes(target: str, changes, source: str = None) -> dict:
+    """
+    Replay `changes` (ChangeRow, oldest first) into the database at `target`
+    in one transaction. Inserts and updates become upserts by id and deletes
+    delete by id; the replica's change log and updated_at triggers are
+    paused meanwhile, so it logs nothing and rows keep the source's stamps.
+    An archive move ends the transaction and archives or restores that year
+    in the replica; the changes after it get a transaction of their own.
+    The last applied seq is recorded in the target's sync_state under
+    `source` (default: this database), and changes at or below it are
+    skipped, so replaying a stream again is harmless.
+    Returns: { "applied", "seq" }.
+    """
+    source = source or source_name()
+    target_engine, TargetSession = _open_target(target)
+    changes = iter(changes)
+    applied = 0
+    try:
+        while True:
+            session = TargetSession()
+            try:
+                with database.triggers_paused(session, "change_log", "touch"):
+                    count, seq, move = _apply_changes(session, changes, source)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                raise e
+            finally:
+                session.close()
+            applied += count
+            if move is None:
+                return {"applied": applied, "seq": seq}
+            _replay_move(target_engine, TargetSession, move, source)
+            applied += 1
+    finally:
+        target_engine.dispose()
+
+
+@instrumented
+def snapshot(path: str, compact: bool = False) -> dict:
+    """
+    Write a consistent copy of the live database to `path` with VACUUM INTO,
+    and a copy of each archive file next to it (registered in the copy).
+    The copy is ready to use as a replica: its change_log is emptied and its
+    sync_state records the seq it contains. With compact, log entries up to
+    that seq are then deleted from the live database.
+    Returns: { "path", "seq", "bytes", "archives", "compacted" }.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    source = source_name()
+    engine = database.get_engine()
+    lock = engine.raw_connection()
+    written = [path]
+    try:
+        # Not in a transaction: the connections run with isolation_level None
+        if lock.cursor().execute("SELECT EXISTS (SELECT 1 FROM archives)").fetchone()[0]:
+            # archive_year / restore_year take the write lock before touching a
+            # file, so holding it keeps the archive files in step with the copy
+            lock.cursor().execute("BEGIN IMMEDIATE")
+        raw = engine.raw_connection()
+        try:
+            raw.cursor().execute("VACUUM INTO ?", (path,))
+        finally:
+            raw.close()
+        target_engine, TargetSession = _open_target(path)
+        session = TargetSession()
+        try:
+            archives = _copy_archives(session, target_engine, written)
+            seq = _last_seq(session)
+            session.execute(text("DELETE FROM change_log"))
+            _save_synced_seq(session, source, seq)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+            target_engine.dispose()
+    except BaseException:
+        for name in written:
+            archive_module._remove_file(name)
+        raise
+    finally:
+        if lock.in_transaction:
+            lock.cursor().execute("ROLLBACK")
+        lock.close()
+    compacted = compact_log(seq) if compact else 0
+    return {"path": path, "seq": seq, "bytes": os.path.getsize(path), "archives": archives,
+            "compacted": compacted}
+
+
+def _copy_archives(session, target_engine, written: list[str]) -> int:
+    """
+    Copy each archive registered in the snapshot open in `session` to the
+    snapshot's own archive path and register it there, so the replica never
+    reads or restores from the live database's files. Appends each file to
+    `written` before copying it. Returns how many were copied.
+    """
+    archives = session.execute(text("SELECT year, path FROM archives ORDER BY year")).fetchall()
+    raw = database.get_engine().raw_connection()
+    try:
+        cursor = raw.cursor()
+        for year, registered in archives:
+            source_path = archive_module._resolve(registered)
+            if not os.path.exists(source_path):
+                raise FileNotFoundError(f"Archive file is missing: {source_path}")
+            copy_path = archive_module.archive_path(year, target_engine)
+            if os.path.exists(copy_path):
+                raise FileExistsError(f"{copy_path} already exists")
+            written.append(copy_path)
+            cursor.execute(f"ATTACH DATABASE ? AS {archive_module._WORK_SCHEMA}", (source_path,))
+            try:
+                cursor.execute(f"VACUUM {archive_module._WORK_SCHEMA} INTO ?", (copy_path,))
+            finally:
+                cursor.execute(f"DETACH DATABASE {archive_module._WORK_SCHEMA}")
+            session.execute(text("UPDATE archives SET path = :path WHERE year = :year"),
+                            {"path": archive_module._registry_path(copy_path, target_engine), "year": year})
+    finally:
+        raw.close()
+    return len(archives)
+
+
+@instrumented
+def compact_log(through_seq: int) -> int:
+    """Delete change log entries up to and including `through_seq`. Returns how many were deleted."""
+    session = get_session()
+    try:
+        if through_seq > _last_seq(session):
+            raise ValueError(f"seq {through_seq} has not been logged yet")
+        deleted = session.execute(text("DELETE FROM change_log WHERE seq <= :seq"), {"seq": through_seq}).rowcount
+        session.commit()
+        return deleted
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+@instrumented
+def sync(target: str, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    Bring the replica at `target` up to date: create it with snapshot() if
+    it does not exist, then apply the changes after its recorded seq, one
+    transaction per `batch_size` changes.
+    Returns: { "target", "created", "applied", "seq", "seconds" }.
+    """
+    started = time.perf_counter()
+    created = not os.path.exists(target)
+    if created:
+        seq = snapshot(target)["seq"]
+    else:
+        target_engine, TargetSession = _open_target(target)
+        session = TargetSession()
+        try:
+            seq = _synced_seq(session, source_name())
+        finally:
+            session.close()
+            target_engine.dispose()
+    applied = 0
+    while True:
+        page = changes_since(seq, batch_size)
+        if page:
+            result = apply_changes(target, page)
+            applied += result["applied"]
+            seq = result["seq"]
+        if len(page) < batch_size:
+            break
+    return {"target": target, "created": created, "applied": applied, "seq": seq,
+            "seconds": time.perf_counter() - started}
@@ -0,0 +1,229 @@
+"""
+FinTrack Pro - Writer Service
+Background writer that takes expense add / update / delete operations from
+many threads through a bounded queue and applies them in grouped
+transactions (group commit), answering each caller through a Future
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date
+from sqlalchemy import insert
+import cache
+import expense_module
+from database import get_session
+from instrumentation import instrumented
+from models import Expense
+
+DEFAULT_MAX_BATCH = 500
+# How long the first operation of a group waits for more to arrive (seconds)
+DEFAULT_MAX_DELAY = 0.002
+DEFAULT_QUEUE_SIZE = 10_000
+
+_STOP = object()
+
+
+def _run_ops(session, ops: list) -> list:
+    """
+    Apply (kind, args) operations in order in `session` and return their
+    results. Runs of consecutive adds become one multi-row INSERT ... RETURNING.
+    """
+    results = []
+    i = 0
+    while i < len(ops):
+        kind, args = ops[i]
+        if kind == "add":
+            j = i
+            while j < len(ops) and ops[j][0] == "add":
+                j += 1
+            rows = [args for _, args in ops[i:j]]
+            stmt = insert(Expense).returning(Expense.id, sort_by_parameter_order=True)
+            results.extend(session.execute(stmt, rows).scalars().all())
+            cache.invalidate_on_commit(session, *cache.expense_scopes(row["date"] for row in rows))
+            i = j
+        elif kind == "update":
+            results.append(expense_module._update_expense(session, *args) is not None)
+            i += 1
+        else:
+            results.append(expense_module._delete_expense(session, *args))
+            i += 1
+    return results
+
+
+@instrumented
+def _apply_group(ops: list) -> list:
+    """
+    Apply a group of operations in one transaction. Returns one
+    (ok, result_or_exception) pair per operation. If the group fails, it is
+    retried with every operation in its own savepoint, so only the failing
+    operations are rejected and the rest still commit together.
+    """
+    session = get_session()
+    try:
+        try:
+            results = [(True, r) for r in _run_ops(session, ops)]
+            session.commit()
+            return results
+        except Exception:
+            session.rollback()
+        results = []
+        for op in ops:
+            savepoint = session.begin_nested()
+            try:
+                results.append((True, _run_ops(session, [op])[0]))
+                savepoint.commit()
+            except Exception as e:
+                savepoint.rollback()
+                results.append((False, e))
+        session.commit()
+        return results
+    except Exception as e:
+        session.rollback()
+        return [(False, e)] * len(ops)
+    finally:
+        session.close()
+
+
+class WriterService:
+    """
+    One background thread owns all writes:
+
+        with WriterService() as writer:
+            future = writer.add_expense("Coffee", 3.5, date.today(), 1)
+            expense_id = future.result()
+
+    Operations are applied in submission order. The writer waits up to
+    `max_delay` seconds after the first queued operation for others, then
+    commits up to `max_batch` of them in one transaction; under load the
+    queue refills while a group commits, so groups grow with the arrival
+    rate and one fsync covers many writes. A future completes only after
+    its group has committed.
+
+    When `queue_size` operations are waiting, submitting blocks (or raises
+    queue.Full after `timeout` seconds) until the writer catches up.
+    """
+
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH, max_delay: float = DEFAULT_MAX_DELAY,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.max_batch = int(max_batch)
+        self.max_delay = float(max_delay)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "applied": 0, "failed": 0, "groups": 0, "largest_group": 0}
+
+    def start(self) -> "WriterService":
+        with self._lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="fintrack-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """Apply everything already submitted, then stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+        self._queue.put(_STOP)
+        thread.join()
+        # A submit racing with stop() can land behind the stop marker
+        while True:
+            try:
+                _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("writer service stopped"))
+            self._queue.task_done()
+        with self._lock:
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def flush(self):
+        """Block until every operation submitted so far has been applied."""
+        self._queue.join()
+
+    def add_expense(self, title: str, amount: float, expense_date: date, category_id: int,
+                    timeout: float = None) -> Future:
+        """Queue a new expense. The future's result is its id."""
+        row = {"title": title.strip(), "amount": float(amount), "date": expense_date, "category_id": int(category_id)}
+        return self._submit("add", row, timeout)
+
+    def update_expense(self, expense_id: int, title: str = None, amount: float = None,
+                       expense_date: date = None, category_id: int = None, timeout: float = None) -> Future:
+        """Queue an update of the given fields. The future's result is False if the expense does not exist."""
+        return self._submit("update", (int(expense_id), title, amount, expense_date, category_id), timeout)
+
+    def delete_expense(self, expense_id: int, timeout: float = None) -> Future:
+        """Queue a delete. The future's result is False if the expense does not exist."""
+        return self._submit("delete", (int(expense_id),), timeout)
+
+    def stats(self) -> dict:
+        """Counters plus the current queue depth; mean_group is operations per group."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["mean_group"] = (stats["applied"] + stats["failed"]) / stats["groups"] if stats["groups"] else 0.0
+        return stats
+
+    def _submit(self, kind: str, args, timeout: float | None) -> Future:
+        if self._thread is None or self._stopping:
+            raise RuntimeError("writer service is not running")
+        future = Future()
+        self._queue.put((kind, args, future), timeout=timeout)
+        with self._lock:
+            self._stats["submitted"] += 1
+        return future
+
+    def _collect(self) -> tuple[list, bool]:
+        """Wait for one operation, then gather more until max_batch or max_delay. Returns (ops, stop)."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        ops = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(ops) < self.max_batch:
+            try:
+                op = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if op is _STOP:
+                return ops, True
+            ops.append(op)
+        return ops, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            ops, stop = self._collect()
+            # Skip operations whose futures were cancelled while queued
+            live = [op for op in ops if op[2].set_running_or_notify_cancel()]
+            if live:
+                results = _apply_group([(kind, args) for kind, args, _ in live])
+                failed = 0
+                for (_, _, future), (ok, value) in zip(live, results):
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        failed += 1
+                        future.set_exception(value)
+                with self._lock:
+                    self._stats["groups"] += 1
+                    self._stats["applied"] += len(live) - failed
+                    self._stats["failed"] += failed
+                    self._stats["largest_group"] = max(self._stats["largest_group"], len(live))
+            for _ in range(len(ops) + stop):
+                self._queue.task_done()